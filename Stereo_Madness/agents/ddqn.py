@@ -5,6 +5,9 @@ import numpy as np
 import random
 import os
 
+from config import INPUT_DIM
+from core import telemetry
+
 class DuelingDQN(nn.Module):
     def __init__(self, input_dim, output_dim):
         super(DuelingDQN, self).__init__()
@@ -40,6 +43,63 @@ class DuelingDQN(nn.Module):
         q_vals = val + (adv - adv.mean(dim=1, keepdim=True))
         return q_vals
 
+class DuelingHead(nn.Module):
+    """Value/advantage streams of DuelingDQN on top of a shared 256-d trunk."""
+
+    def __init__(self, output_dim):
+        super(DuelingHead, self).__init__()
+        self.value_stream = nn.Sequential(nn.Linear(256, 128), nn.ReLU(), nn.Linear(128, 1))
+        self.advantage_stream = nn.Sequential(nn.Linear(256, 128), nn.ReLU(), nn.Linear(128, output_dim))
+
+    def forward(self, x):
+        val = self.value_stream(x)
+        adv = self.advantage_stream(x)
+        return val + (adv - adv.mean(dim=1, keepdim=True))
+
+
+class MultiHeadDuelingDQN(nn.Module):
+    """
+    One shared trunk (fc1/fc2 of DuelingDQN) with a dueling head per game mode.
+
+    The head of each row is picked from its own `player_mode` feature (newest
+    frame of a stack), so a batch mixing cube and ship states still takes a
+    single forward pass and playback needs no model swaps.
+    """
+
+    def __init__(self, input_dim, output_dim, num_heads=2, frame_dim=INPUT_DIM):
+        super(MultiHeadDuelingDQN, self).__init__()
+        self.num_heads = num_heads
+        # player_mode is feature 3 of the newest frame
+        self.mode_index = input_dim - frame_dim + 3
+
+        self.fc1 = nn.Linear(input_dim, 256)
+        self.fc2 = nn.Linear(256, 256)
+        self.heads = nn.ModuleList([DuelingHead(output_dim) for _ in range(num_heads)])
+
+    def trunk_parameters(self):
+        return list(self.fc1.parameters()) + list(self.fc2.parameters())
+
+    def head_index(self, state):
+        return state[:, self.mode_index].round().long().clamp_(0, self.num_heads - 1)
+
+    def forward(self, state, head=None):
+        x = F.relu(self.fc1(state))
+        x = F.relu(self.fc2(x))
+        if x.shape[0] == 1:
+            h = int(head[0]) if head is not None else int(float(state[0, self.mode_index]) + 0.5)
+            return self.heads[min(max(h, 0), self.num_heads - 1)](x)
+        if head is None:
+            head = self.head_index(state)
+
+        # each head runs once on the rows routed to it
+        q = x.new_empty(x.shape[0], self.heads[0].advantage_stream[-1].out_features)
+        for h, module in enumerate(self.heads):
+            rows = (head == h).nonzero(as_tuple=True)[0]
+            if rows.numel():
+                q = q.index_copy(0, rows, module(x.index_select(0, rows)))
+        return q
+
+
 class Agent:
     def __init__(self, input_dim, output_dim, config, checkpoint_dir):
         self.config = config
@@ -47,9 +107,8 @@ class Agent:
         self.output_dim = output_dim
         self.checkpoint_dir = checkpoint_dir
         
-        # Networks
-        self.online_net = DuelingDQN(input_dim, output_dim).to(self.device)
-        self.target_net = DuelingDQN(input_dim, output_dim).to(self.device)
+        self.online_net = self.build_network(input_dim, output_dim).to(self.device)
+        self.target_net = self.build_network(input_dim, output_dim).to(self.device)
         self.target_net.load_state_dict(self.online_net.state_dict())
         self.target_net.eval()
         
@@ -63,6 +122,25 @@ class Agent:
         self.epsilon_decay = config['epsilon_decay']
         self.steps_done = 0
 
+        # Agent-chosen repeat: bootstrap discount depends on how many frames the action held
+        self.action_discount = None
+        repeats = config.get('action_repeats')
+        if repeats:
+            discounts = [config['frame_gamma'] ** r for r in repeats for _ in range(2)]
+            self.action_discount = torch.tensor(discounts, dtype=torch.float32, device=self.device).unsqueeze(1)
+
+    def build_network(self, input_dim, output_dim):
+        """One mode-conditioned model, or one DuelingDQN (flat or set-encoded objects) per slice."""
+        if self.config.get('encoder', 'flat') == 'set':
+            if self.config.get('multi_head'):
+                raise ValueError("[Agent] multi_head is not supported with the set encoder")
+            from agents.set_encoder import SetDuelingDQN
+            return SetDuelingDQN(input_dim, output_dim, embed_dim=self.config.get('set_embed_dim', 64),
+                                 pooling=self.config.get('set_pooling', 'max'))
+        if self.config.get('multi_head'):
+            return MultiHeadDuelingDQN(input_dim, output_dim, self.config.get('num_heads', 2))
+        return DuelingDQN(input_dim, output_dim)
+
     def select_action(self, state, is_training=True):
         """Epsilon-Greedy Action Selection"""
         if is_training:
@@ -75,7 +153,7 @@ class Agent:
                 return random.randrange(self.output_dim)
 
         # Greedy Action (Exploitation)
-        with torch.no_grad():
+        with telemetry.span("agent.select_action"), torch.no_grad():
             state_t = torch.FloatTensor(state).unsqueeze(0).to(self.device)
             q_values = self.online_net(state_t)
             return q_values.argmax().item()
@@ -85,7 +163,12 @@ class Agent:
         if len(memory) < self.config['batch_size']:
             return None # Not enough samples yet
 
-        state, action, reward, next_state, done = memory.sample(self.config['batch_size'])
+        with telemetry.span("agent.learn"):
+            return self._learn(memory)
+
+    def _learn(self, memory):
+        with telemetry.span("agent.sample"):
+            state, action, reward, next_state, done = memory.sample(self.config['batch_size'])
         
         # Convert to Tensor
         state = torch.FloatTensor(state).to(self.device)
@@ -104,7 +187,11 @@ class Agent:
         next_q = self.target_net(next_state).gather(1, next_actions)
         
         # Bellman Equation
-        target_q = reward + (1 - done) * self.config['gamma'] * next_q
+        if self.action_discount is None:
+            gamma = self.config['gamma']
+        else:
+            gamma = self.action_discount[action.squeeze(1)]
+        target_q = reward + (1 - done) * gamma * next_q
         
         # Optimize
         loss = self.loss_fn(curr_q, target_q.detach())
@@ -137,6 +224,23 @@ class Agent:
             print(f"[Agent] Loaded weights from {path}")
         else:
             print(f"[Agent] Warning: No model found at {path}")
+    def training_state(self):
+        """Everything needed to continue training in place: weights, optimizer moments, exploration."""
+        return {
+            'model_state_dict': self.online_net.state_dict(),
+            'target_state_dict': self.target_net.state_dict(),
+            'optimizer_state_dict': self.optimizer.state_dict(),
+            'epsilon': float(self.epsilon),  # plain float: loadable with torch.load(weights_only=True)
+            'steps_done': self.steps_done,
+        }
+
+    def load_training_state(self, state):
+        self.online_net.load_state_dict(state['model_state_dict'])
+        self.target_net.load_state_dict(state['target_state_dict'])
+        self.optimizer.load_state_dict(state['optimizer_state_dict'])
+        self.epsilon = state['epsilon']
+        self.steps_done = state['steps_done']
+
     def reset_network(self):
         """
         Re-initialize the online and target networks from scratch.
@@ -150,3 +254,31 @@ class Agent:
     
         self.online_net.apply(init_weights)
         self.target_net.load_state_dict(self.online_net.state_dict())
+
+    def reset_head(self, head):
+        """Re-initialize one head of a MultiHeadDuelingDQN (first slice of a new mode)."""
+        def init_weights(m):
+            if isinstance(m, torch.nn.Linear):
+                torch.nn.init.kaiming_uniform_(m.weight)
+                if m.bias is not None:
+                    torch.nn.init.zeros_(m.bias)
+
+        self.online_net.heads[head].apply(init_weights)
+        self.target_net.load_state_dict(self.online_net.state_dict())
+
+    def freeze_trunk(self, frozen=True):
+        """Fine-tune only the heads of a MultiHeadDuelingDQN (Adam skips params without grads)."""
+        for p in self.online_net.trunk_parameters():
+            p.requires_grad_(not frozen)
+            p.grad = None
+
+
+def make_agent(input_dim, output_dim, config, checkpoint_dir):
+    """Agent for config['algorithm']: "ddqn" (this module) or "rainbow" (agents/rainbow.py)."""
+    algorithm = config.get('algorithm', 'ddqn')
+    if algorithm == 'rainbow':
+        from agents.rainbow import RainbowAgent
+        return RainbowAgent(input_dim, output_dim, config, checkpoint_dir)
+    if algorithm != 'ddqn':
+        raise ValueError(f"[Agent] Unknown algorithm '{algorithm}'")
+    return Agent(input_dim, output_dim, config, checkpoint_dir)
@@ -0,0 +1,116 @@
+"""
+Count-based novelty bonus over a hashed visitation table.
+
+Each decision's game frame is discretized into a key of (percent,
+player_y, player_vel_y, player_mode, dist_nearest_hazard) bins. The key is
+counted in a count-min sketch: `depth` rows of 2**table_bits uint32
+counters, one multiplicative hash per row. An update touches `depth`
+counters whatever the number of states seen, and memory stays fixed
+(4 * depth * 2**table_bits bytes). Collisions can only raise a count, so
+the bonus is never overstated.
+
+    bonus = beta * 0.5 ** (steps / half_life) / sqrt(n)
+
+n is the key's count after this visit, so the bonus fades per state as it
+is revisited, and for the whole slice as its training steps add up. Death
+frames get no bonus, so the agent is never paid for finding new ways to die.
+
+GeometryDashEnv adds the bonus to the step reward when env.novelty is set
+(info["novelty"]). main.py keeps one table per slice, saved next to the
+slice checkpoint (NOVELTY_FILE). The relay plays with the table detached.
+
+Enable with NOVELTY = True in config.py.
+"""
+import math
+import os
+import numpy as np
+
+from config import NOVELTY_BETA, NOVELTY_HALF_LIFE, NOVELTY_TABLE_BITS, NOVELTY_DEPTH, NOVELTY_BINS
+
+# odd 64-bit multipliers, one per sketch row
+SALTS = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93)
+MASK64 = (1 << 64) - 1
+
+
+class NoveltyBonus:
+    def __init__(self, beta=NOVELTY_BETA, half_life=NOVELTY_HALF_LIFE, table_bits=NOVELTY_TABLE_BITS,
+                 depth=NOVELTY_DEPTH, bins=NOVELTY_BINS):
+        """bins: bin widths {'percent', 'y', 'vel_y', 'hazard'} plus 'hazard_max' (farther = no hazard)."""
+        if not 1 <= depth <= len(SALTS):
+            raise ValueError(f"[Novelty] depth must be 1-{len(SALTS)}, got {depth}")
+        self.beta = beta
+        self.half_life = half_life
+        self.table_bits = table_bits
+        self.bins = dict(bins)
+        self.counts = np.zeros((depth, 1 << table_bits), dtype=np.uint32)
+        self.steps = 0      # bonuses handed out (drives the decay)
+        self.new_keys = 0   # first visits, as far as the sketch can tell
+
+    # KEYS
+    def key(self, state):
+        """Discretized (percent, y, vel_y, mode, nearest hazard) of a SharedState frame."""
+        b = self.bins
+        hazard = state.dist_nearest_hazard
+        hazard_bin = int(hazard // b['hazard']) if hazard < b['hazard_max'] else -1
+        return (int(state.percent // b['percent']), int(state.player_y // b['y']),
+                int(state.player_vel_y // b['vel_y']), int(state.player_mode), hazard_bin)
+
+    def _slots(self, key):
+        h = 0
+        for k in key:
+            h = ((h ^ (k & MASK64)) * 0x100000001B3) & MASK64
+        shift = 64 - self.table_bits
+        return [((h * salt) & MASK64) >> shift for salt in SALTS[:len(self.counts)]]
+
+    # COUNTS
+    def count(self, state):
+        """Visits of the frame's key so far (count-min estimate)."""
+        return int(min(row[slot] for row, slot in zip(self.counts, self._slots(self.key(state)))))
+
+    def bonus(self, state):
+        """Count one visit of the frame and return its intrinsic reward."""
+        if state.is_dead:
+            return 0.0
+        n = None
+        for row, slot in zip(self.counts, self._slots(self.key(state))):
+            if row[slot] < 0xFFFFFFFF:
+                row[slot] += 1
+            n = row[slot] if n is None else min(n, row[slot])
+        if n == 1:
+            self.new_keys += 1
+        scale = self.scale()
+        self.steps += 1
+        return scale / math.sqrt(n)
+
+    def scale(self):
+        """Bonus of a first visit at the current step (half_life 0 = no decay)."""
+        return self.beta * 0.5 ** (self.steps / self.half_life) if self.half_life else self.beta
+
+    def summary(self):
+        used = np.count_nonzero(self.counts[0])
+        return (f"[Novelty] {self.new_keys:,} states over {self.steps:,} steps | bonus scale {self.scale():.3f} | "
+                f"table {used / self.counts.shape[1] * 100:.1f}% used ({self.counts.nbytes / 1024:.0f} KiB)")
+
+    # STORAGE
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, 'wb') as f:
+            np.savez_compressed(f, counts=self.counts, steps=self.steps, new_keys=self.new_keys,
+                                beta=self.beta, half_life=self.half_life,
+                                bins=np.array([self.bins[k] for k in sorted(self.bins)]),
+                                bin_names=np.array(sorted(self.bins)))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        """Table, counters and settings as saved (the counts only mean something with the same bins)."""
+        with np.load(path) as data:
+            bins = dict(zip(data['bin_names'].tolist(), data['bins'].tolist()))
+            counts = data['counts']
+            novelty = cls(float(data['beta']), float(data['half_life']), counts.shape[1].bit_length() - 1,
+                          counts.shape[0], bins)
+            novelty.counts = counts.astype(np.uint32)
+            novelty.steps = int(data['steps'])
+            novelty.new_keys = int(data['new_keys'])
+        return novelty
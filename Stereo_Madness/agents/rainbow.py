@@ -0,0 +1,194 @@
+import math
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+from core import telemetry
+from agents.ddqn import Agent
+
+
+class NoisyLinear(nn.Module):
+    """
+    Linear layer with factorized Gaussian parameter noise (NoisyNet).
+    The noise is used in train mode only; eval mode is the mean layer.
+    """
+
+    def __init__(self, in_features, out_features, sigma0=0.5):
+        super(NoisyLinear, self).__init__()
+        self.in_features = in_features
+        self.out_features = out_features
+        self.sigma0 = sigma0
+        self.weight_mu = nn.Parameter(torch.empty(out_features, in_features))
+        self.weight_sigma = nn.Parameter(torch.empty(out_features, in_features))
+        self.bias_mu = nn.Parameter(torch.empty(out_features))
+        self.bias_sigma = nn.Parameter(torch.empty(out_features))
+        self.register_buffer("eps_in", torch.zeros(in_features))
+        self.register_buffer("eps_out", torch.zeros(out_features))
+        self.reset_parameters()
+
+    def reset_parameters(self):
+        bound = 1.0 / math.sqrt(self.in_features)
+        nn.init.uniform_(self.weight_mu, -bound, bound)
+        nn.init.uniform_(self.bias_mu, -bound, bound)
+        nn.init.constant_(self.weight_sigma, self.sigma0 / math.sqrt(self.in_features))
+        nn.init.constant_(self.bias_sigma, self.sigma0 / math.sqrt(self.out_features))
+        self.reset_noise()
+
+    @staticmethod
+    def _scaled(n, device):
+        x = torch.randn(n, device=device)
+        return x.sign() * x.abs().sqrt()
+
+    def reset_noise(self):
+        self.eps_in.copy_(self._scaled(self.in_features, self.eps_in.device))
+        self.eps_out.copy_(self._scaled(self.out_features, self.eps_out.device))
+
+    def forward(self, x):
+        if not self.training:
+            return F.linear(x, self.weight_mu, self.bias_mu)
+        weight = self.weight_mu + self.weight_sigma * torch.outer(self.eps_out, self.eps_in)
+        bias = self.bias_mu + self.bias_sigma * self.eps_out
+        return F.linear(x, weight, bias)
+
+
+class CategoricalDuelingDQN(nn.Module):
+    """
+    DuelingDQN trunk with noisy value/advantage streams over a categorical
+    return distribution (C51). forward() returns expected Q-values like
+    DuelingDQN, so greedy callers (play, relay, evaluator) work unchanged;
+    log_dist() gives the per-action log-probabilities over the support.
+    """
+
+    def __init__(self, input_dim, output_dim, support, sigma0=0.5):
+        super(CategoricalDuelingDQN, self).__init__()
+        self.output_dim = output_dim
+        self.num_atoms = len(support)
+        self.register_buffer("support", support)
+
+        self.fc1 = nn.Linear(input_dim, 256)
+        self.fc2 = nn.Linear(256, 256)
+        self.value_hidden = NoisyLinear(256, 128, sigma0)
+        self.value_out = NoisyLinear(128, self.num_atoms, sigma0)
+        self.advantage_hidden = NoisyLinear(256, 128, sigma0)
+        self.advantage_out = NoisyLinear(128, output_dim * self.num_atoms, sigma0)
+
+    def noisy_layers(self):
+        return [m for m in self.modules() if isinstance(m, NoisyLinear)]
+
+    def reset_noise(self):
+        for m in self.noisy_layers():
+            m.reset_noise()
+
+    def log_dist(self, state):
+        x = F.relu(self.fc1(state))
+        x = F.relu(self.fc2(x))
+        val = self.value_out(F.relu(self.value_hidden(x))).view(-1, 1, self.num_atoms)
+        adv = self.advantage_out(F.relu(self.advantage_hidden(x))).view(-1, self.output_dim, self.num_atoms)
+        # dueling combination on the logits, one distribution per action
+        return F.log_softmax(val + adv - adv.mean(dim=1, keepdim=True), dim=2)
+
+    def forward(self, state):
+        return (self.log_dist(state).exp() * self.support).sum(dim=2)
+
+
+class RainbowAgent(Agent):
+    """
+    Distributional (C51), noisy-net, dueling double DQN with the Agent
+    interface (select_action / learn / save / load). Exploration comes from
+    the noisy layers, so the epsilon settings are unused.
+    """
+
+    def __init__(self, input_dim, output_dim, config, checkpoint_dir):
+        if config.get('multi_head'):
+            raise ValueError("[Rainbow] multi_head is not supported by the rainbow agent")
+        if config.get('encoder', 'flat') != 'flat':
+            raise ValueError("[Rainbow] only the flat encoder is supported by the rainbow agent")
+        self.num_atoms = config.get('atoms', 51)
+        self.v_min = config.get('v_min', -200.0)
+        self.v_max = config.get('v_max', 1200.0)
+        self.delta_z = (self.v_max - self.v_min) / (self.num_atoms - 1)
+        super(RainbowAgent, self).__init__(input_dim, output_dim, config, checkpoint_dir)
+        self.support = self.online_net.support
+        self.epsilon = 0.0
+
+    def build_network(self, input_dim, output_dim):
+        support = torch.linspace(self.v_min, self.v_max, self.num_atoms)
+        return CategoricalDuelingDQN(input_dim, output_dim, support, self.config.get('noisy_sigma', 0.5))
+
+    def select_action(self, state, is_training=True):
+        """Greedy on the expected return; noisy weights while training, mean weights otherwise."""
+        net = self.online_net
+        if net.training != is_training:
+            net.train(is_training)
+        if is_training:
+            self.steps_done += 1
+            net.reset_noise()
+        with telemetry.span("agent.select_action"), torch.no_grad():
+            state_t = torch.FloatTensor(state).unsqueeze(0).to(self.device)
+            return net(state_t).argmax().item()
+
+    def project(self, next_dist, reward, done, gamma):
+        """
+        Distribution of r + gamma * Z(s') projected onto the support, vectorized
+        over the batch: each shifted atom splits its mass between its two
+        neighbouring support atoms.
+        """
+        batch = next_dist.shape[0]
+        tz = (reward + (1.0 - done) * gamma * self.support.unsqueeze(0)).clamp_(self.v_min, self.v_max)
+        b = (tz - self.v_min) / self.delta_z
+        lower = b.floor().long()
+        upper = b.ceil().long()
+        # an atom landing exactly on the support keeps all its mass
+        lower[(upper > 0) & (lower == upper)] -= 1
+        upper[(lower < self.num_atoms - 1) & (lower == upper)] += 1
+
+        offset = (torch.arange(batch, device=self.device) * self.num_atoms).unsqueeze(1)
+        m = torch.zeros(batch * self.num_atoms, device=self.device)
+        m.index_add_(0, (lower + offset).view(-1), (next_dist * (upper.float() - b)).view(-1))
+        m.index_add_(0, (upper + offset).view(-1), (next_dist * (b - lower.float())).view(-1))
+        return m.view(batch, self.num_atoms)
+
+    def _learn(self, memory):
+        with telemetry.span("agent.sample"):
+            state, action, reward, next_state, done = memory.sample(self.config['batch_size'])
+
+        state = torch.FloatTensor(state).to(self.device)
+        next_state = torch.FloatTensor(next_state).to(self.device)
+        action = torch.LongTensor(action).to(self.device)
+        reward = torch.FloatTensor(reward).unsqueeze(1).to(self.device)
+        done = torch.FloatTensor(done).unsqueeze(1).to(self.device)
+        batch = torch.arange(len(action), device=self.device)
+
+        net = self.online_net
+        if not net.training:
+            net.train()
+        net.reset_noise()
+
+        with torch.no_grad():
+            # Double DQN: online net picks a', target net supplies Z(s', a')
+            next_actions = net(next_state).argmax(1)
+            next_dist = self.target_net.log_dist(next_state).exp()[batch, next_actions]
+            if self.action_discount is None:
+                gamma = self.config['gamma']
+            else:
+                gamma = self.action_discount[action]
+            target = self.project(next_dist, reward, done, gamma)
+
+        log_p = net.log_dist(state)[batch, action]
+        loss = -(target * log_p).sum(dim=1).mean()
+
+        self.optimizer.zero_grad()
+        loss.backward()
+        self.optimizer.step()
+
+        if self.steps_done % self.config['target_update'] == 0:
+            self.target_net.load_state_dict(self.online_net.state_dict())
+
+        return loss.item()
+
+    def reset_network(self):
+        """Fresh weights and noise scales (first slice of a new mode)."""
+        for m in self.online_net.modules():
+            if isinstance(m, (nn.Linear, NoisyLinear)):
+                m.reset_parameters()
+        self.target_net.load_state_dict(self.online_net.state_dict())
@@ -2,6 +2,8 @@ import numpy as np
 import random
 from collections import deque
 
+from core.obs_codec import make_codec, BitArray
+
 class ReplayBuffer:
     def __init__(self, capacity):
         self.buffer = deque(maxlen=capacity)
@@ -21,3 +23,293 @@ class ReplayBuffer:
 
     def __len__(self):
         return len(self.buffer)
+
+
+class FrameReplayBuffer:
+    """
+    Replay storage that keeps each frame once instead of a stacked obs and
+    next_obs per transition (~2 * frame_stack times less memory).
+
+    Row r holds one frame; if it is flagged as a transition, its next frame is
+    row r + 1. Stacks are rebuilt at sample time from the frames of the same
+    episode, repeating the first frame like the env does after reset, so any
+    depth can be sampled. push() has the ReplayBuffer signature; call
+    end_episode() whenever an episode ends, also without `done` (truncation,
+    slice completion, a stalled bridge), so the next episode's stacks never
+    reach back into it.
+
+    codec: "float32" (lossless), "float16" or "int16" (see core/obs_codec.py).
+    Actions (when binary), dones and transition flags are packed bits.
+    """
+
+    def __init__(self, capacity, frame_dim, frame_stack=1, codec="float32", num_actions=2):
+        self.capacity = capacity
+        self.frame_dim = frame_dim
+        self.frame_stack = frame_stack
+        self.codec = make_codec(codec, frame_dim)
+        self.frames = self.codec.alloc(capacity)
+        self.is_transition = BitArray(capacity)
+        self.done = BitArray(capacity)
+        self.action = BitArray(capacity) if num_actions <= 2 else np.zeros(capacity, dtype=np.uint8)
+        self.reward = np.zeros(capacity, dtype=np.float32)
+        # frames since the episode's first frame (stack padding at sample time)
+        self.episode_offset = np.zeros(capacity, dtype=np.uint32)
+        self.t = 0            # frames written so far; row of frame t is t % capacity
+        self.size = 0         # transition rows currently stored
+        self._last = None     # uncompressed pending next frame of a running episode
+
+    def _write_frame(self, frame, episode_offset):
+        r = self.t % self.capacity
+        if self.t >= self.capacity and self.is_transition.get(np.int64(r)):
+            self.size -= 1
+        self.codec.write(self.frames, r, frame)
+        self.is_transition.set(r, False)
+        self.episode_offset[r] = episode_offset
+        self.t += 1
+        return r
+
+    def push(self, state, action, reward, next_state, done):
+        """Save a transition (only the newest frame of each stack is stored)."""
+        frame = np.asarray(state)[-self.frame_dim:]
+        if self._last is not None and np.array_equal(self._last, frame):
+            r = (self.t - 1) % self.capacity
+        else:
+            r = self._write_frame(frame, 0)
+        self.is_transition.set(r, True)
+        if isinstance(self.action, BitArray):
+            self.action.set(r, action)
+        else:
+            self.action[r] = action
+        self.reward[r] = reward
+        self.done.set(r, done)
+        self.size += 1
+
+        next_frame = np.asarray(next_state)[-self.frame_dim:]
+        self._write_frame(next_frame, int(self.episode_offset[r]) + 1)
+        self._last = None if done else next_frame.copy()
+
+    def end_episode(self):
+        """The running episode is over: the next push starts a new one (episode offset 0)."""
+        self._last = None
+
+    def _frame_t(self, rows):
+        newest = self.t - 1
+        return newest - (newest - rows) % self.capacity
+
+    def _stacks(self, rows, frame_t, depth):
+        back = np.minimum(np.arange(depth - 1, -1, -1)[None, :], self.episode_offset[rows][:, None])
+        idx = (frame_t[:, None] - back) % self.capacity
+        return self.codec.read(self.frames, idx.reshape(-1)).reshape(len(rows), depth * self.frame_dim)
+
+    def sample(self, batch_size, frame_stack=None):
+        """Randomly sample a batch of experiences (stacks of `frame_stack` frames)."""
+        depth = frame_stack or self.frame_stack
+        n = min(self.t, self.capacity)
+        oldest = max(0, self.t - self.capacity)
+        rows = np.empty(0, dtype=np.int64)
+        while len(rows) < batch_size:
+            cand = np.random.randint(0, n, size=2 * batch_size)
+            # transitions whose whole stack is still stored
+            first = self._frame_t(cand) - np.minimum(depth - 1, self.episode_offset[cand])
+            rows = np.concatenate([rows, cand[(self.is_transition.get(cand) == 1) & (first >= oldest)]])
+        rows = rows[:batch_size]
+
+        frame_t = self._frame_t(rows)
+        next_rows = (rows + 1) % self.capacity
+        state = self._stacks(rows, frame_t, depth)
+        next_state = self._stacks(next_rows, frame_t + 1, depth)
+        action = self.action.get(rows) if isinstance(self.action, BitArray) else self.action[rows]
+        return (state, action.astype(np.int64), self.reward[rows], next_state,
+                self.done.get(rows).astype(np.float32))
+
+    def nbytes(self):
+        arrays = list(self.frames) + [self.reward, self.episode_offset, self.is_transition.bits,
+                                      self.done.bits, getattr(self.action, "bits", self.action)]
+        return sum(a.nbytes for a in arrays)
+
+    def __len__(self):
+        return self.size
+
+
+class TaggedReplayBuffer:
+    """
+    Transition replay whose rows carry (slice id, player mode, percent) tags,
+    so a batch can be restricted to or mixed by tag.
+
+    Rows live in preallocated arrays written as a ring (oldest overwritten
+    first). Every (slice, mode) pair is a group with a dense member array and
+    each row knows its position in it, so adding, overwriting (swap-remove)
+    and uniform sampling inside a group are O(1) per row, whatever the buffer
+    size. A filtered batch draws a group per sample in proportion to group
+    sizes and then a member: O(batch + groups), exactly uniform over the
+    matching rows. evict_slice() empties a slice's groups in one vectorized
+    pass; its rows become holes the ring refills in turn.
+
+    push() takes the ReplayBuffer arguments plus optional tags (defaults: the
+    slice set by focus(), mode 0, percent 0). sample(batch_size) draws the
+    focus mix: `current_fraction` of the batch from the current slice, the
+    rest from the other slices of the same mode (rehearsal), falling back to
+    whatever exists when one side is empty.
+    """
+
+    def __init__(self, capacity, state_dim, current_fraction=0.8, seed=None):
+        self.capacity = capacity
+        self.state = np.zeros((capacity, state_dim), dtype=np.float32)
+        self.next_state = np.zeros((capacity, state_dim), dtype=np.float32)
+        self.action = np.zeros(capacity, dtype=np.int64)
+        self.reward = np.zeros(capacity, dtype=np.float32)
+        self.done = np.zeros(capacity, dtype=np.float32)
+        self.percent = np.zeros(capacity, dtype=np.float32)
+        self.group = np.full(capacity, -1, dtype=np.int64)   # group id of the row, -1 = empty
+        self.pos = np.zeros(capacity, dtype=np.int64)        # row's index in its group's member array
+        self.t = 0            # rows written so far; next row is t % capacity
+        self.size = 0         # live rows
+
+        self.group_ids = {}   # (slice_id, mode) -> group id
+        self.group_key = []   # group id -> (slice_id, mode)
+        self.members = []     # group id -> int64 rows (first count[g] valid)
+        self.count = []
+
+        self.current_fraction = current_fraction
+        self.current_slice = None
+        self.current_mode = None
+        self.rng = np.random.default_rng(seed)
+        self.last_rows = None  # rows of the latest batch (tags: group_key[group[rows]], percent[rows])
+
+    # TAGS
+    def focus(self, slice_id, mode=None, current_fraction=None):
+        """Tag new rows with `slice_id` and mix future batches around it (mode None: rehearse any mode)."""
+        self.current_slice = slice_id
+        self.current_mode = mode
+        if current_fraction is not None:
+            self.current_fraction = current_fraction
+
+    def _group(self, slice_id, mode):
+        key = (int(slice_id), int(mode))
+        g = self.group_ids.get(key)
+        if g is None:
+            g = self.group_ids[key] = len(self.group_key)
+            self.group_key.append(key)
+            self.members.append(np.empty(64, dtype=np.int64))
+            self.count.append(0)
+        return g
+
+    def _add(self, g, row):
+        c = self.count[g]
+        if c == len(self.members[g]):
+            self.members[g] = np.concatenate([self.members[g], np.empty(c, dtype=np.int64)])
+        self.members[g][c] = row
+        self.pos[row] = c
+        self.group[row] = g
+        self.count[g] = c + 1
+
+    def _remove(self, row):
+        g = self.group[row]
+        c = self.count[g] - 1
+        p = self.pos[row]
+        last = self.members[g][c]
+        self.members[g][p] = last
+        self.pos[last] = p
+        self.count[g] = c
+        self.group[row] = -1
+
+    def push(self, state, action, reward, next_state, done, slice_id=None, mode=0, percent=0.0):
+        """Save a transition tagged with its slice (default: the focused one), mode and percent."""
+        if slice_id is None:
+            slice_id = -1 if self.current_slice is None else self.current_slice
+        row = self.t % self.capacity
+        if self.group[row] >= 0:
+            self._remove(row)
+        else:
+            self.size += 1
+        self.state[row] = state
+        self.next_state[row] = next_state
+        self.action[row] = action
+        self.reward[row] = reward
+        self.done[row] = done
+        self.percent[row] = percent
+        self._add(self._group(slice_id, mode), row)
+        self.t += 1
+
+    def evict_slice(self, slice_id):
+        """Drop every transition of a slice. Returns the number of rows freed."""
+        freed = 0
+        for g, (sid, _) in enumerate(self.group_key):
+            if sid == slice_id and self.count[g]:
+                rows = self.members[g][:self.count[g]]
+                self.group[rows] = -1
+                freed += self.count[g]
+                self.count[g] = 0
+        self.size -= freed
+        return freed
+
+    # SAMPLING
+    def groups(self, slice_id=None, mode=None, exclude_slice=None):
+        """Ids of the non-empty groups matching the filters."""
+        return [g for g, (sid, m) in enumerate(self.group_key)
+                if self.count[g] and (slice_id is None or sid == slice_id) and (mode is None or m == mode)
+                and sid != exclude_slice]
+
+    def count_rows(self, groups):
+        return sum(self.count[g] for g in groups)
+
+    def sample_rows(self, n, groups):
+        """n rows drawn uniformly (with replacement) from the union of `groups`."""
+        counts = np.array([self.count[g] for g in groups], dtype=np.int64)
+        ends = np.cumsum(counts)
+        if n <= 0 or not len(groups) or ends[-1] == 0:
+            return np.empty(0, dtype=np.int64)
+        u = self.rng.integers(0, ends[-1], size=n)
+        which = np.searchsorted(ends, u, side="right")
+        offset = u - (ends[which] - counts[which])
+        rows = np.empty(n, dtype=np.int64)
+        for i in np.unique(which):
+            sel = which == i
+            rows[sel] = self.members[groups[i]][offset[sel]]
+        return rows
+
+    def _mix_rows(self, batch_size):
+        current = self.groups(slice_id=self.current_slice)
+        rehearsal = self.groups(mode=self.current_mode, exclude_slice=self.current_slice)
+        current_rows = self.count_rows(current)
+        # a just-focused slice with a handful of rows must not fill 80% of every batch with copies
+        n_current = min(int(round(batch_size * self.current_fraction)), current_rows)
+        if not self.count_rows(rehearsal):
+            # nothing of this mode to rehearse: the current slice once it fills a batch, else everything
+            if current_rows >= batch_size:
+                n_current = batch_size
+            else:
+                n_current, rehearsal = 0, self.groups()
+        return np.concatenate([self.sample_rows(n_current, current),
+                               self.sample_rows(batch_size - n_current, rehearsal)])
+
+    def sample(self, batch_size, slice_id=None, mode=None):
+        """
+        Randomly sample a batch of experiences. With a slice_id or mode the
+        batch is uniform over the matching rows only; without, it is the focus
+        mix (uniform over everything before the first focus()).
+        """
+        if slice_id is not None or mode is not None:
+            rows = self.sample_rows(batch_size, self.groups(slice_id, mode))
+        elif self.current_slice is not None:
+            rows = self._mix_rows(batch_size)
+        else:
+            rows = self.sample_rows(batch_size, self.groups())
+        if len(rows) < batch_size:
+            raise ValueError(f"[Replay] No stored transitions match slice={slice_id} mode={mode}")
+        self.last_rows = rows
+        return self.state[rows], self.action[rows], self.reward[rows], self.next_state[rows], self.done[rows]
+
+    def summary(self):
+        """'[Replay] ...' line: live rows per slice and mode."""
+        per = ", ".join(f"S{sid}/{'ship' if m else 'cube'} {self.count[g]:,}"
+                        for g, (sid, m) in sorted(enumerate(self.group_key), key=lambda x: x[1]) if self.count[g])
+        return f"[Replay] {self.size:,}/{self.capacity:,} transitions | {per or 'empty'}"
+
+    def nbytes(self):
+        arrays = [self.state, self.next_state, self.action, self.reward, self.done, self.percent,
+                  self.group, self.pos] + self.members
+        return sum(a.nbytes for a in arrays)
+
+    def __len__(self):
+        return self.size
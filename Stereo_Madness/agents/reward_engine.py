@@ -0,0 +1,239 @@
+import numpy as np
+
+from agents.expert_ship import ShipExpert
+
+
+class CubeRewardParams:
+    """
+    Compiled Cube shaping parameters.
+    Defaults mirror CubeExpert.get_reward exactly.
+    """
+
+    __slots__ = (
+        "progress_scale", "step_penalty", "jump_penalty", "spam_jump_penalty",
+        "clearance_bonus", "hazard_proximity_threshold", "landing_bonus",
+        "hazards_cleaned_count",
+    )
+
+    def __init__(self, reward_context=None):
+        ctx = reward_context or {}
+        self.progress_scale = float(ctx.get("progress_scale", 20.0))
+        self.step_penalty = float(ctx.get("step_penalty", 0.0001))
+        self.jump_penalty = float(ctx.get("jump_penalty", 0.0005))
+        self.spam_jump_penalty = float(ctx.get("spam_jump_penalty", 0.001))
+        self.clearance_bonus = float(ctx.get("clearance_bonus", 0.01))
+        self.hazard_proximity_threshold = float(ctx.get("hazard_proximity_threshold", 30.0))
+        self.landing_bonus = float(ctx.get("landing_bonus", 20))
+        self.hazards_cleaned_count = int(ctx.get("hazards_cleaned_count", 0))
+
+
+class ShipRewardParams:
+    """
+    Compiled Ship shaping parameters.
+    Defaults mirror ShipExpert.get_reward exactly.
+    """
+
+    __slots__ = (
+        "progress_scale", "step_penalty", "thrust_penalty", "spam_thrust_penalty",
+        "vertical_stability_bonus", "clearance_bonus", "hazard_proximity_threshold",
+        "death_penalty",
+    )
+
+    def __init__(self, reward_context=None):
+        ctx = reward_context or {}
+        self.progress_scale = float(ctx.get("progress_scale", 20.0))
+        self.step_penalty = float(ctx.get("step_penalty", 0.0001))
+        self.thrust_penalty = float(ctx.get("thrust_penalty", 0.0003))
+        self.spam_thrust_penalty = float(ctx.get("spam_thrust_penalty", 0.0005))
+        self.vertical_stability_bonus = float(ctx.get("vertical_stability_bonus", 0.01))
+        self.clearance_bonus = float(ctx.get("clearance_bonus", 0.005))
+        self.hazard_proximity_threshold = float(ctx.get("hazard_proximity_threshold", 30.0))
+        self.death_penalty = float(ctx.get("death_penalty", 5.0))
+
+
+class RewardParams:
+    """
+    Everything GeometryDashEnv needs to score a frame, parsed once.
+
+    `reward_context` is the dict historically passed to env.step (Cube shaping
+    keys + terminal `death_penalty`). The Ship expert never received that
+    context from the env, so it is compiled from its own (default: empty) dict.
+    """
+
+    __slots__ = ("cube", "ship", "death_penalty", "finish_bonus")
+
+    def __init__(self, reward_context=None, ship_context=None):
+        ctx = reward_context or {}
+        self.cube = CubeRewardParams(ctx)
+        self.ship = ShipRewardParams(ship_context)
+        self.death_penalty = float(ctx.get("death_penalty", -100.0))
+        self.finish_bonus = 1000.0
+
+
+def compile_reward_config(reward_context=None, ship_context=None):
+    """Parse a reward config dict once into a RewardParams struct."""
+    return RewardParams(reward_context, ship_context)
+
+
+# SCALAR PATH (one frame, used inside GeometryDashEnv.step)
+
+def cube_reward(p, percent, prev_percent, action, prev_action, dist, prev_dist):
+    """Same arithmetic as CubeExpert.get_reward for a SharedState frame."""
+    reward = 0.0
+
+    progress_delta = percent - prev_percent
+    if progress_delta > 0:
+        reward += progress_delta * p.progress_scale
+
+    reward -= p.step_penalty
+
+    if action != 0:
+        reward -= p.jump_penalty
+        if prev_action == 1:
+            reward -= p.spam_jump_penalty
+
+    if prev_dist is not None:
+        if dist > prev_dist and prev_dist < p.hazard_proximity_threshold:
+            reward += p.clearance_bonus
+
+    return reward
+
+
+def ship_reward(p, percent, prev_percent, action, prev_action):
+    """Same arithmetic as ShipExpert.get_reward for a SharedState frame."""
+    reward = 0.0
+
+    progress_delta = percent - prev_percent
+    if progress_delta > 0:
+        reward += progress_delta * p.progress_scale
+
+    reward -= p.step_penalty
+
+    if action != 0:
+        reward -= p.thrust_penalty
+        if prev_action == 1:
+            reward -= p.spam_thrust_penalty
+
+    return max(min(reward, 10.0), -10.0)
+
+
+def frame_reward(params, state, action, prev_action, prev_percent, prev_dist, slice_end=None):
+    """
+    Reward for one game frame, equivalent to GeometryDashEnv._calculate_reward
+    followed by the expert call, without re-parsing any config.
+    """
+    if state.is_dead:
+        return params.death_penalty
+    percent = state.percent
+    if slice_end is not None and percent >= slice_end:
+        return params.finish_bonus
+
+    mode = state.player_mode
+    if mode == 0:
+        return cube_reward(
+            params.cube, percent, prev_percent, action, prev_action,
+            state.dist_nearest_hazard, prev_dist
+        )
+    if mode == 1:
+        # The env never forwarded context (prev_action included) to the Ship expert
+        return ship_reward(params.ship, percent, prev_percent, action, None)
+    return 0.0
+
+
+# BATCH PATH (arrays of frames, used for relabeling and benchmarks)
+# Missing values: prev_action = -1 (None), prev_dist = NaN (None).
+
+def cube_reward_batch(p, percent, prev_percent, action, prev_action, dist, prev_dist,
+                      dy_block=None, dy_player=None, dy_hazard=None):
+    """
+    Vectorized CubeExpert.get_reward. Optional `dy_*` arrays enable the landing
+    and hazard-cleaning terms (SharedState does not carry them, so the live env
+    never triggers them). Every row is scored independently with the compiled
+    `hazards_cleaned_count`, like separate get_reward calls on copied contexts.
+    """
+    percent = np.asarray(percent, dtype=np.float64)
+    prev_percent = np.asarray(prev_percent, dtype=np.float64)
+    action = np.asarray(action)
+    prev_action = np.asarray(prev_action)
+    dist = np.asarray(dist, dtype=np.float64)
+    prev_dist = np.asarray(prev_dist, dtype=np.float64)
+
+    progress_delta = percent - prev_percent
+    reward = np.where(progress_delta > 0, progress_delta * p.progress_scale, 0.0)
+    reward = reward - p.step_penalty
+
+    jumping = action != 0
+    reward = reward - np.where(jumping, p.jump_penalty, 0.0)
+    reward = reward - np.where(jumping & (prev_action == 1), p.spam_jump_penalty, 0.0)
+
+    # NaN prev_dist compares False, matching the `is not None` guard
+    cleared = (dist > prev_dist) & (prev_dist < p.hazard_proximity_threshold)
+    reward = reward + np.where(cleared, p.clearance_bonus, 0.0)
+
+    if dy_block is not None and dy_player is not None:
+        landed = np.asarray(dy_block) > np.asarray(dy_player)
+        reward = reward + np.where(landed, p.landing_bonus, 0.0)
+
+    if dy_hazard is not None:
+        crossed = (prev_dist > 0) & (dist <= 0) & (np.abs(np.asarray(dy_hazard)) <= 20)
+        cleaning_reward = min(10 + (p.hazards_cleaned_count * 10), 50)
+        reward = reward + np.where(crossed, cleaning_reward, 0.0)
+
+    return reward
+
+
+def ship_reward_batch(p, percent, prev_percent, action, prev_action, dist=None, prev_dist=None,
+                      y=None, dead=None):
+    """
+    Vectorized ShipExpert.get_reward. `y`/`dead` and the hazard distances are
+    optional for the same reason as the Cube `dy_*` terms.
+    """
+    percent = np.asarray(percent, dtype=np.float64)
+    prev_percent = np.asarray(prev_percent, dtype=np.float64)
+    action = np.asarray(action)
+    prev_action = np.asarray(prev_action)
+
+    progress_delta = percent - prev_percent
+    reward = np.where(progress_delta > 0, progress_delta * p.progress_scale, 0.0)
+    reward = reward - p.step_penalty
+
+    thrusting = action != 0
+    reward = reward - np.where(thrusting, p.thrust_penalty, 0.0)
+    reward = reward - np.where(thrusting & (prev_action == 1), p.spam_thrust_penalty, 0.0)
+
+    if y is not None:
+        dy_center = np.asarray(y, dtype=np.float64) - ShipExpert.SHIP_CENTER_Y
+        reward = reward + p.vertical_stability_bonus * np.maximum(0.0, 1.0 - np.abs(dy_center) / 80.0)
+
+    if dist is not None and prev_dist is not None:
+        dist = np.asarray(dist, dtype=np.float64)
+        prev_dist = np.asarray(prev_dist, dtype=np.float64)
+        cleared = (dist > prev_dist) & (prev_dist < p.hazard_proximity_threshold)
+        reward = reward + np.where(cleared, p.clearance_bonus, 0.0)
+
+    if dead is not None:
+        reward = reward - np.where(np.asarray(dead) != 0, p.death_penalty, 0.0)
+
+    return np.clip(reward, -10.0, 10.0)
+
+
+def frame_reward_batch(params, percent, prev_percent, action, prev_action, dist, prev_dist,
+                       mode, is_dead, slice_end=None):
+    """
+    Vectorized frame_reward over N frames (frames of one run, or one frame of N
+    envs). `slice_end` may be a scalar or per-frame array; None/NaN = no slice.
+    Returns float64 rewards of shape (N,).
+    """
+    percent = np.asarray(percent, dtype=np.float64)
+    mode = np.asarray(mode)
+    is_dead = np.asarray(is_dead) != 0
+
+    cube = cube_reward_batch(params.cube, percent, prev_percent, action, prev_action, dist, prev_dist)
+    ship = ship_reward_batch(params.ship, percent, prev_percent, action, -1)
+    reward = np.where(mode == 0, cube, np.where(mode == 1, ship, 0.0))
+
+    if slice_end is not None:
+        finished = percent >= np.asarray(slice_end, dtype=np.float64)
+        reward = np.where(finished, params.finish_bonus, reward)
+
+    return np.where(is_dead, params.death_penalty, reward)
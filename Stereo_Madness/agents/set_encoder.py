@@ -0,0 +1,91 @@
+"""
+Permutation-invariant encoder for the object slots of an observation.
+
+normalize_state emits 30 object slots, padded (dx 9999, type -1) when fewer
+objects are near, and DuelingDQN.fc1 mixes all of them by slot position.
+ObjectSetEncoder treats a frame's objects as a set instead: the occupied
+slots of the whole batch are gathered into one packed (K, 5) tensor, a
+shared per-object MLP embeds only those K rows, and a masked pooling (max,
+or one-query attention) reduces each frame's objects to one vector. Empty
+frames pool to zeros. SetDuelingDQN feeds [player features, pooled objects]
+of every stacked frame to the usual fc1/fc2 trunk and dueling head.
+
+Select it with OBS_ENCODER = "set" in config.py (flat DuelingDQN otherwise).
+"""
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+from config import INPUT_DIM
+from agents.ddqn import DuelingHead
+
+PLAYER_FEATURES = 4
+OBJECT_FEATURES = 5
+EMPTY_DX = 9.0      # normalized dx of the padding slots (9999 / 1000)
+
+
+def object_mask(objects):
+    """(..., slots) bool: slot holds an object (not the mod's padding)."""
+    return (objects[..., 4] >= 0.0) & (objects[..., 0] < EMPTY_DX)
+
+
+class ObjectSetEncoder(nn.Module):
+    def __init__(self, embed_dim=64, pooling="max"):
+        super(ObjectSetEncoder, self).__init__()
+        if pooling not in ("max", "attention"):
+            raise ValueError(f"[SetEncoder] Unknown pooling '{pooling}'")
+        self.embed_dim = embed_dim
+        self.pooling = pooling
+        self.phi = nn.Sequential(
+            nn.Linear(OBJECT_FEATURES, embed_dim), nn.ReLU(),
+            nn.Linear(embed_dim, embed_dim), nn.ReLU(),
+        )
+        if pooling == "attention":
+            self.score = nn.Linear(embed_dim, 1)
+
+    def forward(self, objects):
+        """(N, slots, 5) object slots -> (N, embed_dim)."""
+        n = objects.shape[0]
+        if n == 1 and self.pooling == "max":
+            # single decision: plain boolean indexing, no scatter
+            h = self.phi(objects[0][object_mask(objects[0])])
+            return h.amax(0, keepdim=True) if h.shape[0] else h.new_zeros(1, self.embed_dim)
+        rows, slots = object_mask(objects).nonzero(as_tuple=True)
+        h = self.phi(objects[rows, slots])                      # occupied slots only
+        pooled = h.new_zeros(n, self.embed_dim)
+        if self.pooling == "max":
+            # embeddings are >= 0 (ReLU), so zeros are a neutral start and the empty-set value
+            return pooled.scatter_reduce(0, rows.unsqueeze(1).expand_as(h), h, "amax")
+        # softmax over each frame's objects
+        score = self.score(h).squeeze(1)
+        top = score.new_full((n,), float("-inf")).scatter_reduce(0, rows, score.detach(), "amax")
+        w = torch.exp(score - top[rows])
+        total = score.new_zeros(n).index_add(0, rows, w)
+        pooled = pooled.index_add(0, rows, w.unsqueeze(1) * h)
+        return pooled / total.clamp_min(1e-9).unsqueeze(1)
+
+
+class SetDuelingDQN(nn.Module):
+    """DuelingDQN with the flat object slots replaced by ObjectSetEncoder (per stacked frame)."""
+
+    def __init__(self, input_dim, output_dim, frame_dim=INPUT_DIM, embed_dim=64, pooling="max"):
+        super(SetDuelingDQN, self).__init__()
+        if input_dim % frame_dim:
+            raise ValueError(f"[SetEncoder] input_dim {input_dim} is not a multiple of the frame size {frame_dim}")
+        self.frame_dim = frame_dim
+        self.frames = input_dim // frame_dim
+        self.num_slots = (frame_dim - PLAYER_FEATURES) // OBJECT_FEATURES
+
+        self.encoder = ObjectSetEncoder(embed_dim, pooling)
+        self.fc1 = nn.Linear(self.frames * (PLAYER_FEATURES + embed_dim), 256)
+        self.fc2 = nn.Linear(256, 256)
+        self.head = DuelingHead(output_dim)
+
+    def forward(self, state):
+        batch = state.shape[0]
+        frames = state.reshape(batch * self.frames, self.frame_dim)
+        objects = frames[:, PLAYER_FEATURES:].reshape(-1, self.num_slots, OBJECT_FEATURES)
+        x = torch.cat([frames[:, :PLAYER_FEATURES], self.encoder(objects)], dim=1).reshape(batch, -1)
+        x = F.relu(self.fc1(x))
+        x = F.relu(self.fc2(x))
+        return self.head(x)
@@ -0,0 +1,236 @@
+"""
+Learned one-step world model and Dyna-style imagined replay.
+
+WorldModel maps (observation, action) to the next observation (as a delta),
+the reward and a termination logit. It is trained on batches of the real
+replay buffer, so it covers whatever observations the agent stores
+(normalize_state frames, stacked or not).
+
+ModelBasedReplay wraps the real buffer and is passed to agent.learn in its
+place. push() stores real transitions; every `rollout_every` real steps a
+round of short rollouts (`horizon` steps from `rollouts` real start states,
+epsilon-greedy on the online network, all rows batched) fills a small
+imagined ring; sample() draws `imagined_fraction` of each batch from it.
+on_step(), called once per real step after agent.learn, trains the model
+and runs `extra_updates` more agent.learn calls, which is where imagination
+saves live frames.
+
+The one-step error is measured on the latest real transitions before the
+model trains on them (state error per feature over the variance of the
+true deltas, averaged; reward MAE; termination accuracy). 1.0 is no
+better than predicting the mean change. Above `max_error` imagination
+pauses and batches are all real until the model recovers.
+
+Enable with WORLD_MODEL = True in config.py.
+"""
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+from config import (WORLD_MODEL_IMAGINED_FRACTION, WORLD_MODEL_HORIZON, WORLD_MODEL_ROLLOUTS,
+                    WORLD_MODEL_ROLLOUT_EVERY, WORLD_MODEL_TRAIN_EVERY, WORLD_MODEL_EXTRA_UPDATES,
+                    WORLD_MODEL_MAX_ERROR)
+
+REWARD_SCALE = 10.0   # rewards span -100 (death) ... 1000 (finish); the reward head predicts r / REWARD_SCALE
+
+
+class WorldModel(nn.Module):
+    def __init__(self, state_dim, num_actions, hidden=256):
+        super(WorldModel, self).__init__()
+        self.num_actions = num_actions
+        self.fc1 = nn.Linear(state_dim + num_actions, hidden)
+        self.fc2 = nn.Linear(hidden, hidden)
+        self.delta = nn.Linear(hidden, state_dim)
+        self.reward = nn.Linear(hidden, 1)
+        self.done = nn.Linear(hidden, 1)
+        # inputs and deltas are standardized: dx spans ~0-10 while vel_y moves by ~0.01 per step
+        for name in ("state_mean", "delta_mean"):
+            self.register_buffer(name, torch.zeros(state_dim))
+        for name in ("state_std", "delta_std"):
+            self.register_buffer(name, torch.ones(state_dim))
+        self.normalizer_ready = False
+
+    @torch.no_grad()
+    def update_normalizer(self, state, next_state, momentum=0.9):
+        """Blend the feature statistics of a real batch into the standardization."""
+        delta = next_state - state
+        stats = (state.mean(0), state.std(0) + 1e-3, delta.mean(0), delta.std(0) + 1e-3)
+        for buf, value in zip((self.state_mean, self.state_std, self.delta_mean, self.delta_std), stats):
+            buf.copy_(buf * momentum + value * (1 - momentum) if self.normalizer_ready else value)
+        self.normalizer_ready = True
+
+    def _heads(self, state, action):
+        x = torch.cat([(state - self.state_mean) / self.state_std,
+                       F.one_hot(action, self.num_actions).float()], dim=1)
+        x = F.relu(self.fc1(x))
+        x = F.relu(self.fc2(x))
+        return self.delta(x), self.reward(x).squeeze(1), self.done(x).squeeze(1)
+
+    def forward(self, state, action):
+        """(N, state_dim), (N,) long -> next state, reward, termination logit."""
+        delta, reward, done_logit = self._heads(state, action)
+        return state + delta * self.delta_std + self.delta_mean, reward * REWARD_SCALE, done_logit
+
+    def loss(self, state, action, reward, next_state, done):
+        delta, reward_pred, done_logit = self._heads(state, action)
+        return (F.mse_loss(delta, (next_state - state - self.delta_mean) / self.delta_std)
+                + F.smooth_l1_loss(reward_pred, reward / REWARD_SCALE)
+                + F.binary_cross_entropy_with_logits(done_logit, done))
+
+
+class ModelBasedReplay:
+    def __init__(self, memory, agent, state_dim, num_actions, imagined_fraction=WORLD_MODEL_IMAGINED_FRACTION,
+                 horizon=WORLD_MODEL_HORIZON, rollouts=WORLD_MODEL_ROLLOUTS, rollout_every=WORLD_MODEL_ROLLOUT_EVERY,
+                 train_every=WORLD_MODEL_TRAIN_EVERY, extra_updates=WORLD_MODEL_EXTRA_UPDATES,
+                 max_error=WORLD_MODEL_MAX_ERROR, model_batch=128, lr=1e-3, rounds_kept=4):
+        self.memory = memory
+        self.agent = agent
+        self.device = agent.device
+        self.model = WorldModel(state_dim, num_actions).to(self.device)
+        self.optimizer = torch.optim.Adam(self.model.parameters(), lr=lr)
+        self.imagined_fraction = imagined_fraction
+        self.horizon = horizon
+        self.rollouts = rollouts
+        self.rollout_every = rollout_every
+        self.train_every = train_every
+        self.extra_updates = extra_updates
+        self.max_error = max_error
+        self.model_batch = model_batch
+
+        # imagined ring: the last `rounds_kept` rollout rounds
+        capacity = rollouts * horizon * rounds_kept
+        self.img_state = np.zeros((capacity, state_dim), dtype=np.float32)
+        self.img_next = np.zeros((capacity, state_dim), dtype=np.float32)
+        self.img_action = np.zeros(capacity, dtype=np.int64)
+        self.img_reward = np.zeros(capacity, dtype=np.float32)
+        self.img_done = np.zeros(capacity, dtype=np.float32)
+        self.img_t = 0
+        self.img_size = 0
+
+        # latest real transitions, scored before the model trains on them
+        self.recent = []
+        self.steps = 0
+        self.model_updates = 0
+        self.rounds = 0
+        self.error = None     # {'state': normalized mse, 'reward': mae, 'done': accuracy}
+        self.trusted = False
+
+    # REAL DATA
+    def push(self, state, action, reward, next_state, done, **tags):
+        """Save a real transition (tags go to the wrapped buffer, e.g. TaggedReplayBuffer)."""
+        self.memory.push(state, action, reward, next_state, done, **tags)
+        if len(self.recent) < self.rollout_every:
+            self.recent.append((state, action, reward, next_state, done))
+
+    def end_episode(self):
+        """Forwarded to the wrapped buffer when it tracks episodes (FrameReplayBuffer)."""
+        if hasattr(self.memory, "end_episode"):
+            self.memory.end_episode()
+
+    def __len__(self):
+        return len(self.memory)
+
+    def _tensors(self, state, action, reward, next_state, done):
+        to = lambda a, dtype=torch.float32: torch.as_tensor(np.asarray(a), dtype=dtype, device=self.device)
+        return to(state), to(action, torch.long), to(reward), to(next_state), to(done)
+
+    # MODEL
+    def train_model(self):
+        batch = self._tensors(*self.memory.sample(self.model_batch))
+        if not self.model.normalizer_ready:
+            self.model.update_normalizer(batch[0], batch[3])
+        loss = self.model.loss(*batch)
+        self.optimizer.zero_grad()
+        loss.backward()
+        self.optimizer.step()
+        self.model_updates += 1
+        return loss.item()
+
+    @torch.no_grad()
+    def evaluate(self, transitions):
+        """One-step errors of the model on real transitions."""
+        state, action, reward, next_state, done = self._tensors(*map(np.stack, zip(*transitions)))
+        pred_next, pred_reward, done_logit = self.model(state, action)
+        # per-feature squared error over the variance of the true deltas, averaged over moving features
+        var = (next_state - state).var(0, unbiased=False)
+        moving = var > 1e-6
+        state_err = ((pred_next - next_state).pow(2).mean(0)[moving] / var[moving]).mean()
+        return {'state': state_err.item(),
+                'reward': (pred_reward - reward).abs().mean().item(),
+                'done': ((done_logit > 0).float() == done).float().mean().item()}
+
+    # IMAGINATION
+    @torch.no_grad()
+    def _policy(self, state):
+        net = self.agent.online_net
+        action = net(state).argmax(1)
+        # noisy networks (rainbow) explore through their weights
+        epsilon = 0.0 if hasattr(net, "reset_noise") else self.agent.epsilon
+        explore = torch.rand(len(action), device=self.device) < epsilon
+        return torch.where(explore, torch.randint_like(action, self.model.num_actions), action)
+
+    @torch.no_grad()
+    def imagine(self):
+        """One round of batched `horizon`-step rollouts from real start states."""
+        state, _, _, next_state, _ = self._tensors(*self.memory.sample(self.rollouts))
+        self.model.update_normalizer(state, next_state)
+        for _ in range(self.horizon):
+            action = self._policy(state)
+            next_state, reward, done_logit = self.model(state, action)
+            done = (done_logit > 0).float()
+            self._store(state, action, reward, next_state, done)
+            alive = done == 0
+            if not alive.any():
+                break
+            state = next_state[alive]
+        self.rounds += 1
+
+    def _store(self, state, action, reward, next_state, done):
+        n = len(action)
+        rows = (self.img_t + np.arange(n)) % len(self.img_action)
+        self.img_state[rows] = state.cpu().numpy()
+        self.img_next[rows] = next_state.cpu().numpy()
+        self.img_action[rows] = action.cpu().numpy()
+        self.img_reward[rows] = reward.cpu().numpy()
+        self.img_done[rows] = done.cpu().numpy()
+        self.img_t += n
+        self.img_size = min(self.img_size + n, len(self.img_action))
+
+    # TRAINING
+    def sample(self, batch_size):
+        """Real batch with `imagined_fraction` replaced by imagined transitions while the model is trusted."""
+        n_img = int(round(batch_size * self.imagined_fraction)) if self.trusted and self.img_size else 0
+        real = self.memory.sample(batch_size - n_img)
+        if not n_img:
+            return real
+        rows = np.random.randint(0, self.img_size, size=n_img)
+        img = (self.img_state[rows], self.img_action[rows], self.img_reward[rows],
+               self.img_next[rows], self.img_done[rows])
+        return tuple(np.concatenate([np.asarray(r, dtype=i.dtype), i]) for r, i in zip(real, img))
+
+    def on_step(self):
+        """After agent.learn on a real step: model update, rollout round, extra agent updates."""
+        self.steps += 1
+        if len(self.memory) < max(self.model_batch, self.rollouts):
+            return
+        if self.steps % self.rollout_every == 0 and self.recent:
+            self.error = self.evaluate(self.recent)
+            self.recent = []
+            self.trusted = self.error['state'] < self.max_error
+            if self.trusted:
+                self.imagine()
+        if self.steps % self.train_every == 0:
+            self.train_model()
+        if self.trusted:
+            for _ in range(self.extra_updates):
+                self.agent.learn(self)
+
+    def summary(self):
+        """'[WorldModel] ...' line: latest one-step errors and imagination state."""
+        if self.error is None:
+            return f"[WorldModel] warming up | {self.model_updates} model updates"
+        e = self.error
+        return (f"[WorldModel] state err {e['state']:.3f} | reward MAE {e['reward']:.3f} | "
+                f"done acc {e['done'] * 100:.1f}% | {'imagining' if self.trusted else 'paused (real only)'} | "
+                f"{self.rounds} rounds, {self.img_size:,} imagined | {self.model_updates} model updates")
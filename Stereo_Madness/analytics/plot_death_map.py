@@ -3,14 +3,16 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import os
 from config import DEATH_LOG, PROJECT_NAME
+from curriculum.discovery import danger_zones, load_episodes, progress_histogram
 
 def generate_death_heatmap():
     if not os.path.exists(DEATH_LOG):
         print("No death logs found yet. Keep training!")
         return
 
-    # Load Data
+    # Load Data (one row per episode; plot the deaths)
     df = pd.read_csv(DEATH_LOG)
+    df = df[df['died'] == 1]
     if df.empty: return
 
     # Setup Plot
@@ -19,20 +21,16 @@ def generate_death_heatmap():
     
     # Plot Density (The "Glow")
     # This creates a smooth 'mountain' showing where deaths cluster
-    sns.kdeplot(data=df, x='Percent', fill=True, color='#ff0033', alpha=0.5, linewidth=2)
+    sns.kdeplot(data=df, x='percent', fill=True, color='#ff0033', alpha=0.5, linewidth=2)
     
     # Plot Rug (Individual Death Points)
     # Tiny lines at the bottom for every single crash
-    sns.rugplot(data=df, x='Percent', color='#ff0033', alpha=.2)
+    sns.rugplot(data=df, x='percent', color='#ff0033', alpha=.2)
 
-    # Highlight "The Gauntlet" (Stereo Madness Triple Spikes ~65-70% & 80-90%)
-    danger_zones = [
-        (13, 15, "First Spikes"),
-        (64, 68, "Triple Spike 1"),
-        (82, 88, "Final Gauntlet")
-    ]
+    # Highlight the deadliest stretches (death rate per attempt, see curriculum/discovery.py)
+    visits, deaths = progress_histogram(load_episodes([DEATH_LOG]))
     
-    for start, end, label in danger_zones:
+    for start, end, label in danger_zones(visits, deaths):
         ax.axvspan(start, end, color='yellow', alpha=0.1)
         ax.text((start+end)/2, ax.get_ylim()[1]*0.9, label, 
                 color='yellow', ha='center', fontsize=9, fontweight='bold')
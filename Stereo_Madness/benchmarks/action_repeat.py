@@ -0,0 +1,124 @@
+"""
+Fixed frame skip vs agent-chosen action repeat on the simulated level.
+
+The same scripted cube controller plays every cube slice twice:
+  fixed     one decision every --frame-skip frames (main.py's setup)
+  adaptive  GeometryDashEnv(action_repeats=...): release for the longest
+            repeat that still ends before the next obstacle, single frames
+            near it
+and we report slices cleared, decisions per slice/level and env frames/sec.
+Ship slices are skipped (the script only knows how to jump). JUMP_DX is
+tuned for frame-precise timing; with a fixed skip the jump can start up to
+skip-1 frames late, which is the reaction limit action repeat removes.
+
+Usage (from Stereo_Madness/):
+    python -m benchmarks.action_repeat --repeats 1 2 4 8 --attempts 5
+"""
+import argparse
+import time
+import numpy as np
+
+from config import *
+from core.environment import GeometryDashEnv
+from core.sim_game import (SimBridge, SimulatedGame, SimulatedLevel, CUBE_GRAVITY, GROUND_Y, SPEED,
+                           SPIKE, BLOCK)
+
+JUMP_DX = 36.0   # px between the player's front and an obstacle when the script jumps
+
+
+def nearest_obstacle(obs):
+    """Distance (px) to the closest spike/block ahead in the newest frame, inf if none."""
+    frame = obs[-INPUT_DIM:]
+    dx = frame[4::5] * 1000.0
+    kind = np.rint(frame[8::5] * 10.0)
+    ahead = dx[((kind == SPIKE) | (kind == BLOCK)) & (dx > 0)]
+    return float(ahead.min()) if ahead.size else float("inf")
+
+
+def frames_to_land(obs):
+    """Frames until a jump comes back down to block height (nothing to decide before that)."""
+    frame = obs[-INPUT_DIM:]
+    y, vy = frame[1] * 900.0, frame[0] * 30.0
+    t = 0
+    while y > GROUND_Y + 30.0 or vy > 0:
+        vy -= CUBE_GRAVITY
+        y += vy
+        t += 1
+    return t
+
+
+def fixed_policy(obs):
+    on_ground = obs[-INPUT_DIM + 2] > 0.5
+    return int(on_ground and nearest_obstacle(obs) < JUMP_DX)
+
+
+def adaptive_policy(repeats):
+    """Action index for GeometryDashEnv(action_repeats=repeats)."""
+    index = {r: k for k, r in enumerate(repeats)}
+    shortest = min(repeats)
+
+    def policy(obs):
+        if fixed_policy(obs):
+            return 2 * index[shortest] + 1
+        if obs[-INPUT_DIM + 2] < 0.5:
+            lead = frames_to_land(obs)
+        else:
+            # frames until the obstacle reaches the jump distance
+            lead = (nearest_obstacle(obs) - JUMP_DX) / SPEED
+        fits = [r for r in repeats if r <= lead]
+        return 2 * index[max(fits) if fits else shortest]
+    return policy
+
+
+def run(env, bridge, policy, level, attempts):
+    cube = [s for s in level.slices if s.get('mode', 0) == 0]
+    cleared = decisions = frames = 0
+    t0 = time.perf_counter()
+    for s in cube:
+        bridge.send_checkpoint(s['start'])
+        for _ in range(attempts):
+            obs, info = env.reset()
+            while True:
+                obs, _, terminated, _, info = env.step(policy(obs))
+                decisions += 1
+                frames += info['frames']
+                if terminated or info['percent'] >= s['end']:
+                    break
+            cleared += info['percent'] >= s['end']
+    elapsed = time.perf_counter() - t0
+    runs = len(cube) * attempts
+    return {
+        "cleared": cleared / runs,
+        "decisions_per_slice": decisions / runs,
+        # cube slices cover this share of the level; scale to a whole run
+        "decisions_per_level": decisions / attempts * 100.0 / sum(s['end'] - s['start'] for s in cube),
+        "frames_per_decision": frames / decisions,
+        "frames_per_sec": frames / elapsed,
+        "decisions_per_sec": decisions / elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fixed frame skip vs agent-chosen action repeat")
+    parser.add_argument("--repeats", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--frame-skip", type=int, nargs="*", default=[1, FRAME_SKIP])
+    parser.add_argument("--attempts", type=int, default=5)
+    parser.add_argument("--level-seed", type=int, default=0)
+    args = parser.parse_args()
+
+    level = SimulatedLevel(seed=args.level_seed)
+    setups = [(f"fixed skip {k}", {"frame_skip": k}, fixed_policy) for k in args.frame_skip]
+    setups.append((f"repeat {tuple(args.repeats)}", {"action_repeats": args.repeats, "frame_gamma": FRAME_GAMMA},
+                   adaptive_policy(args.repeats)))
+    for label, env_kwargs, policy in setups:
+        bridge = SimBridge(SimulatedGame(level))
+        env = GeometryDashEnv(bridge=bridge, **env_kwargs)
+        r = run(env, bridge, policy, level, args.attempts)
+        print(f"[Repeat] {label:<24} | cleared {r['cleared'] * 100:5.1f}% | "
+              f"decisions/slice {r['decisions_per_slice']:7.1f} | decisions/level {r['decisions_per_level']:7.0f} | "
+              f"frames/decision {r['frames_per_decision']:4.2f} | env {r['frames_per_sec']:>8,.0f} frames/s "
+              f"{r['decisions_per_sec']:>7,.0f} decisions/s")
+
+
+if __name__ == "__main__":
+    main()
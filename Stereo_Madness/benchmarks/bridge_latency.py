@@ -0,0 +1,90 @@
+"""
+Round-trip step latency (write_action -> read_state of the answering frame)
+per bridge backend.
+
+  inproc  SimBridge, no IPC (lower bound)
+  posix   MemoryBridge over /dev/shm against core.shm_producer in lockstep,
+          one producer process per instance
+
+The windows backend needs the real game and is not driven here.
+
+Usage (from Stereo_Madness/):
+    python -m benchmarks.bridge_latency --steps 20000 --instances 1 4
+"""
+import argparse
+import multiprocessing as mp
+import time
+import numpy as np
+
+from core.memory_bridge import MemoryBridge
+from core.shm_producer import run_producer
+from core.sim_game import SimBridge
+
+
+def measure(bridge, steps, seed=0):
+    rng = np.random.default_rng(seed)
+    actions = (rng.random(steps) < 0.3).astype(int).tolist()
+    lat = np.empty(steps, dtype=np.int64)
+    bridge.send_reset()
+    for i, a in enumerate(actions):
+        t0 = time.perf_counter_ns()
+        bridge.write_action(a)
+        state = bridge.read_state()
+        lat[i] = time.perf_counter_ns() - t0
+        if state.is_dead:
+            bridge.send_reset()
+    return lat
+
+
+def _consumer(instance, steps, out):
+    deadline = time.perf_counter() + 10.0
+    while True:
+        try:
+            bridge = MemoryBridge(instance=instance, backend="posix")
+            break
+        except Exception:
+            if time.perf_counter() > deadline:
+                raise
+            time.sleep(0.05)
+    try:
+        out.put((instance, measure(bridge, steps, seed=instance)))
+    finally:
+        bridge.close()
+
+
+def run_posix(instances, steps):
+    ctx = mp.get_context("spawn")
+    stop = ctx.Event()
+    out = ctx.Queue()
+    producers = [ctx.Process(target=run_producer, args=(i, True, 60.0, 0, stop)) for i in range(instances)]
+    consumers = [ctx.Process(target=_consumer, args=(i, steps, out)) for i in range(instances)]
+    for p in producers + consumers:
+        p.start()
+    results = [out.get() for _ in consumers]
+    for p in consumers:
+        p.join()
+    stop.set()
+    for p in producers:
+        p.join()
+    return np.concatenate([lat for _, lat in sorted(results, key=lambda r: r[0])])
+
+
+def report(label, lat):
+    us = lat / 1e3
+    print(f"[Bridge] {label:<14} p50 {np.percentile(us, 50):>8.2f} us | p99 {np.percentile(us, 99):>9.2f} us"
+          f" | mean {us.mean():>8.2f} us | {len(lat) / (lat.sum() / 1e9):>10,.0f} steps/s per env")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bridge round-trip latency per backend")
+    parser.add_argument("--steps", type=int, default=20000)
+    parser.add_argument("--instances", type=int, nargs="*", default=[1])
+    args = parser.parse_args()
+
+    report("inproc", measure(SimBridge(), args.steps))
+    for n in args.instances:
+        report(f"posix x{n}", run_posix(n, args.steps))
+
+
+if __name__ == "__main__":
+    main()
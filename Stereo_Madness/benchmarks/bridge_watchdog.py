@@ -0,0 +1,162 @@
+"""
+Bridge watchdog against a killable local producer (posix shared memory).
+
+A core.shm_producer process serves the simulated level in lockstep while a
+DDQN agent trains through GeometryDashEnv + BridgeWatchdog. During training
+the producer is taken down --outages times, alternating:
+
+  crash   SIGKILL; a new producer process replaces the stale segment after
+          --downtime seconds (the watchdog sees the header pid disappear)
+  hang    SIGSTOP, SIGCONT after --stall + --downtime seconds (pid alive,
+          frames frozen: detected by the stall timeout; shorter freezes
+          are not stalls)
+
+Reported per outage: time until the env returned a stalled step, time
+until reset() came back with a live game, and the replay size and agent
+update count before and after (the process and its state survive). The
+episode step limit (--max-steps) is kept short so truncations show up too.
+
+Usage (from Stereo_Madness/):
+    python -m benchmarks.bridge_watchdog --outages 4 --downtime 2
+"""
+import argparse
+import multiprocessing as mp
+import os
+import signal
+import tempfile
+import threading
+import time
+import torch
+
+from config import *
+from core.environment import GeometryDashEnv
+from core.memory_bridge import MemoryBridge
+from core.shm_producer import run_producer
+from core.shm_transport import segment_name
+from core.watchdog import BridgeWatchdog
+from agents.ddqn import make_agent
+from agents.replay_buffer import ReplayBuffer
+
+INSTANCE = 9
+
+
+def start_producer(ctx, stop):
+    proc = ctx.Process(target=run_producer, args=(INSTANCE, True),
+                       kwargs={'stop_event': stop}, daemon=True)
+    proc.start()
+    return proc
+
+
+def stop_producer(proc, stop):
+    """Stop through `stop` so ShmProducer.close() unlinks the segment; a killed producer's is unlinked here."""
+    stop.set()
+    if proc.is_alive():
+        os.kill(proc.pid, signal.SIGCONT)
+        proc.join(timeout=5.0)
+    if proc.is_alive():
+        proc.terminate()
+        proc.join()
+    path = os.path.join(POSIX_SHM_DIR, segment_name(INSTANCE))
+    if os.path.exists(path):
+        os.unlink(path)
+
+
+def wait_for_segment(proc, timeout=10.0):
+    """Block until `proc` serves the segment (not a stale one left by an earlier run)."""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            bridge = MemoryBridge(instance=INSTANCE, backend="posix")
+            if bridge.header.producer_pid == proc.pid:
+                return bridge
+            bridge.close()
+        except Exception:
+            pass
+        time.sleep(0.05)
+    raise RuntimeError("[Watchdog] producer did not come up")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Watchdog stall detection and reconnect with a killable producer")
+    parser.add_argument("--outages", type=int, default=4)
+    parser.add_argument("--downtime", type=float, default=2.0, help="seconds the producer stays down")
+    parser.add_argument("--steps-between", type=int, default=1500, help="agent steps between outages")
+    parser.add_argument("--max-steps", type=int, default=60, help="episode step limit")
+    parser.add_argument("--stall", type=float, default=WATCHDOG_STALL_SECONDS)
+    args = parser.parse_args()
+    if os.name == "nt":
+        print("[Watchdog] needs the posix transport (/dev/shm)")
+        return
+    torch.set_num_threads(1)
+    ctx = mp.get_context("spawn")
+    stop = ctx.Event()
+    producer = start_producer(ctx, stop)
+    wait_for_segment(producer).close()
+
+    bridge = BridgeWatchdog(lambda: MemoryBridge(instance=INSTANCE, backend="posix"), stall_seconds=args.stall,
+                            retry_seconds=0.2)
+    env = GeometryDashEnv(bridge=bridge, frame_skip=FRAME_SKIP, action_repeats=ACTION_REPEATS,
+                          frame_gamma=FRAME_GAMMA if ACTION_REPEATS else 1.0)
+    env.set_slice({'id': 1, 'start': 0.0, 'end': 100.0, 'mode': 0})
+    env.max_episode_steps = args.max_steps
+    agent = make_agent(INPUT_DIM, NUM_ACTIONS, make_agent_config(epsilon_decay=3000), tempfile.mkdtemp())
+    memory = ReplayBuffer(MEMORY_SIZE)
+
+    updates = 0
+    truncations = {"steps": 0, "time": 0, "stall": 0}
+    episodes = 0
+    try:
+        for outage in range(1, args.outages + 1):
+            kind = "crash" if outage % 2 else "hang"
+            steps = 0
+            t_down = None
+            obs, _ = env.reset()
+            while True:
+                if steps == args.steps_between and t_down is None:
+                    before = (len(memory), updates)
+                    t_down = time.perf_counter()
+                    if kind == "crash":
+                        os.kill(producer.pid, signal.SIGKILL)
+                        producer.join()
+                        # the game comes back as a new process after the downtime
+                        restarted = []
+                        restart = threading.Timer(args.downtime, lambda: restarted.append(start_producer(ctx, stop)))
+                        restart.start()
+                    else:
+                        os.kill(producer.pid, signal.SIGSTOP)
+                        threading.Timer(args.stall + args.downtime, os.kill, (producer.pid, signal.SIGCONT)).start()
+                action = agent.select_action(obs, is_training=True)
+                next_obs, reward, terminated, truncated, info = env.step(action)
+                if info.get("stalled"):
+                    t_detect = time.perf_counter()
+                    truncations["stall"] += 1
+                    obs, _ = env.reset()  # blocks until the game is back
+                    t_back = time.perf_counter()
+                    if kind == "crash":
+                        restart.join()
+                        producer = restarted[0]
+                    print(f"[Watchdog] outage {outage} ({kind:<5}) | stalled step after "
+                          f"{t_detect - t_down:5.2f} s | live again after {t_back - t_down:5.2f} s "
+                          f"| replay {before[0]:,} → {len(memory):,} | "
+                          f"updates {before[1]:,} → {updates:,}")
+                    break
+                memory.push(obs, action, reward, next_obs, float(terminated))
+                if agent.learn(memory) is not None:
+                    updates += 1
+                steps += 1
+                obs = next_obs
+                if terminated or truncated:
+                    episodes += 1
+                    if truncated:
+                        truncations[info["truncated_by"]] += 1
+                    obs, _ = env.reset()
+        print(f"{bridge.summary()} | {episodes} episodes finished, truncated: "
+              f"{truncations['steps']} step limit, {truncations['stall']} stalls | "
+              f"replay {len(memory):,}, {updates:,} updates in one process")
+    finally:
+        bridge.close()
+        stop_producer(producer, stop)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Samples/sec of the offline dataset loader (mmap vs compressed, per worker count).
+
+Usage (from Stereo_Madness/):
+    python -m benchmarks.dataset_loader --rows 200000 --workers 0 2 4
+"""
+import argparse
+import tempfile
+import time
+import numpy as np
+
+from config import INPUT_DIM
+from offline.dataset import TransitionDatasetWriter, TransitionDataset
+from offline.pretrain import make_loader
+
+
+def synthetic_dataset(root_dir, rows, compress, episode_len=300, seed=0):
+    rng = np.random.default_rng(seed)
+    writer = TransitionDatasetWriter(root_dir, INPUT_DIM, compress=compress)
+    n_episodes = max(1, rows // episode_len)
+    for ep in range(n_episodes):
+        obs = rng.standard_normal((episode_len + 1, INPUT_DIM)).astype(np.float32)
+        for t in range(episode_len):
+            writer.add(obs[t], int(rng.integers(0, 2)), float(rng.standard_normal()),
+                       t == episode_len - 1, t / 3.0, 0, 1 + ep % 9)
+        writer.end_episode(obs[-1])
+    writer.close()
+
+
+def bench(root_dir, batch_size, steps, workers):
+    dataset = TransitionDataset(root_dir)
+    loader = make_loader(dataset, batch_size, steps, num_workers=workers)
+    it = iter(loader)
+    next(it)  # worker start-up excluded
+    t0 = time.perf_counter()
+    n = 0
+    for batch in it:
+        n += len(batch[1])
+    return n / (time.perf_counter() - t0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline dataset loader throughput")
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--steps", type=int, default=400)
+    parser.add_argument("--workers", type=int, nargs="*", default=[0, 2, 4])
+    args = parser.parse_args()
+
+    for compress in (False, True):
+        with tempfile.TemporaryDirectory() as root:
+            synthetic_dataset(root, args.rows, compress)
+            label = "compressed .npz" if compress else "mmap .npy     "
+            for w in args.workers:
+                rate = bench(root, args.batch_size, args.steps, w)
+                print(f"[Loader] {label} | workers {w} | {rate:>12,.0f} samples/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Deterministic full-level regression benchmark for the expert chain.
+
+Runs the slice experts (checkpoints/final_models) greedily through the
+simulated level with every RNG seeded: --attempts runs from every slice
+start (the practice checkpoint, as offline/distill.evaluate does), each
+swapping experts until it dies or finishes, so every expert and both modes
+are exercised. A small per-frame speed jitter (seeded per attempt) keeps
+the attempts of a slice from replaying the same frames. Records the action
+sequence and per-component timings and compares against a baseline file:
+  - behavior: action-sequence hash and completion percent must match exactly
+  - speed: frames/sec may not drop more than --tolerance below the baseline,
+    checked only against a --baseline file given explicitly
+
+The reference baseline is committed as benchmarks/baselines/full_level.json.
+Re-record it only with a change that is meant to alter behavior; frames/sec
+is machine-dependent, so speed is checked against a local baseline.
+
+Usage (from Stereo_Madness/):
+    python -m benchmarks.full_level                     # behavior vs the committed baseline
+    python -m benchmarks.full_level --save-baseline     # re-record it
+    python -m benchmarks.full_level --save-baseline --baseline /tmp/local.json
+    python -m benchmarks.full_level --baseline /tmp/local.json   # behavior + speed
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from collections import defaultdict
+import numpy as np
+import torch
+
+from config import *
+from core import environment
+from core.environment import GeometryDashEnv
+from core.seeding import seed_everything
+from core.sim_game import SimBridge, SimulatedGame, SimulatedLevel
+from agents.ddqn import make_agent
+
+BASELINE_FILE = os.path.join(BASE_DIR, "benchmarks", "baselines", "full_level.json")
+COMPONENTS = ("bridge", "normalize", "inference", "reward")
+
+
+class ComponentTimer:
+    """Accumulates wall time per component; wraps callables in place."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    def wrap(self, name, fn):
+        samples = self.samples[name]
+
+        def timed(*args, **kwargs):
+            t0 = time.perf_counter_ns()
+            out = fn(*args, **kwargs)
+            samples.append(time.perf_counter_ns() - t0)
+            return out
+        return timed
+
+    def summary(self):
+        out = {}
+        for name in COMPONENTS:
+            s = np.asarray(self.samples.get(name, [0]), dtype=np.float64) / 1000.0
+            out[name] = {"mean_us": float(s.mean()), "p50_us": float(np.percentile(s, 50)),
+                         "p99_us": float(np.percentile(s, 99)), "total_s": float(s.sum() / 1e6)}
+        return out
+
+
+def load_expert_chain(final_models_dir):
+    chain = {}
+    if os.path.isdir(final_models_dir):
+        for fname in sorted(os.listdir(final_models_dir)):
+            if fname.startswith("slice_") and fname.endswith("_model.pth"):
+                chain[int(fname.split("_")[1])] = torch.load(
+                    os.path.join(final_models_dir, fname), map_location=DEVICE)
+    return chain
+
+
+def run(seed=0, level_seed=0, attempts=3, frame_skip=4, max_steps=5000, models_dir=None, speed_jitter=0.05):
+    seed_everything(seed)
+    timer = ComponentTimer()
+
+    level = SimulatedLevel(seed=level_seed)
+    bridge = SimBridge(SimulatedGame(level, seed=seed, speed_jitter=speed_jitter))
+    bridge.read_state = timer.wrap("bridge", bridge.read_state)
+    bridge.write_action = timer.wrap("bridge", bridge.write_action)
+
+    env = GeometryDashEnv(bridge=bridge, frame_skip=frame_skip, action_repeats=ACTION_REPEATS,
+                          frame_gamma=FRAME_GAMMA if ACTION_REPEATS else 1.0)
+    agent = make_agent(INPUT_DIM, NUM_ACTIONS, make_agent_config(), CHECKPOINT_DIR)
+    agent.online_net.eval()
+    select_action = timer.wrap("inference", agent.select_action)
+
+    chain = load_expert_chain(models_dir or os.path.join(CHECKPOINT_DIR, "final_models"))
+    slices = sorted(level.slices, key=lambda s: s['start'])
+
+    # Time the env internals without touching GeometryDashEnv itself
+    orig_normalize, orig_reward = environment.normalize_state, environment.frame_reward
+    environment.normalize_state = timer.wrap("normalize", orig_normalize)
+    environment.frame_reward = timer.wrap("reward", orig_reward)
+
+    actions, completions = [], {}
+    frames = 0
+    t0 = time.perf_counter()
+    try:
+        for i, start in enumerate(slices):
+            bridge.send_checkpoint(start['start'])
+            completions[str(start['id'])] = runs = []
+            for attempt in range(attempts):
+                obs, info = env.reset(seed=seed + i * attempts + attempt)
+                active = None
+                for _ in range(max_steps):
+                    pct = float(info['percent'])
+                    sid = next((s['id'] for s in slices if s['start'] <= pct < s['end']), None)
+                    if sid is not None and sid != active and sid in chain:
+                        agent.online_net.load_state_dict(chain[sid])
+                        active = sid
+
+                    action = select_action(obs, is_training=False)
+                    obs, _, terminated, truncated, info = env.step(action)
+                    actions.append(action)
+                    frames += frame_skip
+                    if terminated or truncated or info['percent'] >= 100.0:
+                        break
+                runs.append(round(float(info['percent']), 4))
+    finally:
+        environment.normalize_state, environment.frame_reward = orig_normalize, orig_reward
+    elapsed = time.perf_counter() - t0
+
+    return {
+        "seed": seed,
+        "level_seed": level_seed,
+        "experts": sorted(chain),
+        "steps": len(actions),
+        "frames": frames,
+        "frames_per_sec": frames / elapsed,
+        "steps_per_sec": len(actions) / elapsed,
+        "completion_percent": completions,
+        "action_hash": hashlib.sha256(np.asarray(actions, dtype=np.int8).tobytes()).hexdigest(),
+        "components": timer.summary(),
+    }
+
+
+def compare(result, baseline, tolerance, speed=True):
+    problems = []
+    if result['action_hash'] != baseline['action_hash']:
+        problems.append("action sequence changed")
+    if result['completion_percent'] != baseline['completion_percent']:
+        problems.append(f"completion {result['completion_percent']} != {baseline['completion_percent']}")
+    floor = baseline['frames_per_sec'] * (1.0 - tolerance)
+    if speed and result['frames_per_sec'] < floor:
+        problems.append(f"frames/sec {result['frames_per_sec']:,.0f} < {floor:,.0f}")
+    return problems
+
+
+def report(result):
+    print(f"[Bench] {result['steps']} steps / {result['frames']} frames | "
+          f"{result['frames_per_sec']:,.0f} frames/s | {result['steps_per_sec']:,.0f} decisions/s")
+    print(f"[Bench] Experts {result['experts']} | completion per attempt, by start slice:")
+    for sid, runs in result['completion_percent'].items():
+        print(f"   Slice {sid:>2}: {runs}")
+    for name, c in result['components'].items():
+        print(f"   {name:<10} mean {c['mean_us']:>8.1f} us | p50 {c['p50_us']:>8.1f} | "
+              f"p99 {c['p99_us']:>8.1f} | total {c['total_s']:.3f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deterministic full-level regression benchmark")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--level-seed", type=int, default=0)
+    parser.add_argument("--attempts", type=int, default=3, help="per slice start")
+    parser.add_argument("--speed-jitter", type=float, default=0.05, help="per-frame relative speed noise")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--baseline", help="also gates frames/sec (default: the committed baseline, behavior only)")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative frames/sec drop")
+    args = parser.parse_args()
+
+    torch.set_num_threads(1)
+    # Best-of-N for speed; every repeat must reproduce the same actions
+    result = None
+    for _ in range(args.repeats):
+        r = run(args.seed, args.level_seed, args.attempts, speed_jitter=args.speed_jitter)
+        if result is not None and r['action_hash'] != result['action_hash']:
+            print("[Bench] NON-DETERMINISTIC: repeats produced different actions")
+            raise SystemExit(1)
+        if result is None or r['frames_per_sec'] > result['frames_per_sec']:
+            result = r
+    report(result)
+
+    path = args.baseline or BASELINE_FILE
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"[Bench] Baseline saved to {path}")
+        return
+
+    if not os.path.exists(path):
+        print(f"[Bench] No baseline at {path} (record one with --save-baseline)")
+        raise SystemExit(1)
+    with open(path, 'r') as f:
+        baseline = json.load(f)
+    # frames/sec is machine-dependent: only a baseline recorded here gates it
+    problems = compare(result, baseline, args.tolerance, speed=args.baseline is not None)
+    if problems:
+        print("[Bench] REGRESSION: " + "; ".join(problems))
+        raise SystemExit(1)
+    print("[Bench] OK: matches baseline")
+
+
+if __name__ == "__main__":
+    main()
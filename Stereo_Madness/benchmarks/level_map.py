@@ -0,0 +1,130 @@
+"""
+Level map correctness + cost benchmark.
+
+1. Streams frames of random-policy episodes on the simulated level (speed
+   jitter on) into a LevelMap and checks every mapped object against the
+   level's true layout (no duplicates, nothing invented).
+2. Times observe() per frame and the indexed queries against a linear scan
+   over the same objects, on the simulated level and on a --scale times
+   longer synthetic level.
+
+Usage (from Stereo_Madness/):
+    python -m benchmarks.level_map --episodes 40 --scale 100
+"""
+import argparse
+import time
+import numpy as np
+
+from core.level_map import HAZARD_TYPES, MAP_DTYPE, LevelMap
+from core.sim_game import SimBridge, SimulatedGame, SimulatedLevel
+
+
+def stream(level, episodes, seed):
+    """(LevelMap, frames, observe ns per frame) from random-policy episodes at spread checkpoints."""
+    rng = np.random.default_rng(seed)
+    bridge = SimBridge(SimulatedGame(level, seed=seed, speed_jitter=0.05))
+    level_map = LevelMap()
+    frames = spent = 0
+    for ep in range(episodes):
+        bridge.send_checkpoint(ep * 100.0 / episodes)
+        bridge.send_reset()
+        for _ in range(2000):
+            bridge.write_action(int(rng.random() < 0.08))
+            state = bridge.read_state()
+            t0 = time.perf_counter_ns()
+            level_map.observe(state)
+            spent += time.perf_counter_ns() - t0
+            frames += 1
+            if state.is_dead or state.is_terminal:
+                break
+    t0 = time.perf_counter_ns()
+    len(level_map)  # pending merge
+    spent += time.perf_counter_ns() - t0
+    return level_map, frames, spent / max(1, frames)
+
+
+def check(level_map, level):
+    truth = {(round(x), round(y), round(w), round(h), int(t)) for x, y, w, h, t in level.objects.tolist()}
+    got = [(round(float(o['x'])), round(float(o['y'])), round(float(o['w'])), round(float(o['h'])), int(o['type']))
+           for o in level_map.objects]
+    return len(got), len(set(got)), len(set(got) - truth), len(truth)
+
+
+def linear_nearest_hazard(objects, x):
+    hz = objects[np.isin(objects['type'], HAZARD_TYPES)]
+    ahead = hz[hz['x'] + hz['w'] > x]
+    if not len(ahead):
+        return None
+    i = int(np.argmin(ahead['x']))
+    return max(0.0, float(ahead['x'][i]) - x)
+
+
+def time_queries(level_map, xs):
+    objects = level_map.objects
+    rows = {}
+    t0 = time.perf_counter()
+    for x in xs:
+        level_map.nearest_hazard(x)
+    rows['nearest_hazard'] = (time.perf_counter() - t0) / len(xs)
+    t0 = time.perf_counter()
+    for x in xs:
+        linear_nearest_hazard(objects, x)
+    rows['nearest_hazard (scan)'] = (time.perf_counter() - t0) / len(xs)
+    t0 = time.perf_counter()
+    for x in xs:
+        level_map.objects_in(x, x + 1000.0)
+    rows['objects_in 1000 px'] = (time.perf_counter() - t0) / len(xs)
+    t0 = time.perf_counter()
+    for x in xs:
+        objects[(objects['x'] < x + 1000.0) & (objects['x'] + objects['w'] > x)]
+    rows['objects_in (scan)'] = (time.perf_counter() - t0) / len(xs)
+    t0 = time.perf_counter()
+    for x in xs:
+        level_map.lookahead(x, 105.0, 30, 3000.0)
+    rows['lookahead 30 / 3000 px'] = (time.perf_counter() - t0) / len(xs)
+    t0 = time.perf_counter()
+    for x in xs:
+        level_map.death_cause(x, 105.0)
+    rows['death_cause'] = (time.perf_counter() - t0) / len(xs)
+
+    # the indexed answers match the scan
+    for x in xs[:200]:
+        hit = level_map.nearest_hazard(x)
+        ref = linear_nearest_hazard(objects, x)
+        assert (hit is None) == (ref is None) and (hit is None or abs(hit[0] - ref) < 1e-3), (x, hit, ref)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LevelMap correctness and query cost")
+    parser.add_argument("--episodes", type=int, default=40)
+    parser.add_argument("--scale", type=int, default=100, help="synthetic level this many times longer")
+    parser.add_argument("--queries", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    level = SimulatedLevel(seed=args.seed)
+    level_map, frames, observe_ns = stream(level, args.episodes, args.seed)
+    mapped, unique, invented, total = check(level_map, level)
+    print(f"[LevelMap] {frames:,} frames | observe {observe_ns / 1e3:.2f} us/frame | "
+          f"{mapped} objects mapped of {total} | duplicates {mapped - unique} | invented {invented}")
+    print(level_map.summary())
+
+    # synthetic long level: the simulated layout repeated end to end
+    big = LevelMap()
+    shift = level.length_px
+    rows = np.concatenate([level_map.objects] * args.scale)
+    rows['x'] += np.repeat(np.arange(args.scale) * shift, len(level_map.objects)).astype(np.float32)
+    big.objects = rows.astype(MAP_DTYPE)
+    big._build_index()
+
+    rng = np.random.default_rng(args.seed)
+    for name, m, length in (("sim level", level_map, level.length_px), (f"x{args.scale} level", big, shift * args.scale)):
+        result = time_queries(m, rng.uniform(0.0, length, args.queries).tolist())
+        print(f"[LevelMap] {name} ({len(m.objects):,} objects):")
+        for query, seconds in result.items():
+            print(f"   {query:<24} {seconds * 1e6:8.2f} us")
+
+
+if __name__ == "__main__":
+    main()
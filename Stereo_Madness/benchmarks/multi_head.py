@@ -0,0 +1,219 @@
+"""
+Per-slice expert chain vs one mode-conditioned MultiHeadDuelingDQN.
+
+  train    curriculum on the simulated level, same promotion rule as
+           CurriculumManager (>= 20 episodes, >= 70% wins over the last 50).
+           chain: one DuelingDQN per slice, fresh at a new mode, transferred
+           within a mode (GDAgentOrchestrator). multi-head: one shared model,
+           a fresh head at a new mode, the trunk frozen after Slice 1, tagged
+           replay rehearsing the earlier slices, and a greedy check of every
+           earlier slice before each promotion (its frames are counted).
+           Reports training frames per promoted slice and to full-level
+           completion (every slice promoted), then a greedy run from 0%.
+  latency  per-decision inference over the observations of a full run:
+           expert swaps at slice boundaries + forward vs a single forward,
+           and a training-size batched forward.
+
+Reduced budget: --slice-width scripts narrow slices with the --slice-modes
+pattern (cube, ship, and back to cube) at the start of the level, and
+--epsilon-decay shortens exploration, as in benchmarks/novelty.py.
+
+Usage (from Stereo_Madness/):
+    python -m benchmarks.multi_head --max-frames 2000000
+    python -m benchmarks.multi_head --slice-width 3 --epsilon-decay 3000 --max-frames 600000
+    python -m benchmarks.multi_head --latency-only
+"""
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+import torch
+
+from config import *
+from core.environment import GeometryDashEnv
+from core.seeding import seed_everything
+from core.sim_game import SimBridge, SimulatedGame, SimulatedLevel
+from agents.ddqn import make_agent
+from agents.replay_buffer import ReplayBuffer, TaggedReplayBuffer
+from benchmarks.full_level import load_expert_chain
+from curriculum.evaluator import evaluate_policy
+from tuning.sweep import train_episode
+
+
+def slice_at(slices, percent):
+    return next((s for s in slices if s['start'] <= percent < s['end']), None)
+
+
+def train_curriculum(multi_head, level, max_frames, seed=0, epsilon_decay=EPSILON_DECAY):
+    """Train every slice in order within a frame budget; returns (agent, experts, frames per promotion)."""
+    seed_everything(seed)
+    slices = level.slices
+    bridge = SimBridge(SimulatedGame(level, seed=seed))
+    env = GeometryDashEnv(bridge=bridge, frame_skip=FRAME_SKIP, action_repeats=ACTION_REPEATS,
+                          frame_gamma=FRAME_GAMMA if ACTION_REPEATS else 1.0)
+    agent = make_agent(INPUT_DIM, NUM_ACTIONS, make_agent_config(multi_head=multi_head, epsilon_decay=epsilon_decay),
+                       tempfile.mkdtemp())
+    if multi_head:
+        memory = TaggedReplayBuffer(MEMORY_SIZE, env.observation_space.shape[0],
+                                    current_fraction=REPLAY_CURRENT_FRACTION, seed=seed)
+    else:
+        memory = ReplayBuffer(MEMORY_SIZE)
+    experts, promoted = {}, []
+    frames = 0
+
+    for s in slices:
+        prev = next((p for p in reversed(slices) if p['start'] < s['start'] and p['mode'] == s['mode']), None)
+        if multi_head:
+            # main.py: trunk fixed once a slice is in the shared model, rehearsal of the earlier slices
+            agent.freeze_trunk(bool(experts))
+            memory.focus(s['id'])
+            if prev is None:
+                agent.reset_head(s['mode'])
+        elif prev is None:
+            agent.reset_network()
+        else:
+            agent.online_net.load_state_dict(experts[prev['id']])
+            agent.target_net.load_state_dict(experts[prev['id']])
+
+        bridge.send_checkpoint(s['start'])
+        env.set_slice(s)
+        wins = []
+        while frames < max_frames:
+            _, _, steps, won = train_episode(env, agent, memory, s)
+            frames += steps * FRAME_SKIP
+            wins = (wins + [float(won)])[-50:]
+            if len(wins) >= 20 and np.mean(wins) >= 0.70:
+                if not multi_head or not experts:
+                    break
+                lost, frames = check_earlier_slices(env, agent, slices, s, frames)
+                if not lost:
+                    break
+                print(f"[MultiHead] multi-head | Slice {s['id']} held back: lost Slice(s) {lost}")
+                wins = []
+        else:
+            print(f"[MultiHead] {'multi-head' if multi_head else 'chain':<10} | budget spent on Slice {s['id']}")
+            break
+        experts[s['id']] = {k: v.clone() for k, v in agent.online_net.state_dict().items()}
+        promoted.append((s['id'], frames))
+        print(f"[MultiHead] {'multi-head' if multi_head else 'chain':<10} | Slice {s['id']} promoted at {frames:,} frames")
+    return agent, experts, promoted
+
+
+def check_earlier_slices(env, agent, slices, current, frames, episodes=EVAL_EPISODES):
+    """(earlier slice ids below EVAL_PROMOTE_WIN_RATE greedily, frames incl. the check) for `current`."""
+    lost = []
+    for p in slices:
+        if p['start'] < current['start']:
+            result = evaluate_policy(env, agent, p, episodes)
+            frames += int(result['mean_frames'] * episodes)
+            if result['win_rate'] < EVAL_PROMOTE_WIN_RATE:
+                lost.append(p['id'])
+    env.bridge.send_checkpoint(current['start'])
+    env.set_slice(current)
+    return lost, frames
+
+
+def greedy_run(agent, experts, level, multi_head, max_steps=20000):
+    """One attempt from 0%; the chain swaps experts at slice boundaries."""
+    bridge = SimBridge(SimulatedGame(level))
+    env = GeometryDashEnv(bridge=bridge, frame_skip=FRAME_SKIP, action_repeats=ACTION_REPEATS,
+                          frame_gamma=FRAME_GAMMA if ACTION_REPEATS else 1.0)
+    bridge.send_checkpoint(0.0)
+    obs, info = env.reset()
+    trace, active = [], None
+    for _ in range(max_steps):
+        s = slice_at(level.slices, float(info['percent']))
+        sid = s['id'] if s is not None else None
+        if not multi_head and sid is not None and sid != active and sid in experts:
+            agent.online_net.load_state_dict(experts[sid])
+            active = sid
+        trace.append((obs, sid))
+        obs, _, terminated, _, info = env.step(agent.select_action(obs, is_training=False))
+        if terminated or info['percent'] >= level.slices[-1]['end']:
+            break
+    return float(info['percent']), trace
+
+
+def time_inference(agent, experts, trace, multi_head):
+    """ns per decision (swap included) over a recorded observation trace, and total swap ns."""
+    net = agent.online_net
+    net.eval()
+    per_decision, swap_ns = [], 0
+    active = None
+    with torch.no_grad():
+        for obs, sid in trace:
+            t0 = time.perf_counter_ns()
+            if not multi_head and sid is not None and sid != active and sid in experts:
+                net.load_state_dict(experts[sid])
+                active = sid
+                swap_ns += time.perf_counter_ns() - t0
+            net(torch.as_tensor(obs).unsqueeze(0)).argmax().item()
+            per_decision.append(time.perf_counter_ns() - t0)
+    return np.asarray(per_decision) / 1000.0, swap_ns / 1000.0
+
+
+def time_batch(net, trace, batch_size=BATCH_SIZE, repeats=200):
+    obs = np.stack([o for o, _ in trace])
+    idx = np.random.default_rng(0).integers(len(obs), size=batch_size)
+    batch = torch.as_tensor(obs[idx])
+    with torch.no_grad():
+        t0 = time.perf_counter_ns()
+        for _ in range(repeats):
+            net(batch)
+    return (time.perf_counter_ns() - t0) / repeats / 1000.0
+
+
+def model_kib(net):
+    return sum(p.numel() * p.element_size() for p in net.parameters()) / 1024.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Expert chain vs multi-head model")
+    parser.add_argument("--max-frames", type=int, default=2_000_000, help="training budget per variant")
+    parser.add_argument("--level-seed", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--slice-width", type=float, default=0.0, help="percent; 0 = curriculum slices")
+    parser.add_argument("--slice-modes", type=int, nargs="+", default=[0, 0, 1, 1, 0],
+                        help="mode of each scripted slice (--slice-width)")
+    parser.add_argument("--epsilon-decay", type=float, default=EPSILON_DECAY)
+    parser.add_argument("--latency-only", action="store_true",
+                        help="skip training: checkpoints/final_models chain vs an untrained multi-head model")
+    args = parser.parse_args()
+    torch.set_num_threads(1)
+
+    scripted = None
+    if args.slice_width > 0:
+        w = args.slice_width
+        scripted = [{'id': i + 1, 'start': i * w, 'end': (i + 1) * w, 'mode': m}
+                    for i, m in enumerate(args.slice_modes)]
+    level = SimulatedLevel(seed=args.level_seed, slices=scripted)
+    results = {}
+    for multi_head in (False, True):
+        if args.latency_only:
+            agent = make_agent(INPUT_DIM, NUM_ACTIONS, make_agent_config(multi_head=multi_head), CHECKPOINT_DIR)
+            experts = {} if multi_head else load_expert_chain(os.path.join(CHECKPOINT_DIR, "final_models"))
+            promoted = []
+        else:
+            agent, experts, promoted = train_curriculum(multi_head, level, args.max_frames, args.seed,
+                                                        args.epsilon_decay)
+        percent, trace = greedy_run(agent, experts, level, multi_head)
+        results[multi_head] = (agent, experts, promoted, percent, trace)
+
+    # both variants are timed on the same observations
+    trace = max((r[4] for r in results.values()), key=len)
+    print()
+    for multi_head, (agent, experts, promoted, percent, _) in results.items():
+        label = "multi-head" if multi_head else f"chain x{max(len(experts), 1)}"
+        lat, swap_us = time_inference(agent, experts, trace, multi_head)
+        complete = promoted[-1][1] if len(promoted) == len(level.slices) else None
+        size = model_kib(agent.online_net) * (1 if multi_head else max(len(experts), 1))
+        print(f"[MultiHead] {label:<10} | slices {len(promoted)}/{len(level.slices)} | frames to completion "
+              f"{f'{complete:,}' if complete else '-':>11} | greedy run {percent:5.1f}% | "
+              f"decision p50 {np.percentile(lat, 50):6.1f} us p99 {np.percentile(lat, 99):7.1f} us | "
+              f"swaps {swap_us / 1000.0:6.2f} ms/run | batch {BATCH_SIZE} {time_batch(agent.online_net, trace):6.1f} us | "
+              f"weights {size:,.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Episodes to promotion with and without the count-based novelty bonus (agents/novelty.py).
+
+Same scripted setup as benchmarks/rainbow.py: cube-only micro-slices of the
+simulated level (--slice-width percent), a fresh DDQN agent per (variant,
+slice, seed), the CurriculumManager promotion rule (>= 20 episodes, >= 70%
+wins over the last 50, wins judged on the game, not the bonus) and a live
+frame budget. Variants:
+
+  epsilon   epsilon-greedy only (main.py with NOVELTY = False)
+  novelty   epsilon-greedy + NoveltyBonus with the config.py settings
+            (--beta / --half-life override them)
+
+Reported per run: episodes and live frames to promotion, the win rate over
+the last 50 episodes (how far an unpromoted run got), wall time and, for
+the novelty variant, the table summary.
+
+Usage (from Stereo_Madness/):
+    python -m benchmarks.novelty --slices 2 4 --seeds 0 1 2 --max-frames 60000
+"""
+import argparse
+import tempfile
+import time
+import numpy as np
+import torch
+
+from config import *
+from core.environment import GeometryDashEnv
+from core.seeding import seed_everything
+from core.sim_game import SimBridge, SimulatedGame, SimulatedLevel
+from agents.ddqn import make_agent
+from agents.novelty import NoveltyBonus
+from agents.replay_buffer import ReplayBuffer
+from tuning.sweep import train_episode
+
+VARIANTS = ("epsilon", "novelty")
+
+
+def train_slice(level, current_slice, max_frames, seed, novelty, epsilon_decay):
+    """(frames, episodes, promoted, win rate of the last 50) for one fresh DDQN agent on one slice."""
+    seed_everything(seed)
+    bridge = SimBridge(SimulatedGame(level, seed=seed))
+    bridge.send_checkpoint(current_slice['start'])
+    env = GeometryDashEnv(bridge=bridge, frame_skip=FRAME_SKIP, action_repeats=ACTION_REPEATS,
+                          frame_gamma=FRAME_GAMMA if ACTION_REPEATS else 1.0)
+    env.set_slice(current_slice)
+    env.novelty = novelty
+    agent = make_agent(INPUT_DIM, NUM_ACTIONS, make_agent_config(epsilon_decay=epsilon_decay), tempfile.mkdtemp())
+    memory = ReplayBuffer(MEMORY_SIZE)
+
+    frames = episodes = 0
+    wins = []
+    while frames < max_frames:
+        _, _, steps, won = train_episode(env, agent, memory, current_slice)
+        frames += steps * FRAME_SKIP
+        episodes += 1
+        wins = (wins + [float(won)])[-50:]
+        if len(wins) >= 20 and np.mean(wins) >= 0.70:
+            return frames, episodes, True, np.mean(wins)
+    return frames, episodes, False, np.mean(wins)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Episodes to promotion with and without the novelty bonus")
+    parser.add_argument("--variants", nargs="+", default=list(VARIANTS), choices=VARIANTS)
+    parser.add_argument("--slices", type=int, nargs="+", default=[2, 4])
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0, 1, 2])
+    parser.add_argument("--max-frames", type=int, default=60_000, help="live frame budget per (slice, seed)")
+    parser.add_argument("--slice-width", type=float, default=3.0, help="percent; 0 = curriculum slices")
+    parser.add_argument("--level-seed", type=int, default=0)
+    parser.add_argument("--epsilon-decay", type=float, default=3000,
+                        help="steps; shorter than EPSILON_DECAY so the budget measures learning, not exploration")
+    parser.add_argument("--beta", type=float, default=NOVELTY_BETA)
+    parser.add_argument("--half-life", type=float, default=NOVELTY_HALF_LIFE)
+    args = parser.parse_args()
+    torch.set_num_threads(1)
+
+    scripted = None
+    if args.slice_width > 0:
+        w = args.slice_width
+        scripted = [{'id': i, 'start': (i - 1) * w, 'end': i * w, 'mode': 0} for i in range(1, max(args.slices) + 1)]
+    level = SimulatedLevel(seed=args.level_seed, slices=scripted)
+    slices = {s['id']: s for s in level.slices}
+    results = {}
+    for name in args.variants:
+        for sid in args.slices:
+            for seed in args.seeds:
+                novelty = NoveltyBonus(args.beta, args.half_life) if name == "novelty" else None
+                t0 = time.perf_counter()
+                frames, episodes, promoted, win_rate = train_slice(level, slices[sid], args.max_frames, seed,
+                                                                   novelty, args.epsilon_decay)
+                results[(name, sid, seed)] = (frames, episodes, promoted, win_rate)
+                print(f"[Novelty] {name:<7} | Slice {sid} seed {seed} | "
+                      f"{'promoted' if promoted else 'budget  '} after {episodes:>5} ep / {frames:>9,} frames | "
+                      f"last 50 won {win_rate * 100:5.1f}% | {time.perf_counter() - t0:6.1f} s")
+                if novelty is not None:
+                    print(f"          {novelty.summary()}")
+
+    print()
+    for sid in args.slices:
+        for name in args.variants:
+            rows = [results[(name, sid, seed)] for seed in args.seeds]
+            done = [r for r in rows if r[2]]
+            episodes = f"{int(np.median([r[1] for r in done])):,}" if done else "-"
+            frames = f"{int(np.median([r[0] for r in done])):,}" if done else "-"
+            print(f"[Novelty] Slice {sid} | {name:<7} | promoted {len(done)}/{len(rows)} | "
+                  f"median episodes to promotion {episodes:>6} | median live frames {frames:>9} | "
+                  f"median last-50 win rate {np.median([r[3] for r in rows]) * 100:5.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Serial act loop vs PipelinedActor against a free-running game.
+
+A core.shm_producer in free-run mode plays the simulated level at 60 fps on
+the posix bridge, like the real game. For each game frame we look up the
+decision in effect and how many frames old its observation was:
+  decision latency  obs read -> action written (ms)
+  late-frame rate   frames whose action is older than --max-staleness frames
+                    (or that had no decision yet this attempt)
+--model-ms adds artificial inference time to emulate heavier models.
+
+Usage (from Stereo_Madness/):
+    python -m benchmarks.pipeline_latency --seconds 10 --model-ms 0 10 25
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import time
+import numpy as np
+import torch
+
+from config import *
+from agents.ddqn import make_agent
+from benchmarks.full_level import load_expert_chain
+from core.environment import GeometryDashEnv
+from core.memory_bridge import MemoryBridge
+from core.pipeline import PipelinedActor
+from core.shm_producer import run_producer
+
+INSTANCE = 7
+
+
+def make_policy(model_ms, slices):
+    agent = make_agent(INPUT_DIM, NUM_ACTIONS, make_agent_config(), CHECKPOINT_DIR)
+    agent.online_net.eval()
+    chain = load_expert_chain(os.path.join(CHECKPOINT_DIR, "final_models"))
+    active = [None]
+
+    def policy(obs, info):
+        pct = float(info['percent'])
+        sid = next((s['id'] for s in slices if s['start'] <= pct < s['end']), None)
+        if sid is not None and sid != active[0] and sid in chain:
+            agent.online_net.load_state_dict(chain[sid])
+            active[0] = sid
+        action = agent.select_action(obs, is_training=False)
+        if model_ms:
+            time.sleep(model_ms / 1000.0)
+        # the button: both paths act every 4 frames, so a repeat choice keeps only its button
+        return action % 2
+    return policy
+
+
+def late_frames(log, first, last, bound):
+    """Frames in [first, last] whose effective decision is missing or older than `bound`."""
+    late = 0
+    k = -1
+    for g in range(first, last + 1):
+        while k + 1 < len(log) and log[k + 1][2] <= g:
+            k += 1
+        if k < 0 or g - log[k][0] > bound:
+            late += 1
+    return late
+
+
+def run_serial(bridge, policy, seconds, bound):
+    env = GeometryDashEnv(bridge=bridge, frame_skip=4)
+    frames = late = 0
+    latency = []
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        obs, info = env.reset()
+        obs_frame, obs_t = bridge.frame_index(), time.perf_counter_ns()
+        first = obs_frame
+        log = []
+        while True:
+            action = policy(obs, info)
+            log.append((obs_frame, obs_t, bridge.frame_index(), time.perf_counter_ns()))
+            obs, _, terminated, _, info = env.step(action)
+            obs_frame, obs_t = bridge.frame_index(), time.perf_counter_ns()
+            if terminated or info['percent'] >= 100.0 or time.perf_counter() > end:
+                break
+        frames += obs_frame - first + 1
+        late += late_frames(log, first, obs_frame, bound)
+        latency += [(a - o) / 1e6 for _, o, _, a in log]
+    return frames, late, latency
+
+
+def run_pipelined(bridge, policy, seconds, bound):
+    actor = PipelinedActor(bridge, policy, frame_skip=4, max_staleness=bound)
+    frames = late = 0
+    latency = []
+    end = time.perf_counter() + seconds
+    try:
+        while time.perf_counter() < end:
+            stats = actor.run_episode()
+            log = stats["log"]
+            frames += stats["frames"]
+            late += stats["late_frames"] + stats["missed_frames"]
+            latency += [(a - o) / 1e6 for _, o, _, a in log]
+    finally:
+        actor.close()
+    return frames, late, latency
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serial vs pipelined act loop latency")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--model-ms", type=float, nargs="*", default=[0.0, 10.0, 25.0])
+    parser.add_argument("--max-staleness", type=int, default=8, help="frames")
+    args = parser.parse_args()
+
+    ctx = mp.get_context("spawn")
+    stop = ctx.Event()
+    producer = ctx.Process(target=run_producer, args=(INSTANCE, False, 60.0, 0, stop))
+    producer.start()
+    bridge = None
+    try:
+        deadline = time.perf_counter() + 30.0
+        while bridge is None:
+            try:
+                bridge = MemoryBridge(instance=INSTANCE, backend="posix")
+            except Exception:
+                if time.perf_counter() > deadline:
+                    raise
+                time.sleep(0.1)
+
+        with open(CURRICULUM_FILE, 'r') as f:
+            slices = sorted(json.load(f), key=lambda s: s['start'])
+        for model_ms in args.model_ms:
+            policy = make_policy(model_ms, slices)
+            for label, run in (("serial", run_serial), ("pipelined", run_pipelined)):
+                frames, late, latency = run(bridge, policy, args.seconds, args.max_staleness)
+                lat = np.asarray(latency) if latency else np.zeros(1)
+                print(f"[Pipeline] model +{model_ms:>4.0f} ms | {label:<9} | decision p50 {np.percentile(lat, 50):6.2f} ms"
+                      f" p99 {np.percentile(lat, 99):6.2f} ms | late frames {late / max(frames, 1) * 100:5.1f}%"
+                      f" of {frames}")
+    finally:
+        if bridge is not None:
+            bridge.close()
+        stop.set()
+        producer.join()
+
+
+if __name__ == "__main__":
+    torch.set_num_threads(1)
+    main()
@@ -0,0 +1,97 @@
+"""
+Sample efficiency: dueling double DQN (epsilon-greedy) vs the rainbow agent
+(C51 + noisy nets + dueling double DQN) on the simulated level.
+
+The scripted environment is a cube-only SimulatedLevel cut into short
+slices (--slice-width percent each, 2-4 obstacles); --slice-width 0 uses the
+curriculum slices instead. Each (algorithm, slice, seed) trains a fresh agent
+from the slice start with the CurriculumManager promotion rule (>= 20
+episodes, >= 70% wins over the last 50) and a frame budget. Reported: frames
+and episodes until promotion (budget = not promoted), then the greedy win
+rate over 20 episodes.
+
+Usage (from Stereo_Madness/):
+    python -m benchmarks.rainbow --slices 2 3 4 --seeds 0 1 2 --max-frames 60000
+"""
+import argparse
+import tempfile
+import time
+import numpy as np
+import torch
+
+from config import *
+from core.environment import GeometryDashEnv
+from core.seeding import seed_everything
+from core.sim_game import SimBridge, SimulatedGame, SimulatedLevel
+from agents.ddqn import make_agent
+from agents.replay_buffer import ReplayBuffer
+from curriculum.evaluator import evaluate_policy
+from tuning.sweep import train_episode
+
+
+def train_slice(algorithm, level, current_slice, max_frames, seed, **overrides):
+    """(frames, episodes, promoted, agent, env) for one fresh agent on one slice (overrides: agent config)."""
+    seed_everything(seed)
+    bridge = SimBridge(SimulatedGame(level, seed=seed))
+    bridge.send_checkpoint(current_slice['start'])
+    env = GeometryDashEnv(bridge=bridge, frame_skip=FRAME_SKIP, action_repeats=ACTION_REPEATS,
+                          frame_gamma=FRAME_GAMMA if ACTION_REPEATS else 1.0)
+    env.set_slice(current_slice)
+    agent = make_agent(INPUT_DIM, NUM_ACTIONS, make_agent_config(algorithm=algorithm, **overrides), tempfile.mkdtemp())
+    memory = ReplayBuffer(MEMORY_SIZE)
+
+    frames = episodes = 0
+    wins = []
+    while frames < max_frames:
+        _, _, steps, won = train_episode(env, agent, memory, current_slice)
+        frames += steps * FRAME_SKIP
+        episodes += 1
+        wins = (wins + [float(won)])[-50:]
+        if len(wins) >= 20 and np.mean(wins) >= 0.70:
+            return frames, episodes, True, agent, env
+    return frames, episodes, False, agent, env
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DDQN vs rainbow sample efficiency on the simulated level")
+    parser.add_argument("--slices", type=int, nargs="+", default=[2, 3, 4])
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0, 1, 2])
+    parser.add_argument("--max-frames", type=int, default=60_000, help="budget per (slice, seed)")
+    parser.add_argument("--slice-width", type=float, default=3.0, help="percent; 0 = curriculum slices")
+    parser.add_argument("--level-seed", type=int, default=0)
+    args = parser.parse_args()
+    torch.set_num_threads(1)
+
+    scripted = None
+    if args.slice_width > 0:
+        w = args.slice_width
+        scripted = [{'id': i, 'start': (i - 1) * w, 'end': i * w, 'mode': 0} for i in range(1, max(args.slices) + 1)]
+    level = SimulatedLevel(seed=args.level_seed, slices=scripted)
+    slices = {s['id']: s for s in level.slices}
+    results = {}
+    for algorithm in ("ddqn", "rainbow"):
+        for sid in args.slices:
+            for seed in args.seeds:
+                t0 = time.perf_counter()
+                frames, episodes, promoted, agent, env = train_slice(
+                    algorithm, level, slices[sid], args.max_frames, seed)
+                greedy = evaluate_policy(env, agent, slices[sid], episodes=20)['win_rate']
+                results[(algorithm, sid, seed)] = (frames, episodes, promoted, greedy)
+                print(f"[Rainbow] {algorithm:<8} | Slice {sid} seed {seed} | "
+                      f"{'promoted' if promoted else 'budget  '} after {frames:>9,} frames / {episodes:>5} ep | "
+                      f"greedy win {greedy * 100:5.1f}% | {time.perf_counter() - t0:6.1f} s")
+
+    print()
+    for sid in args.slices:
+        for algorithm in ("ddqn", "rainbow"):
+            rows = [results[(algorithm, sid, seed)] for seed in args.seeds]
+            promoted = [r for r in rows if r[2]]
+            frames = [r[0] for r in promoted]
+            median = f"{int(np.median(frames)):,}" if frames else "-"
+            print(f"[Rainbow] Slice {sid} | {algorithm:<8} | promoted {len(promoted)}/{len(rows)} | "
+                  f"median frames to promotion {median:>9} | mean greedy win "
+                  f"{np.mean([r[3] for r in rows]) * 100:5.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Quantized replay storage: round-trip accuracy, memory per transition and
+push/sample throughput for each codec of FrameReplayBuffer.
+
+Frames come from the simulated level (cube and ship sections) so the value
+distribution matches normalize_state output.
+
+Usage (from Stereo_Madness/):
+    python -m benchmarks.replay_codec --frames 20000 --depth 1 4
+"""
+import argparse
+import time
+import numpy as np
+
+from config import INPUT_DIM
+from core.environment import GeometryDashEnv
+from core.obs_codec import CODECS, DISCRETE_COLS
+from core.sim_game import SimBridge
+from agents.replay_buffer import ReplayBuffer, FrameReplayBuffer
+
+GROUPS = {
+    "vel_y": [0], "y": [1], "ground/mode": [2, 3],
+    "dx": list(range(4, INPUT_DIM, 5)), "dy": list(range(5, INPUT_DIM, 5)),
+    "w/h": list(range(6, INPUT_DIM, 5)) + list(range(7, INPUT_DIM, 5)),
+    "type": list(range(8, INPUT_DIM, 5)),
+}
+
+
+def collect_transitions(n, seed=0):
+    """Random-policy episodes from several checkpoints: list of (obs, a, r, next_obs, done)."""
+    rng = np.random.default_rng(seed)
+    bridge = SimBridge()
+    env = GeometryDashEnv(bridge=bridge, frame_skip=4)
+    out = []
+    while len(out) < n:
+        bridge.send_checkpoint(float(rng.uniform(0, 95)))
+        obs, _ = env.reset()
+        while len(out) < n:
+            action = int(rng.random() < 0.3)
+            next_obs, reward, terminated, _, _ = env.step(action)
+            out.append((obs, action, reward, next_obs, float(terminated)))
+            obs = next_obs
+            if terminated:
+                break
+    return out
+
+
+def check_accuracy(frames):
+    ok = True
+    for name in CODECS:
+        buf = FrameReplayBuffer(len(frames), INPUT_DIM, codec=name)
+        for r, f in enumerate(frames):
+            buf.codec.write(buf.frames, r, f)
+        decoded = buf.codec.read(buf.frames, np.arange(len(frames)))
+        err = np.abs(decoded.astype(np.float64) - frames.astype(np.float64)).max(axis=0)
+        # float32 rounding of the decoded value on top of the codec bound
+        bound = buf.codec.max_error() + np.abs(frames).max(axis=0) * 2.0 ** -23
+        passed = bool(np.all(err <= bound))
+        if name != "float16":  # fixed-point codecs keep discrete features exact
+            passed &= np.array_equal(decoded[:, DISCRETE_COLS], frames[:, DISCRETE_COLS])
+        ok &= passed
+        cells = " | ".join(f"{g} {err[cols].max():.2e}" for g, cols in GROUPS.items())
+        print(f"[Codec] {name:<8} {'OK  ' if passed else 'FAIL'} max abs error: {cells}")
+    return ok
+
+
+def replay_buffer_bytes(transitions, depth):
+    """Approximate: two float32 stacks plus per-transition tuple/ndarray/float overhead."""
+    per = 2 * (depth * INPUT_DIM * 4 + 112) + 72 + 24 + 24 + 28
+    return per * len(transitions)
+
+
+def bench(transitions, depth, codec, batch_size=64, samples=2000):
+    buf = FrameReplayBuffer(len(transitions) + 1024, INPUT_DIM, depth, codec=codec)
+    t0 = time.perf_counter()
+    for tr in transitions:
+        buf.push(*tr)
+    push_rate = len(transitions) / (time.perf_counter() - t0)
+    t0 = time.perf_counter()
+    for _ in range(samples):
+        buf.sample(batch_size)
+    sample_rate = samples * batch_size / (time.perf_counter() - t0)
+    # storage per row, times rows per transition (episode-closing frames included)
+    return buf.nbytes() / buf.capacity * buf.t / len(buf), push_rate, sample_rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quantized replay storage benchmark")
+    parser.add_argument("--frames", type=int, default=20000)
+    parser.add_argument("--depth", type=int, nargs="*", default=[1, 4])
+    args = parser.parse_args()
+
+    transitions = collect_transitions(args.frames)
+    frames = np.stack([t[3][-INPUT_DIM:] for t in transitions])
+    accurate = check_accuracy(frames)
+
+    for depth in args.depth:
+        stacked = [(np.tile(o, depth), a, r, np.tile(n, depth), d) for o, a, r, n, d in transitions]
+        ref = ReplayBuffer(len(stacked))
+        for tr in stacked:
+            ref.push(*tr)
+        t0 = time.perf_counter()
+        for _ in range(2000):
+            ref.sample(64)
+        ref_rate = 2000 * 64 / (time.perf_counter() - t0)
+        ref_per = replay_buffer_bytes(stacked, depth) / len(stacked)
+        print(f"\n[Replay] frame_stack {depth}")
+        print(f"   ReplayBuffer            {ref_per:>7.0f} B/transition | 1M = {ref_per * 1e6 / 2**30:5.2f} GiB"
+              f" | sample {ref_rate:>10,.0f}/s")
+        for codec in CODECS:
+            per, push_rate, sample_rate = bench(stacked, depth, codec)
+            print(f"   Frames[{codec:<8}]        {per:>7.0f} B/transition | 1M = {per * 1e6 / 2**30:5.2f} GiB"
+                  f" | push {push_rate:>9,.0f}/s | sample {sample_rate:>10,.0f}/s")
+
+    if not accurate:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Reward engine equivalence check + throughput benchmark.
+
+Usage (from Stereo_Madness/):
+    python -m benchmarks.reward_engine --frames 200000
+"""
+import argparse
+import time
+import numpy as np
+
+from core.memory_bridge import SharedState
+from core.state_utils import STATE_DTYPE
+from agents.expert_cube import CubeExpert
+from agents.expert_ship import ShipExpert
+from agents.reward_engine import compile_reward_config, frame_reward, frame_reward_batch
+
+
+def random_frames(n, seed=0):
+    """Plausible consecutive-ish frames: mostly forward progress, some deaths/ship/jumps."""
+    rng = np.random.default_rng(seed)
+    states = np.zeros(n, dtype=STATE_DTYPE)
+    states['percent'] = np.cumsum(rng.uniform(-0.01, 0.05, n)) % 100.0
+    states['dist_nearest_hazard'] = rng.uniform(-20.0, 120.0, n)
+    states['player_mode'] = rng.choice([0, 1, 2], size=n, p=[0.7, 0.28, 0.02])
+    states['is_dead'] = rng.random(n) < 0.01
+    states['player_y'] = rng.uniform(100.0, 400.0, n)
+
+    actions = rng.integers(0, 2, n)
+    prev_actions = rng.integers(-1, 2, n)  # -1 = None (first step)
+    prev_percent = np.roll(states['percent'], 1).astype(np.float64)
+    prev_dist = np.roll(states['dist_nearest_hazard'], 1).astype(np.float64)
+    prev_dist[rng.random(n) < 0.01] = np.nan  # None
+    return states, actions, prev_actions, prev_percent, prev_dist
+
+
+def reference_reward(state, action, prev_action, prev_percent, prev_dist, reward_context, slice_end):
+    """The pre-engine GeometryDashEnv._calculate_reward, verbatim semantics."""
+    ctx = dict(reward_context)
+    ctx['prev_action'] = prev_action
+    if state.is_dead:
+        return ctx.get("death_penalty", -100.0)
+    if slice_end is not None and state.percent >= slice_end:
+        return 1000.0
+    if state.player_mode == 0:
+        return CubeExpert.get_reward(state, action, prev_percent=prev_percent,
+                                     prev_dist_nearest_hazard=prev_dist, reward_context=ctx)
+    if state.player_mode == 1:
+        return ShipExpert.get_reward(state, action, prev_percent=prev_percent)
+    return 0.0
+
+
+def check_equivalence(frames, reward_context, slice_end):
+    states, actions, prev_actions, prev_percent, prev_dist = frames
+    params = compile_reward_config(reward_context)
+
+    batch = frame_reward_batch(
+        params, states['percent'], prev_percent, actions, prev_actions,
+        states['dist_nearest_hazard'], prev_dist, states['player_mode'], states['is_dead'], slice_end
+    )
+
+    mismatches = 0
+    for i in range(len(states)):
+        state = SharedState.from_buffer_copy(states[i].tobytes())
+        pa = None if prev_actions[i] < 0 else int(prev_actions[i])
+        pd = None if np.isnan(prev_dist[i]) else float(prev_dist[i])
+        ref = reference_reward(state, int(actions[i]), pa, float(prev_percent[i]), pd, reward_context, slice_end)
+        fast = frame_reward(params, state, int(actions[i]), pa, float(prev_percent[i]), pd, slice_end)
+        if ref != fast or ref != batch[i]:
+            mismatches += 1
+    return mismatches
+
+
+def bench(frames, reward_context, slice_end, repeats=3):
+    states, actions, prev_actions, prev_percent, prev_dist = frames
+    n = len(states)
+    params = compile_reward_config(reward_context)
+
+    # Per-frame paths operate on SharedState objects, like the live env
+    objs = [SharedState.from_buffer_copy(states[i].tobytes()) for i in range(min(n, 50000))]
+    pas = [None if a < 0 else int(a) for a in prev_actions[:len(objs)]]
+    pds = [None if np.isnan(d) else float(d) for d in prev_dist[:len(objs)]]
+    pps = prev_percent[:len(objs)].tolist()
+    acts = actions[:len(objs)].tolist()
+
+    t0 = time.perf_counter()
+    for i, s in enumerate(objs):
+        reference_reward(s, acts[i], pas[i], pps[i], pds[i], reward_context, slice_end)
+    ref_fps = len(objs) / (time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    for i, s in enumerate(objs):
+        frame_reward(params, s, acts[i], pas[i], pps[i], pds[i], slice_end)
+    scalar_fps = len(objs) / (time.perf_counter() - t0)
+
+    best = float('inf')
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        frame_reward_batch(
+            params, states['percent'], prev_percent, actions, prev_actions,
+            states['dist_nearest_hazard'], prev_dist, states['player_mode'], states['is_dead'], slice_end
+        )
+        best = min(best, time.perf_counter() - t0)
+    batch_fps = n / best
+
+    return ref_fps, scalar_fps, batch_fps
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reward engine equivalence + throughput")
+    parser.add_argument("--frames", type=int, default=200000)
+    parser.add_argument("--check", type=int, default=20000, help="frames checked against the experts")
+    args = parser.parse_args()
+
+    contexts = [
+        {},
+        {"progress_scale": 35.0, "jump_penalty": 0.002, "clearance_bonus": 0.05, "death_penalty": -50.0},
+    ]
+    for ctx in contexts:
+        for slice_end in (None, 31.0):
+            frames = random_frames(args.check, seed=len(ctx))
+            bad = check_equivalence(frames, ctx, slice_end)
+            status = "OK" if bad == 0 else f"FAIL ({bad} mismatches)"
+            print(f"[Equivalence] ctx={ctx or 'defaults'} slice_end={slice_end}: {status}")
+            if bad:
+                raise SystemExit(1)
+
+    ref_fps, scalar_fps, batch_fps = bench(random_frames(args.frames), {}, 31.0)
+    print(f"[Throughput] experts (dict ctx)  : {ref_fps:>14,.0f} frames/s")
+    print(f"[Throughput] compiled scalar     : {scalar_fps:>14,.0f} frames/s")
+    print(f"[Throughput] compiled NumPy batch: {batch_fps:>14,.0f} frames/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Flat DuelingDQN vs the masked object-set encoder (agents/set_encoder.py).
+
+  cost     observations of random-policy episodes over the whole simulated
+           level: occupied object slots per frame, multiply-accumulates per
+           decision (Linear layers; set encoder: per occupied slot), single
+           decision latency p50/p99 and a training-size batched
+           forward + backward.
+  train    scripted cube-only micro-slices as in benchmarks/rainbow.py
+           (--slice-width percent, CurriculumManager promotion rule, frame
+           budget, --epsilon-decay): frames and episodes to promotion per
+           encoder.
+
+Usage (from Stereo_Madness/):
+    python -m benchmarks.set_encoder --slices 2 3 4 --seeds 0 1 2 --max-frames 60000
+    python -m benchmarks.set_encoder --cost-only
+"""
+import argparse
+import time
+import numpy as np
+import torch
+import torch.nn as nn
+
+from config import *
+from core.sim_game import SimBridge, SimulatedGame, SimulatedLevel
+from core.state_utils import normalize_state
+from agents.ddqn import DuelingDQN
+from agents.set_encoder import OBJECT_FEATURES, PLAYER_FEATURES, SetDuelingDQN, object_mask
+from benchmarks.rainbow import train_slice
+
+VARIANTS = {
+    "flat": {'encoder': 'flat'},
+    "set-max": {'encoder': 'set', 'set_pooling': 'max'},
+    "set-attn": {'encoder': 'set', 'set_pooling': 'attention'},
+}
+
+
+def observation_trace(level, episodes=40, seed=0):
+    rng = np.random.default_rng(seed)
+    bridge = SimBridge(SimulatedGame(level, seed=seed))
+    trace = []
+    for ep in range(episodes):
+        bridge.send_checkpoint(ep * 100.0 / episodes)
+        bridge.send_reset()
+        for _ in range(400):
+            bridge.write_action(int(rng.random() < 0.08))
+            state = bridge.read_state()
+            trace.append(normalize_state(state))
+            if state.is_dead or state.is_terminal:
+                break
+    return np.array(trace, dtype=np.float32)
+
+
+def build(name):
+    cfg = VARIANTS[name]
+    if cfg['encoder'] == 'flat':
+        return DuelingDQN(INPUT_DIM, NUM_ACTIONS)
+    return SetDuelingDQN(INPUT_DIM, NUM_ACTIONS, embed_dim=SET_EMBED_DIM, pooling=cfg['set_pooling'])
+
+
+def macs(net, occupied):
+    """Multiply-accumulates per decision with `occupied` objects in the frame."""
+    total = 0.0
+    for name, m in net.named_modules():
+        if isinstance(m, nn.Linear):
+            per_object = name.startswith("encoder.")
+            total += m.in_features * m.out_features * (occupied if per_object else 1)
+    return total
+
+
+def time_single(net, trace):
+    net.eval()
+    lat = []
+    with torch.no_grad():
+        for obs in trace:
+            t0 = time.perf_counter_ns()
+            net(torch.from_numpy(obs).unsqueeze(0)).argmax().item()
+            lat.append((time.perf_counter_ns() - t0) / 1e3)
+    return np.array(lat)
+
+
+def time_batch(net, trace, batch=BATCH_SIZE, reps=200):
+    net.train()
+    rng = np.random.default_rng(0)
+    opt = torch.optim.Adam(net.parameters(), lr=LR)
+    t0 = time.perf_counter()
+    for _ in range(reps):
+        x = torch.from_numpy(trace[rng.integers(0, len(trace), batch)])
+        loss = net(x).pow(2).mean()
+        opt.zero_grad()
+        loss.backward()
+        opt.step()
+    return (time.perf_counter() - t0) / reps * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flat MLP vs masked object-set encoder")
+    parser.add_argument("--slices", type=int, nargs="+", default=[2, 3, 4])
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0, 1, 2])
+    parser.add_argument("--max-frames", type=int, default=60_000, help="budget per (slice, seed)")
+    parser.add_argument("--slice-width", type=float, default=3.0, help="percent; 0 = curriculum slices")
+    parser.add_argument("--level-seed", type=int, default=0)
+    parser.add_argument("--epsilon-decay", type=float, default=3000,
+                        help="steps; shorter than EPSILON_DECAY so the budget measures the network, not exploration")
+    parser.add_argument("--cost-only", action="store_true")
+    args = parser.parse_args()
+    torch.set_num_threads(1)
+
+    trace = observation_trace(SimulatedLevel(seed=args.level_seed))
+    occupied = object_mask(torch.from_numpy(trace[:, PLAYER_FEATURES:]).reshape(len(trace), -1, OBJECT_FEATURES)).sum(1)
+    occupied = occupied.numpy()
+    print(f"[SetEncoder] {len(trace):,} frames | occupied slots per frame mean {occupied.mean():.1f} "
+          f"p50 {np.percentile(occupied, 50):.0f} max {occupied.max()} (of 30)")
+    for name in VARIANTS:
+        torch.manual_seed(0)
+        net = build(name)
+        lat = time_single(net, trace)
+        params = sum(p.numel() for p in net.parameters())
+        print(f"[SetEncoder] {name:<8} | {params:>7,} params | MACs/decision {macs(net, occupied.mean()) / 1e3:6.1f} k "
+              f"(30 objects: {macs(net, 30) / 1e3:6.1f} k) | decision p50 {np.percentile(lat, 50):6.1f} us "
+              f"p99 {np.percentile(lat, 99):6.1f} us | batch {BATCH_SIZE} fwd+bwd {time_batch(net, trace):7.1f} us")
+    if args.cost_only:
+        return
+
+    scripted = None
+    if args.slice_width > 0:
+        w = args.slice_width
+        scripted = [{'id': i, 'start': (i - 1) * w, 'end': i * w, 'mode': 0} for i in range(1, max(args.slices) + 1)]
+    level = SimulatedLevel(seed=args.level_seed, slices=scripted)
+    slices = {s['id']: s for s in level.slices}
+    results = {}
+    for name, overrides in VARIANTS.items():
+        for sid in args.slices:
+            for seed in args.seeds:
+                t0 = time.perf_counter()
+                frames, episodes, promoted, _, _ = train_slice("ddqn", level, slices[sid], args.max_frames, seed,
+                                                               epsilon_decay=args.epsilon_decay, **overrides)
+                results[(name, sid, seed)] = (frames, episodes, promoted)
+                print(f"[SetEncoder] {name:<8} | Slice {sid} seed {seed} | "
+                      f"{'promoted' if promoted else 'budget  '} after {frames:>9,} frames / {episodes:>5} ep | "
+                      f"{time.perf_counter() - t0:6.1f} s")
+
+    print()
+    for sid in args.slices:
+        for name in VARIANTS:
+            rows = [results[(name, sid, seed)] for seed in args.seeds]
+            frames = [r[0] for r in rows if r[2]]
+            median = f"{int(np.median(frames)):,}" if frames else "-"
+            print(f"[SetEncoder] Slice {sid} | {name:<8} | promoted {len(frames)}/{len(rows)} | "
+                  f"median frames to promotion {median:>9}")
+
+
+if __name__ == "__main__":
+    main()
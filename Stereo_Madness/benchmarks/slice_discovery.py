@@ -0,0 +1,143 @@
+"""
+Episodes to full-level completion: hand-made slices vs discovered slices vs
+online plateau splitting, on a simulated learner.
+
+Training a DQN through the whole level per variant is too slow to compare
+curricula, so the learner is a skill model over the obstacles of the
+simulated level (core/sim_game.SimulatedLevel):
+  - obstacles closer than 100 px form one challenge; its initial failure
+    probability grows with its spikes and blocks, ship pillars and portals
+  - every attempt at a challenge lowers its failure probability
+    exponentially towards 1% (harder challenges learn slower)
+An episode starts at the slice start and ends at the first failed challenge
+or at the slice end. CurriculumManager decides promotions (and splits) and
+every episode goes to an episode log, exactly as in main.py.
+
+Variants:
+  hand     slice_definitions.json
+  split    hand + CurriculumManager online splitting (CURRICULUM_AUTO_SPLIT)
+  auto     curriculum/discovery.py proposal from the `hand` run's episode log
+           (same slice count, then --extra more slices)
+
+Usage (from Stereo_Madness/):
+    python -m benchmarks.slice_discovery --seeds 0 1 2
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import numpy as np
+
+from config import CURRICULUM_FILE
+from core.sim_game import PORTAL, SPEED, SPIKE, SimulatedLevel
+from curriculum.discovery import (load_episodes, log_episode, mode_segments, progress_histogram,
+                                  propose_slices)
+from curriculum.manager import CurriculumManager
+
+
+class SkillModel:
+    def __init__(self, level, rng, practice=150.0, residual=0.05):
+        self.rng = rng
+        self.length = level.length_px
+        groups = []
+        for x, y, w, h, kind in level.objects.tolist():
+            if groups and x - groups[-1][-1][0] < 100.0:
+                groups[-1].append((x, y, w, h, kind))
+            else:
+                groups.append([(x, y, w, h, kind)])
+        self.pos = np.array([g[0][0] / self.length * 100.0 for g in groups])
+        self.p0 = np.array([self._initial(g, level) for g in groups])
+        self.tau = practice * (1.0 + 5.0 * self.p0)
+        self.floor = 0.01 + residual * self.p0
+        self.attempts = np.zeros(len(groups))
+
+    @staticmethod
+    def _initial(group, level):
+        if any(kind == PORTAL for *_, kind in group):
+            return 0.2                                  # portal
+        if level.mode_at(group[0][0]) == 1:
+            return 0.3                                  # ship pillar
+        spikes = sum(kind == SPIKE for *_, kind in group)
+        blocks = len(group) - spikes
+        return 1.0 - 0.75 ** spikes * 0.9 ** blocks
+
+    def episode(self, start, end):
+        """End percent and whether the slice was cleared."""
+        for i in np.flatnonzero((self.pos >= start) & (self.pos < end)):
+            p = self.floor[i] + (self.p0[i] - self.floor[i]) * np.exp(-self.attempts[i] / self.tau[i])
+            self.attempts[i] += 1
+            if self.rng.random() < p:
+                return float(self.pos[i]), False
+        return float(end), True
+
+
+def run(slices, level, seed, auto_split, log_path, max_episodes=300_000):
+    """(episodes, frames, final slice count, most episodes on one slice, completed) to promote every slice."""
+    rng = np.random.default_rng(seed)
+    model = SkillModel(level, rng)
+    meta = os.path.join(tempfile.mkdtemp(), "meta.json")
+    with contextlib.redirect_stdout(io.StringIO()):
+        manager = CurriculumManager(meta_file=meta, slices=slices, auto_split=auto_split)
+        episodes = frames = 0
+        per_slice = {}
+        while episodes < max_episodes:
+            s = manager.get_current_slice()
+            percent, won = model.episode(s['start'], s['end'])
+            episodes += 1
+            per_slice[s['id']] = per_slice.get(s['id'], 0) + 1
+            frames += int((percent - s['start']) / 100.0 * level.length_px / SPEED)
+            log_episode(log_path, episodes, s['id'], s['start'], percent, not won)
+            manager.update(won, 0, percent=percent)
+            if manager.should_promote():
+                if not manager.advance_slice():
+                    return episodes, frames, len(manager.slices), max(per_slice.values()), True
+            elif manager.should_split():
+                manager.split_current_slice()
+                per_slice[s['id']] = 0  # the first half starts over under the same id
+    return episodes, frames, len(manager.slices), max(per_slice.values()), False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hand-made vs discovered vs split slices on a simulated learner")
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0, 1, 2])
+    parser.add_argument("--level-seed", type=int, default=0)
+    parser.add_argument("--extra", type=int, default=3, help="also try the proposal with this many more slices")
+    args = parser.parse_args()
+
+    with open(CURRICULUM_FILE, 'r') as f:
+        hand = json.load(f)
+    level = SimulatedLevel(seed=args.level_seed, slices=hand)
+    out = tempfile.mkdtemp()
+
+    results = {}
+    for seed in args.seeds:
+        hand_log = os.path.join(out, f"hand_{seed}.csv")
+        variants = [("hand", hand, False, hand_log), ("split", hand, True, os.path.join(out, f"split_{seed}.csv"))]
+        for name, slices, split, log in variants:
+            results.setdefault(name, []).append(run(slices, level, seed, split, log))
+
+        visits, deaths = progress_histogram(load_episodes([hand_log]))
+        for n in (len(hand), len(hand) + args.extra):
+            proposal = propose_slices(visits, deaths, mode_segments(hand), n)
+            name = f"auto x{n}"
+            # a fresh learner on the proposed slices (different seed stream than the pilot)
+            results.setdefault(name, []).append(
+                run(proposal, level, seed + 1000, False, os.path.join(out, f"auto{n}_{seed}.csv")))
+            if seed == args.seeds[0]:
+                print(f"[Discovery] {name}: " + ", ".join(f"{s['start']:g}-{s['end']:g}" for s in proposal))
+
+    print()
+    for name, rows in results.items():
+        ep = np.array([r[0] for r in rows])
+        fr = np.array([r[1] for r in rows])
+        done = sum(r[4] for r in rows)
+        print(f"[Discovery] {name:<9} | completed {done}/{len(rows)} | episodes to completion "
+              f"mean {ep.mean():9,.0f} (per seed {', '.join(f'{e:,}' for e in ep)}) | "
+              f"frames mean {fr.mean():12,.0f} | slowest slice {np.mean([r[3] for r in rows]):6,.0f} ep | "
+              f"slices {', '.join(str(r[2]) for r in rows)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+TaggedReplayBuffer: cost of filtered sampling, push and slice eviction as the
+buffer grows.
+
+Each buffer is filled by push() with a stream of synthetic transitions that
+walks through --slices curriculum slices in order (alternating cube/ship
+every third slice, like Stereo Madness), so the ring holds several slices
+of both modes. Per size it reports:
+
+  push      us per push (ring overwrite + group index upkeep)
+  mix       sample(batch) with the focus on the newest slice: 80% current,
+            20% rehearsal over older slices of the same mode
+  slice     sample(batch, slice_id=...) restricted to one older slice
+  mode      sample(batch, mode=...)
+  scan      the unindexed alternative: np.flatnonzero over a tag column,
+            then a uniform draw of row ids (no row gather; grows with the
+            buffer)
+  evict     evict_slice() of the oldest stored slice
+
+and checks that filtered batches only hold matching rows and that the mix
+hits the configured current-slice fraction.
+
+Usage (from Stereo_Madness/):
+    python -m benchmarks.tagged_replay --sizes 10000 100000 500000
+"""
+import argparse
+import time
+import numpy as np
+
+from config import BATCH_SIZE, INPUT_DIM, REPLAY_CURRENT_FRACTION
+from agents.replay_buffer import TaggedReplayBuffer
+
+
+def fill(buf, n, slices, state_dim, seed=0):
+    """Push n transitions, slice k covering the k-th chunk of the stream."""
+    rng = np.random.default_rng(seed)
+    states = rng.standard_normal((256, state_dim)).astype(np.float32)
+    chunk = -(-n // slices)
+    t0 = time.perf_counter()
+    for i in range(n):
+        sid = 1 + i // chunk
+        s = states[i % 256]
+        buf.push(s, i & 1, 0.1, s, 0.0, slice_id=sid, mode=(sid - 1) // 3 % 2, percent=i / n * 100.0)
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+def timed(fn, reps):
+    t0 = time.perf_counter()
+    for _ in range(reps):
+        out = fn()
+    return (time.perf_counter() - t0) / reps * 1e6, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Filtered replay sampling cost vs buffer size")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 500_000])
+    parser.add_argument("--slices", type=int, default=12, help="slices in the pushed stream")
+    parser.add_argument("--state-dim", type=int, default=INPUT_DIM)
+    parser.add_argument("--batch", type=int, default=BATCH_SIZE)
+    parser.add_argument("--reps", type=int, default=2000)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        buf = TaggedReplayBuffer(size, args.state_dim, current_fraction=REPLAY_CURRENT_FRACTION, seed=0)
+        push_us = fill(buf, size, args.slices, args.state_dim)
+        slice_tag = np.array([buf.group_key[g][0] for g in buf.group])
+        newest, oldest = args.slices, 1
+        mode = buf.group_key[buf.group_ids[next(k for k in buf.group_ids if k[0] == newest)]][1]
+        buf.focus(newest, mode)
+
+        mix_us, _ = timed(lambda: buf.sample(args.batch), args.reps)
+        rows = []
+        for _ in range(200):
+            buf.sample(args.batch)
+            rows.append(buf.last_rows)
+        rows = np.concatenate(rows)
+        tags = np.array([buf.group_key[g] for g in buf.group[rows]])
+        share = np.mean(tags[:, 0] == newest)
+        ok = bool(np.all(tags[:, 1] == mode))
+
+        probe = newest - 3  # an older slice of the same mode
+        slice_us, _ = timed(lambda: buf.sample(args.batch, slice_id=probe), args.reps)
+        ok &= bool(np.all(slice_tag[buf.last_rows] == probe))
+        mode_us, _ = timed(lambda: buf.sample(args.batch, mode=1 - mode), args.reps)
+        ok &= all(buf.group_key[g][1] == 1 - mode for g in buf.group[buf.last_rows])
+
+        rng = np.random.default_rng(0)
+        scan_us, _ = timed(lambda: rng.choice(np.flatnonzero(slice_tag == probe), args.batch), max(20, args.reps // 20))
+
+        before = len(buf)
+        t0 = time.perf_counter()
+        freed = buf.evict_slice(oldest)
+        evict_ms = (time.perf_counter() - t0) * 1e3
+        ok &= len(buf) == before - freed and not buf.groups(slice_id=oldest)
+        buf.sample(args.batch * 50, mode=0)
+        ok &= bool(np.all(slice_tag[buf.last_rows] != oldest))
+
+        print(f"[TaggedReplay] {size:>9,} rows | push {push_us:5.2f} us | batch {args.batch}: "
+              f"mix {mix_us:6.1f} us (current {share * 100:4.1f}%) | slice {slice_us:6.1f} us | "
+              f"mode {mode_us:6.1f} us | scan {scan_us:8.1f} us | evict {freed:,} rows {evict_ms:6.2f} ms | "
+              f"{buf.nbytes() / 2**20:7.1f} MiB | {'OK' if ok else 'MISMATCH'}")
+
+
+if __name__ == "__main__":
+    main()
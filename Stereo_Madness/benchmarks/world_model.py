@@ -0,0 +1,113 @@
+"""
+Live frames to promotion with and without the world model (agents/world_model.py).
+
+Same scripted setup as benchmarks/rainbow.py: cube-only micro-slices of the
+simulated level (--slice-width percent), a fresh DDQN agent per (variant,
+slice, seed), the CurriculumManager promotion rule (>= 20 episodes, >= 70%
+wins over the last 50) and a live frame budget. Variants:
+
+  real      one agent.learn per live step on real replay (main.py today)
+  real x2   one extra update per live step, real batches only (replay ratio
+            control: the model variant also doubles the updates)
+  model     ModelBasedReplay defaults: one extra update per live step, half
+            of every batch imagined while the model error is below the gate
+
+Reported per run: live frames and episodes to promotion, wall time and, for
+the model variant, the last one-step error check.
+
+Usage (from Stereo_Madness/):
+    python -m benchmarks.world_model --slices 2 4 --seeds 0 1 2 --max-frames 60000
+"""
+import argparse
+import tempfile
+import time
+import numpy as np
+import torch
+
+from config import *
+from core.environment import GeometryDashEnv
+from core.seeding import seed_everything
+from core.sim_game import SimBridge, SimulatedGame, SimulatedLevel
+from agents.ddqn import make_agent
+from agents.replay_buffer import ReplayBuffer
+from agents.world_model import ModelBasedReplay
+from tuning.sweep import train_episode
+
+VARIANTS = {
+    "real": None,
+    "real x2": {'imagined_fraction': 0.0, 'max_error': float("inf")},
+    "model": {},
+}
+
+
+def train_slice(level, current_slice, max_frames, seed, world_model, epsilon_decay):
+    """(frames, episodes, promoted, memory) for one fresh DDQN agent on one slice."""
+    seed_everything(seed)
+    bridge = SimBridge(SimulatedGame(level, seed=seed))
+    bridge.send_checkpoint(current_slice['start'])
+    env = GeometryDashEnv(bridge=bridge, frame_skip=FRAME_SKIP, action_repeats=ACTION_REPEATS,
+                          frame_gamma=FRAME_GAMMA if ACTION_REPEATS else 1.0)
+    env.set_slice(current_slice)
+    agent = make_agent(INPUT_DIM, NUM_ACTIONS, make_agent_config(epsilon_decay=epsilon_decay), tempfile.mkdtemp())
+    memory = ReplayBuffer(MEMORY_SIZE)
+    if world_model is not None:
+        memory = ModelBasedReplay(memory, agent, INPUT_DIM, NUM_ACTIONS, **world_model)
+
+    frames = episodes = 0
+    wins = []
+    while frames < max_frames:
+        _, _, steps, won = train_episode(env, agent, memory, current_slice)
+        frames += steps * FRAME_SKIP
+        episodes += 1
+        wins = (wins + [float(won)])[-50:]
+        if len(wins) >= 20 and np.mean(wins) >= 0.70:
+            return frames, episodes, True, memory
+    return frames, episodes, False, memory
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Live frames to promotion with and without imagined rollouts")
+    parser.add_argument("--variants", nargs="+", default=list(VARIANTS), choices=list(VARIANTS))
+    parser.add_argument("--slices", type=int, nargs="+", default=[2, 4])
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0, 1, 2])
+    parser.add_argument("--max-frames", type=int, default=60_000, help="live frame budget per (slice, seed)")
+    parser.add_argument("--slice-width", type=float, default=3.0, help="percent; 0 = curriculum slices")
+    parser.add_argument("--level-seed", type=int, default=0)
+    parser.add_argument("--epsilon-decay", type=float, default=3000,
+                        help="steps; shorter than EPSILON_DECAY so the budget measures learning, not exploration")
+    args = parser.parse_args()
+    torch.set_num_threads(1)
+
+    scripted = None
+    if args.slice_width > 0:
+        w = args.slice_width
+        scripted = [{'id': i, 'start': (i - 1) * w, 'end': i * w, 'mode': 0} for i in range(1, max(args.slices) + 1)]
+    level = SimulatedLevel(seed=args.level_seed, slices=scripted)
+    slices = {s['id']: s for s in level.slices}
+    results = {}
+    for name in args.variants:
+        world_model = VARIANTS[name]
+        for sid in args.slices:
+            for seed in args.seeds:
+                t0 = time.perf_counter()
+                frames, episodes, promoted, memory = train_slice(level, slices[sid], args.max_frames, seed,
+                                                                 world_model, args.epsilon_decay)
+                results[(name, sid, seed)] = (frames, episodes, promoted)
+                print(f"[WorldModel] {name:<7} | Slice {sid} seed {seed} | "
+                      f"{'promoted' if promoted else 'budget  '} after {frames:>9,} frames / {episodes:>5} ep | "
+                      f"{time.perf_counter() - t0:6.1f} s")
+                if name == "model":
+                    print(f"             {memory.summary()}")
+
+    print()
+    for sid in args.slices:
+        for name in args.variants:
+            rows = [results[(name, sid, seed)] for seed in args.seeds]
+            frames = [r[0] for r in rows if r[2]]
+            median = f"{int(np.median(frames)):,}" if frames else "-"
+            print(f"[WorldModel] Slice {sid} | {name:<7} | promoted {len(frames)}/{len(rows)} | "
+                  f"median live frames to promotion {median:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,15 +9,55 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 CHECKPOINT_DIR = os.path.join(BASE_DIR, "checkpoints")
 LOG_DIR = os.path.join(BASE_DIR, "logs")
 CURRICULUM_FILE = os.path.join(BASE_DIR, "curriculum", "slice_definitions.json")
+TRAJECTORY_DIR = os.path.join(BASE_DIR, "trajectories")
+DATASET_DIR = os.path.join(BASE_DIR, "datasets", "gameplay")
+SWEEP_DIR = os.path.join(BASE_DIR, "sweeps")
 
 # Log Files
 TRAIN_LOG = os.path.join(LOG_DIR, "training_log.csv")
 DEATH_LOG = os.path.join(LOG_DIR, "death_log.csv")
 META_FILE = os.path.join(LOG_DIR, "training_meta.json")
 
+# RECORDING (raw SharedState frames for offline reward relabeling)
+RECORD_TRAJECTORIES = False
+# Step-level transition dataset (offline pretraining, see offline/pretrain.py)
+RECORD_DATASET = False
+# Bridge traffic log: every SharedState read + action written (replay with core.bridge_log.ReplayBridge)
+RECORD_BRIDGE_LOG = False
+BRIDGE_LOG_FILE = os.path.join(LOG_DIR, "bridge.gdlog")
+# Level map: absolute object positions accumulated from the streamed objects (core/level_map.py)
+LEVEL_MAP = False
+LEVEL_MAP_FILE = os.path.join(LOG_DIR, "level_map.npz")
+LEVEL_MAP_ORIGIN = (30.0, 15.0)  # objects' dx/dy are measured from (player_x + 30, player_y + 15)
+LEVEL_MAP_QUANTUM = 1.0          # px; objects matching on this grid are the same object
+
+# PIPELINED INFERENCE (play_stereo_madness.py: inference thread overlapped with the game, core/pipeline.py)
+PIPELINED_INFERENCE = False
+PIPELINE_MAX_STALENESS = 8   # frames; older decisions are dropped (release instead)
+
+# TELEMETRY (hot-path spans/histograms, see core/telemetry.py)
+TELEMETRY = False
+TELEMETRY_LOG_EVERY = 10     # episodes between [Perf] summary lines
+TELEMETRY_PORT = None        # e.g. 9464 to serve Prometheus text on /metrics
+PROFILE_STEPS = 300          # steps captured after SIGUSR1 / Ctrl+Break
+PROFILE_KIND = "torch"       # "torch" (chrome trace) or "cprofile"
+PROFILE_DIR = os.path.join(LOG_DIR, "profiles")
+
+# BRIDGE WATCHDOG (core/watchdog.py: stale-frame detection, reconnect, salvage)
+BRIDGE_WATCHDOG = False
+WATCHDOG_STALL_SECONDS = 3.0        # no new game frame for this long = hung/crashed game
+WATCHDOG_RETRY_SECONDS = 1.0        # between reconnect attempts
+WATCHDOG_MAX_OUTAGE_SECONDS = 600.0  # give up (salvage and exit) after this long without a game
+EPISODE_MAX_STEPS = None            # decisions per episode before truncation, e.g. 3000 (the full level is ~1400)
+EPISODE_MAX_SECONDS = None          # wall-clock episode limit, e.g. 180.0
+SALVAGE_FILE = os.path.join(CHECKPOINT_DIR, "salvage.pth")  # agent + optimizer on abnormal exit
+SALVAGE_REPLAY_FILE = os.path.join(CHECKPOINT_DIR, "salvage_replay.pkl")
+
 # SHARED MEMORY
 MEM_NAME = "GD_RL_Memory"
 MEM_SIZE_BYTES = 1024  # Matches C++ struct size
+MEM_BACKEND = None     # None = platform default, "windows" (named mapping) or "posix" (/dev/shm)
+POSIX_SHM_DIR = "/dev/shm"
 
 # DEVICE
 DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu") # I have only CPU :/
@@ -27,14 +67,118 @@ GAMMA = 0.99                # Discount Factor (Future reward importance)
 BATCH_SIZE = 64             # Replay Buffer Batch Size
 LR = 0.0003                 # Learning Rate
 MEMORY_SIZE = 50000         # Max Transitions in Buffer
+REPLAY_MODE = "transitions"  # "frames": store single frames, rebuild stacks at sample time; "tagged": slice/mode tagged rows
+REPLAY_CODEC = "float32"     # frames mode storage: "float32", "float16" or "int16" (core/obs_codec.py)
+REPLAY_CURRENT_FRACTION = 0.8  # tagged mode: batch share from the current slice, rest rehearses other same-mode slices
+REPLAY_EVICT_OTHER_MODE = False  # tagged mode: on promotion to a slice of the other mode, drop the old mode's slices
 TARGET_UPDATE = 1000        # Steps between Target Net updates
 
+# WORLD MODEL (agents/world_model.py: learned dynamics, Dyna-style imagined transitions in the batches)
+WORLD_MODEL = False
+WORLD_MODEL_IMAGINED_FRACTION = 0.5  # share of each learn batch from imagined rollouts (real : imagined = 1 : 1)
+WORLD_MODEL_HORIZON = 3         # imagined steps per rollout
+WORLD_MODEL_ROLLOUTS = 256      # real start states per rollout round
+WORLD_MODEL_ROLLOUT_EVERY = 250  # real steps between rounds (and between model error checks)
+WORLD_MODEL_TRAIN_EVERY = 2     # real steps per world model gradient step
+WORLD_MODEL_EXTRA_UPDATES = 1   # agent.learn calls per real step on top of the usual one, while imagining
+WORLD_MODEL_MAX_ERROR = 0.5     # normalized one-step state error above which imagination pauses
+
+# CURRICULUM SPLITTING (online, see curriculum/discovery.py for offline re-slicing)
+CURRICULUM_AUTO_SPLIT = False  # split a slice whose win rate plateaus in two
+SPLIT_PLATEAU_EPISODES = 300   # episodes without a new best win rate before splitting
+SPLIT_MIN_WIDTH = 2.0          # percent; no split creates a narrower slice
+
+# BACKGROUND EVALUATION (curriculum/evaluator.py)
+EVAL_IN_BACKGROUND = False  # greedy evaluation of weight snapshots in a side process
+EVAL_EVERY_EPISODES = 50    # snapshot period (training episodes)
+EVAL_EPISODES = 10          # greedy episodes per snapshot
+EVAL_BRIDGE = "sim"         # "sim" (simulated level, not Stereo Madness) or "memory" (another game instance,
+                            # practice checkpoint placed at the slice start by hand)
+EVAL_INSTANCE = 1           # MemoryBridge instance for EVAL_BRIDGE = "memory"
+EVAL_GATE_PROMOTION = False  # promote only when the latest evaluation also passes (needs EVAL_BRIDGE = "memory")
+EVAL_PROMOTE_WIN_RATE = 0.7
+
+# ACTOR FLEET (fleet/: actors on game machines stream transitions to one learner over TCP)
+FLEET_HOST = "0.0.0.0"      # learner bind address (actors get --host)
+FLEET_PORT = 5555
+FLEET_BATCH_SIZE = 256      # transitions per network batch
+FLEET_WINDOW = 4            # unacknowledged batches in flight per actor
+FLEET_MAX_OUTBOX = 64       # batches an actor keeps while the learner lags (oldest dropped)
+FLEET_MAX_PENDING = 16      # received batches waiting for training before acks stall
+FLEET_REPLAY_RATIO = 0.25   # learner updates per received transition
+FLEET_PUBLISH_EVERY = 200   # learner updates between weight pushes
+FLEET_CODEC = "float32"     # observation codec on the wire (core/obs_codec.py)
+FLEET_EPSILON = 0.4         # actor i of N explores with FLEET_EPSILON ** (1 + 7 i / (N - 1))
+
+# MODEL LAYOUT
+MULTI_HEAD = False          # True: one shared-trunk model with a cube and a ship head instead of per-slice experts
+                            # (needs REPLAY_MODE = "tagged": earlier slices are rehearsed from it)
+MULTI_HEAD_MODEL = "multi_head_model.pth"  # in final_models
+MULTI_HEAD_FREEZE_TRUNK = True  # once the shared model exists, later slices fine-tune only the heads
+OBS_ENCODER = "flat"        # "flat" (DuelingDQN) or "set": shared per-object MLP + masked pooling (agents/set_encoder.py)
+SET_EMBED_DIM = 64          # per-object embedding size of the set encoder
+SET_POOLING = "max"         # "max" or "attention" (one learned query, softmax over each frame's objects)
+DISTILLED_MODEL = None      # e.g. os.path.join(CHECKPOINT_DIR, "student", "student_int8.pth") (offline/distill.py)
+
+# ALGORITHM
+AGENT_ALGORITHM = "ddqn"    # "ddqn" (agents/ddqn.py) or "rainbow": C51 + noisy nets + dueling double DQN (agents/rainbow.py)
+RAINBOW_ATOMS = 51
+RAINBOW_V_MIN = -200.0      # return support: death penalty -100 ... finish bonus 1000 + progress
+RAINBOW_V_MAX = 1200.0
+NOISY_SIGMA = 0.5           # initial noise scale of the noisy layers
+
+# TEMPORAL ABSTRACTION
+FRAME_SKIP = 4              # Frames per decision with a fixed repeat
+ACTION_REPEATS = None       # e.g. (1, 2, 4, 8): the agent picks hold/release x repeat length
+FRAME_GAMMA = GAMMA ** (1.0 / FRAME_SKIP)  # per-frame discount: FRAME_SKIP frames still discount by GAMMA
+
 # EXPLORATION (Epsilon Greedy)
 EPSILON_START = 1
 EPSILON_END = 0.01
 EPSILON_DECAY = 50000       # Decay over approx 50000 frames
 
+# NOVELTY BONUS (agents/novelty.py: count-based intrinsic reward, one hashed visitation table per slice)
+NOVELTY = False
+NOVELTY_BETA = 0.2          # bonus of a first visit (progress pays ~1.5 per decision)
+NOVELTY_HALF_LIFE = 5000    # decisions on a slice after which the bonus scale halves (0 = no decay)
+NOVELTY_TABLE_BITS = 18     # 2**18 counters per sketch row
+NOVELTY_DEPTH = 2           # count-min rows (memory: 4 * depth * 2**bits bytes = 2 MiB)
+NOVELTY_BINS = {'percent': 0.1, 'y': 15.0, 'vel_y': 2.0, 'hazard': 30.0, 'hazard_max': 600.0}  # %, px, px/frame, px
+NOVELTY_FILE = "slice_{:02d}_novelty.npz"  # in CHECKPOINT_DIR, next to slice_XX_current.pth
+
 # INPUT SHAPE
 # 4 Player Vars + (30 Objects * 5 Vars) = 154 inputs
 INPUT_DIM = 154
 OUTPUT_DIM = 2 # (Hold or Release)
+NUM_ACTIONS = 2 * len(ACTION_REPEATS) if ACTION_REPEATS else OUTPUT_DIM
+
+
+def make_agent_config(**overrides):
+    """
+    Agent hyperparameter dict built from the globals above.
+    Keyword overrides win, so several configurations can coexist in one process.
+    """
+    agent_config = {
+        'device': DEVICE,
+        'lr': LR,
+        'gamma': GAMMA,
+        'batch_size': BATCH_SIZE,
+        'target_update': TARGET_UPDATE,
+        'epsilon_start': EPSILON_START,
+        'epsilon_end': EPSILON_END,
+        'epsilon_decay': EPSILON_DECAY,
+        'multi_head': MULTI_HEAD,
+        'num_heads': 2,
+        'action_repeats': ACTION_REPEATS,
+        'frame_gamma': FRAME_GAMMA,
+        'algorithm': AGENT_ALGORITHM,
+        'atoms': RAINBOW_ATOMS,
+        'v_min': RAINBOW_V_MIN,
+        'v_max': RAINBOW_V_MAX,
+        'noisy_sigma': NOISY_SIGMA,
+        'encoder': OBS_ENCODER,
+        'set_embed_dim': SET_EMBED_DIM,
+        'set_pooling': SET_POOLING,
+    }
+    agent_config.update(overrides)
+    return agent_config
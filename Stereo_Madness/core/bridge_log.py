@@ -0,0 +1,361 @@
+"""
+Record the bridge traffic of a run and replay it without a game.
+
+RecordingBridge wraps any bridge (MemoryBridge, SimBridge, ...) and appends
+one record per read_state to a memory-mapped log: the raw SharedState bytes,
+the action written since the previous read (-1 = none), whether a reset was
+sent, a perf_counter_ns timestamp and the game frame index.
+
+ReplayBridge serves a log back through the same interface at full speed:
+  open    frames are served in recorded order whatever the consumer writes
+  closed  every write_action / send_reset is checked against the log; a
+          differing action is a divergence (raised, or counted and replayed
+          open-loop with on_divergence="count")
+
+Log layout (little endian): a 64-byte LogHeader, then `count` fixed-size
+records (RECORD_DTYPE). The header count is updated on every append, so a
+log cut short by a crash stays readable.
+
+Usage (from Stereo_Madness/):
+    python -m core.bridge_log record --out logs/run.gdlog --episodes 20
+    python -m core.bridge_log replay logs/run.gdlog --mode closed
+"""
+import argparse
+import ctypes
+import mmap
+import os
+import struct
+import time
+import numpy as np
+
+from core.memory_bridge import SharedState
+
+LOG_MAGIC = 0x474C4447      # b"GDLG" little endian
+LOG_VERSION = 1
+LOG_HEADER_SIZE = 64
+FLAG_RESET = 1              # a send_reset preceded this read
+
+STATE_SIZE = ctypes.sizeof(SharedState)
+RECORD_DTYPE = np.dtype([
+    ('t_ns', '<u8'),
+    ('frame', '<i8'),        # bridge frame_index(), else the read counter
+    ('action', '<i4'),       # written since the previous read, -1 = none
+    ('flags', '<u4'),
+    ('state', np.uint8, STATE_SIZE),
+])
+RECORD_SIZE = RECORD_DTYPE.itemsize
+_META = struct.Struct("<QqiI")
+
+
+class LogHeader(ctypes.Structure):
+    _fields_ = [
+        ("magic", ctypes.c_uint32),
+        ("version", ctypes.c_uint32),
+        ("header_size", ctypes.c_uint32),
+        ("state_size", ctypes.c_uint32),
+        ("record_size", ctypes.c_uint32),
+        ("reserved", ctypes.c_uint32),
+        ("count", ctypes.c_uint64),
+        ("t0_ns", ctypes.c_uint64),
+    ]
+
+
+def _check_header(header, path):
+    if header.magic != LOG_MAGIC:
+        raise ValueError(f"[BridgeLog] '{path}' is not a bridge log")
+    if header.version != LOG_VERSION:
+        raise ValueError(f"[BridgeLog] '{path}': version {header.version}, expected {LOG_VERSION}")
+    if header.state_size != STATE_SIZE or header.record_size != RECORD_SIZE:
+        raise ValueError(f"[BridgeLog] '{path}': SharedState is {header.state_size} bytes, "
+                         f"this build expects {STATE_SIZE}")
+
+
+class BridgeLogWriter:
+    """Appends records to a preallocated log file, doubling it when full."""
+
+    def __init__(self, path, capacity=16384):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        exists = os.path.exists(path) and os.path.getsize(path) >= LOG_HEADER_SIZE
+        self.file = open(path, "r+b" if exists else "w+b")
+        if exists:
+            header = LogHeader.from_buffer_copy(self.file.read(ctypes.sizeof(LogHeader)))
+            _check_header(header, path)
+            self.count = header.count
+            t0 = header.t0_ns
+        else:
+            self.count = 0
+            t0 = time.perf_counter_ns()
+        self.capacity = max(capacity, self.count)
+        self._map(t0 if not exists else None)
+
+    def _map(self, t0_ns=None):
+        self.file.truncate(LOG_HEADER_SIZE + self.capacity * RECORD_SIZE)
+        self.buf = mmap.mmap(self.file.fileno(), 0)
+        self.header = LogHeader.from_buffer(self.buf)
+        if t0_ns is not None:
+            h = self.header
+            h.magic, h.version, h.header_size = LOG_MAGIC, LOG_VERSION, LOG_HEADER_SIZE
+            h.state_size, h.record_size, h.count, h.t0_ns = STATE_SIZE, RECORD_SIZE, 0, t0_ns
+
+    def _unmap(self):
+        self.header = None
+        self.buf.flush()
+        self.buf.close()
+
+    def append(self, state, action, flags, frame):
+        if self.count == self.capacity:
+            self._unmap()
+            self.capacity *= 2
+            self._map()
+        off = LOG_HEADER_SIZE + self.count * RECORD_SIZE
+        _META.pack_into(self.buf, off, time.perf_counter_ns(), frame, action, flags)
+        off += _META.size
+        self.buf[off:off + STATE_SIZE] = ctypes.string_at(ctypes.addressof(state), STATE_SIZE)
+        self.count += 1
+        self.header.count = self.count
+
+    def close(self):
+        if self.file.closed:
+            return
+        self._unmap()
+        self.file.truncate(LOG_HEADER_SIZE + self.count * RECORD_SIZE)
+        self.file.close()
+
+
+def load_log(path):
+    """Records of a log as a read-only memmap (RECORD_DTYPE)."""
+    with open(path, "rb") as f:
+        header = LogHeader.from_buffer_copy(f.read(ctypes.sizeof(LogHeader)))
+        size = os.fstat(f.fileno()).st_size
+    _check_header(header, path)
+    # the header count may trail a capacity-sized file or lead a truncated one
+    count = min(header.count, (size - LOG_HEADER_SIZE) // RECORD_SIZE)
+    if count == 0:
+        return np.zeros(0, dtype=RECORD_DTYPE)
+    return np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=LOG_HEADER_SIZE, shape=(count,))
+
+
+class RecordingBridge:
+    """Bridge wrapper logging every frame the consumer reads."""
+
+    def __init__(self, bridge, path, capacity=16384):
+        self.bridge = bridge
+        self.log = BridgeLogWriter(path, capacity)
+        self._action = -1
+        self._flags = 0
+        self._reads = 0
+        print(f"[BridgeLog] Recording to '{path}' ({self.log.count} records already)")
+
+    def __getattr__(self, name):
+        # free_running, reset_delay, send_checkpoint, seed, ... of the wrapped bridge
+        return getattr(self.bridge, name)
+
+    def read_state(self):
+        state = self.bridge.read_state()
+        frame = self.bridge.frame_index()
+        self.log.append(state, self._action, self._flags, self._reads if frame is None else frame)
+        self._reads += 1
+        self._action = -1
+        self._flags = 0
+        return state
+
+    def write_action(self, action: int):
+        self._action = int(action)
+        self.bridge.write_action(action)
+
+    def send_reset(self):
+        self._action = -1
+        self._flags |= FLAG_RESET
+        self.bridge.send_reset()
+
+    def frame_index(self):
+        return self.bridge.frame_index()
+
+    def close(self):
+        self.log.close()
+        self.bridge.close()
+
+
+class ReplayDivergence(RuntimeError):
+    pass
+
+
+class ReplayBridge:
+    """
+    MemoryBridge stand-in serving a recorded log. Every read_state consumes
+    one record; send_reset skips to the next recorded reset.
+    """
+
+    free_running = False
+    reset_delay = 0.0
+
+    def __init__(self, path, mode="open", on_divergence="raise", loop=False):
+        if mode not in ("open", "closed"):
+            raise ValueError(f"[Replay] Unknown mode '{mode}'")
+        self.records = load_log(path)
+        if len(self.records) == 0:
+            raise ValueError(f"[Replay] '{path}' has no records")
+        self.mode = mode
+        self.on_divergence = on_divergence
+        self.loop = loop
+        self.resets = np.flatnonzero(self.records['flags'] & FLAG_RESET)
+        # row i of the log: its SharedState bytes start here
+        self._base = self.records.ctypes.data + RECORD_DTYPE.fields['state'][1]
+        self.state = SharedState()
+        self._dst = ctypes.addressof(self.state)
+
+        self.cursor = -1      # record served by the last read_state
+        self._action = None
+        self._reset = False
+        self.divergences = 0
+        self.first_divergence = None
+        self.overruns = 0     # reads past the end of a recorded episode (frame held)
+        self.served = 0
+
+    def _diverged(self, index, message):
+        self.divergences += 1
+        if self.first_divergence is None:
+            self.first_divergence = (int(index), message)
+        if self.on_divergence == "raise":
+            raise ReplayDivergence(f"[Replay] Record {index} (frame {int(self.records['frame'][index])}): {message}")
+
+    def _next_reset(self):
+        later = self.resets[self.resets > self.cursor]
+        if len(later):
+            return int(later[0])
+        if self.loop and len(self.resets):
+            return int(self.resets[0])
+        raise EOFError("[Replay] No recorded episode left")
+
+    def read_state(self):
+        if self._reset:
+            nxt = self._next_reset()
+            if self.mode == "closed" and nxt != self.cursor + 1 and self.cursor >= 0:
+                self._diverged(nxt, f"reset {nxt - self.cursor - 1} frames before the recorded one")
+        else:
+            nxt = self.cursor + 1
+            if nxt == len(self.records):
+                if not self.loop:
+                    raise EOFError("[Replay] End of log")
+                nxt = 0
+            if self.records['flags'][nxt] & FLAG_RESET:
+                # the consumer plays on where the recording reset: hold the last frame
+                self.overruns += 1
+                if self.mode == "closed":
+                    self._diverged(nxt, "episode continues past the recorded reset")
+                nxt = self.cursor
+            elif self.mode == "closed" and self._action is not None:
+                recorded = int(self.records['action'][nxt])
+                if recorded != self._action:
+                    self._diverged(nxt, f"action {self._action}, recorded {recorded}")
+
+        self.cursor = nxt
+        self._action = None
+        self._reset = False
+        self.served += 1
+        ctypes.memmove(self._dst, self._base + nxt * RECORD_SIZE, STATE_SIZE)
+        return self.state
+
+    def write_action(self, action: int):
+        self._action = int(action)
+
+    def send_reset(self):
+        self._reset = True
+        self._action = None
+
+    def frame_index(self):
+        return None if self.cursor < 0 else int(self.records['frame'][self.cursor])
+
+    def episodes(self):
+        return len(self.resets)
+
+    def close(self):
+        self.records = None
+
+
+# CLI
+def _greedy_agent(models_dir):
+    import torch
+    from config import INPUT_DIM, NUM_ACTIONS, CHECKPOINT_DIR, make_agent_config
+    from agents.ddqn import make_agent
+    from benchmarks.full_level import load_expert_chain
+    torch.set_num_threads(1)
+    agent = make_agent(INPUT_DIM, NUM_ACTIONS, make_agent_config(device="cpu"), CHECKPOINT_DIR)
+    agent.online_net.eval()
+    return agent, load_expert_chain(models_dir)
+
+
+def play(env, agent, chain, slices, episodes, max_steps=5000):
+    """Greedy expert-chain episodes from 0%; returns per-episode (percent, reward sum, steps)."""
+    out = []
+    for _ in range(episodes):
+        try:
+            obs, info = env.reset()
+        except EOFError:
+            break
+        active, total, steps = None, 0.0, 0
+        for steps in range(1, max_steps + 1):
+            pct = float(info['percent'])
+            sid = next((s['id'] for s in slices if s['start'] <= pct < s['end']), None)
+            if sid is not None and sid != active and sid in chain:
+                agent.online_net.load_state_dict(chain[sid])
+                active = sid
+            obs, reward, terminated, _, info = env.step(agent.select_action(obs, is_training=False))
+            total += reward
+            if terminated or info['percent'] >= 100.0:
+                break
+        out.append((round(float(info['percent']), 4), round(total, 4), steps))
+    return out
+
+
+def main():
+    from config import CHECKPOINT_DIR, FRAME_SKIP
+    from core.environment import GeometryDashEnv
+    from core.sim_game import SimBridge, SimulatedGame, SimulatedLevel
+
+    parser = argparse.ArgumentParser(description="Record / replay bridge traffic")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    rec = sub.add_parser("record", help="play the expert chain on a bridge and log it")
+    rec.add_argument("--out", required=True)
+    rec.add_argument("--bridge", choices=("sim", "memory"), default="sim")
+    rec.add_argument("--episodes", type=int, default=20)
+    rec.add_argument("--level-seed", type=int, default=0)
+    rep = sub.add_parser("replay", help="serve a log to the same env/agent stack")
+    rep.add_argument("log")
+    rep.add_argument("--mode", choices=("open", "closed"), default="closed")
+    rep.add_argument("--episodes", type=int, default=1000)
+    parser.add_argument("--models", default=os.path.join(CHECKPOINT_DIR, "final_models"))
+    args = parser.parse_args()
+
+    agent, chain = _greedy_agent(args.models)
+    slices = sorted(SimulatedLevel().slices, key=lambda s: s['start'])
+    if args.cmd == "record":
+        if args.bridge == "sim":
+            inner = SimBridge(SimulatedGame(SimulatedLevel(seed=args.level_seed)))
+        else:
+            from core.memory_bridge import MemoryBridge
+            inner = MemoryBridge()
+        bridge = RecordingBridge(inner, args.out)
+        episodes = args.episodes
+    else:
+        bridge = ReplayBridge(args.log, mode=args.mode, on_divergence="count")
+        episodes = min(args.episodes, bridge.episodes())
+
+    env = GeometryDashEnv(bridge=bridge, frame_skip=FRAME_SKIP)
+    t0 = time.perf_counter()
+    try:
+        results = play(env, agent, chain, slices, episodes)
+    finally:
+        bridge.close()
+    elapsed = time.perf_counter() - t0
+    steps = sum(r[2] for r in results)
+    print(f"[BridgeLog] {len(results)} episodes / {steps} steps in {elapsed:.2f} s "
+          f"({steps / max(elapsed, 1e-9):,.0f} steps/s) | final percent {[r[0] for r in results]}")
+    if args.cmd == "replay":
+        print(f"[Replay] {bridge.served} frames served | divergences {bridge.divergences} "
+              f"(first: {bridge.first_divergence}) | overruns {bridge.overruns}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,27 +2,34 @@ import gymnasium as gym
 from gymnasium import spaces
 import numpy as np
 import time
-from collections import deque
 
+from core import telemetry
+from core.frame_stack import FrameRing
 from core.memory_bridge import MemoryBridge
 from core.state_utils import normalize_state
+from core.watchdog import BridgeStall
 from config import INPUT_DIM
-from agents.expert_cube import CubeExpert
-from agents.expert_ship import ShipExpert  
+from agents.reward_engine import compile_reward_config, frame_reward
 
 class GeometryDashEnv(gym.Env):
-    def __init__(self):
+    def __init__(self, bridge=None, frame_skip=1, frame_stack=1, action_repeats=None, frame_gamma=1.0):
         # configurable frame-skip and frame-stack (keep defaults 1 to preserve backward compat)
-        self.frame_skip = 1
-        self.frame_stack = 1
+        self.frame_skip = frame_skip
+        self.frame_stack = frame_stack
+        # agent-chosen repeat: action a = hold/release (a % 2) for action_repeats[a // 2] frames,
+        # replacing frame_skip; frame rewards inside a segment are discounted by frame_gamma
+        self.action_repeats = tuple(action_repeats) if action_repeats else None
+        self.frame_gamma = frame_gamma
 
         super(GeometryDashEnv, self).__init__()
         
-        # Connect to the game
-        self.bridge = MemoryBridge()
+        # Connect to the game (or a stand-in such as core.sim_game.SimBridge)
+        self.bridge = bridge if bridge is not None else MemoryBridge()
+        # seconds to wait for the game to respawn after send_reset
+        self.reset_delay = getattr(self.bridge, "reset_delay", 0.0)
         
-        # Action: 0 = Release, 1 = Hold/Jump
-        self.action_space = spaces.Discrete(2)
+        # Action: 0 = Release, 1 = Hold/Jump (x repeat lengths when action_repeats is set)
+        self.action_space = spaces.Discrete(2 * len(self.action_repeats) if self.action_repeats else 2)
         
         # Observation: single-frame or stacked frames
         obs_shape = (INPUT_DIM * self.frame_stack,)
@@ -36,41 +43,101 @@ class GeometryDashEnv(gym.Env):
         self.prev_dist_nearest_hazard = None
         self.steps_in_episode = 0
         self.prev_action = None
-        # frame buffer used when frame_stack > 1
-        self._frame_buffer = deque(maxlen=self.frame_stack)
+        self.prev_mode = 0
+        # truncation limits (None = unlimited): decisions, wall-clock seconds per episode
+        self.max_episode_steps = None
+        self.max_episode_seconds = None
+        self.episode_start = time.perf_counter()
+        # optional offline.trajectory_store.TrajectoryWriter (raw frame recording)
+        self.recorder = None
+        # optional core.level_map.LevelMap (absolute object map, death causes)
+        self.level_map = None
+        # optional agents.novelty.NoveltyBonus (count-based intrinsic reward, added per step)
+        self.novelty = None
+        # compiled reward config (parsed once, see set_reward_config)
+        self.reward_params = compile_reward_config()
+        # preallocated frame stack; depth is fixed here (the observation_space size),
+        # later changes to self.frame_stack do not resize it
+        self._frames = FrameRing(INPUT_DIM, self.frame_stack)
+        # True: return views into the ring (valid for ~capacity steps) instead of copies.
+        # Only safe when every consumer copies what it keeps (e.g. FrameReplayBuffer).
+        self.obs_view = False
 
     def set_slice(self, slice_data):
         self.current_slice = slice_data
 
+    def set_reward_config(self, reward_context=None):
+        """Compile reward shaping parameters once instead of per frame."""
+        self.reward_params = compile_reward_config(reward_context)
+
+    def decode_action(self, action):
+        """(button, frames) for an action index."""
+        if self.action_repeats is None:
+            return action, self.frame_skip
+        return action % 2, self.action_repeats[action // 2]
+
     def step(self, action, reward_context=None):
         """Apply `action` for `frame_skip` frames, accumulate rewards, and return a stacked observation.
 
+        With action_repeats the action also picks how many frames to hold it.
+
         Returns observation (stacked), total_reward, terminated, truncated, info
+
+        With env.novelty set, total_reward includes its bonus for the last
+        frame (also in info["novelty"]).
+
+        Truncated: the step or time limit was hit (info["truncated_by"]), or the
+        bridge watchdog saw the game stop (info["stalled"]; the observation is
+        the previous one and the transition should not be stored).
         """
+        t_step = time.perf_counter_ns() if telemetry.enabled() else 0
+        repeat = action // 2 if self.action_repeats else 0  # recorded so offline tools can rebuild the action
+        action, num_frames = self.decode_action(action)
         self.steps_in_episode += 1
-        reward_context = reward_context or {}
+        # a per-call context still works, but costs a compile; prefer set_reward_config
+        params = self.reward_params if reward_context is None else compile_reward_config(reward_context)
+        slice_end = self.current_slice['end'] if self.current_slice else None
 
         total_reward = 0.0
         terminated = False
         truncated = False
         last_raw = None
+        discount = 1.0
+        frames = 0
 
-        for f in range(self.frame_skip):
+        for f in range(num_frames):
             # send action and advance one frame
-            self.bridge.write_action(action)
-            raw_state = self.bridge.read_state()
+            try:
+                with telemetry.span("env.bridge"):
+                    self.bridge.write_action(action)
+                    raw_state = self.bridge.read_state()
+            except BridgeStall:
+                self.prev_action = action
+                info = {"percent": self.prev_percent, "mode": self.prev_mode, "frames": frames,
+                        "stalled": True, "truncated_by": "stall"}
+                return self._stacked_obs(), total_reward, False, True, info
             last_raw = raw_state
 
+            if self.recorder is not None:
+                self.recorder.append(
+                    raw_state, self.steps_in_episode, action, self.prev_action,
+                    self.prev_percent, self.prev_dist_nearest_hazard, self.current_slice, repeat
+                )
+
             # calculate reward for this intermediate frame
-            # include prev_action in context for jump penalties
-            ctx = dict(reward_context)
-            ctx['prev_action'] = self.prev_action
-            frame_reward = self._calculate_reward(raw_state, action, raw_state.is_dead, ctx)
-            total_reward += frame_reward
+            # (prev_action feeds the jump spam penalty)
+            with telemetry.span("env.reward"):
+                total_reward += discount * frame_reward(
+                    params, raw_state, action, self.prev_action,
+                    self.prev_percent, self.prev_dist_nearest_hazard, slice_end
+                )
+            discount *= self.frame_gamma
+            frames += 1
 
             # update trackers for next frame's delta computations
             self.prev_percent = raw_state.percent
             self.prev_dist_nearest_hazard = getattr(raw_state, "dist_nearest_hazard", None)
+            self.prev_mode = raw_state.player_mode
 
             # check termination mid-skip
             if raw_state.is_dead or (self.current_slice and raw_state.percent >= self.current_slice['end']):
@@ -83,67 +150,82 @@ class GeometryDashEnv(gym.Env):
         # build stacked observation from last_raw
         if last_raw is None:
             last_raw = self.bridge.read_state()
-        obs_single = normalize_state(last_raw)
-
-        # initialize buffer on first use
-        if len(self._frame_buffer) == 0:
-            for _ in range(self.frame_stack):
-                self._frame_buffer.append(obs_single.copy())
-        else:
-            self._frame_buffer.append(obs_single.copy())
-
-        obs = np.concatenate(list(self._frame_buffer), axis=0)
-
-        return obs, total_reward, terminated, truncated, {"percent": last_raw.percent}
+        with telemetry.span("env.normalize"):
+            obs_single = normalize_state(last_raw)
+
+        with telemetry.span("env.stack"):
+            # first push without a reset fills the whole stack
+            self._frames.push(obs_single)
+            obs = self._stacked_obs()
+
+        info = {"percent": last_raw.percent, "mode": last_raw.player_mode, "frames": frames}
+        if self.novelty is not None:
+            bonus = self.novelty.bonus(last_raw)
+            total_reward += bonus
+            info["novelty"] = bonus
+        if not terminated:
+            if self.max_episode_steps and self.steps_in_episode >= self.max_episode_steps:
+                truncated, info["truncated_by"] = True, "steps"
+            elif self.max_episode_seconds and time.perf_counter() - self.episode_start >= self.max_episode_seconds:
+                truncated, info["truncated_by"] = True, "time"
+        if self.level_map is not None:
+            # once per step is enough: objects enter the ~850 px window far ahead
+            self.level_map.observe(last_raw)
+            if last_raw.is_dead:
+                info["death_cause"] = self.level_map.death_cause(last_raw.player_x, last_raw.player_y)
+        if t_step:
+            telemetry.record("env.step", time.perf_counter_ns() - t_step)
+        return obs, total_reward, terminated, truncated, info
+
+    def _stacked_obs(self):
+        view = self._frames.view()
+        return view if self.obs_view else view.copy()
 
     def _calculate_reward(self, state, action, is_dead, reward_context=None):
-        reward_context = reward_context or {}
-
-        # Terminal State Rewards 
+        """Single-frame reward from the compiled engine (see agents/reward_engine.py)."""
+        params = self.reward_params if reward_context is None else compile_reward_config(reward_context)
         if is_dead:
-            # Use dynamic death penalty from context if available, otherwise default
-            return reward_context.get("death_penalty", -100.0)
-        if self.current_slice and state.percent >= self.current_slice['end']:
-            return 1000.0  # Jackpot for finishing the slice
-        
-        # Mode-specific expert reward
-        if state.player_mode == 0:  # Cube
-            reward = CubeExpert.get_reward(
-                state,
-                action,
-                prev_percent=self.prev_percent,
-                prev_dist_nearest_hazard=self.prev_dist_nearest_hazard,
-                reward_context=reward_context
-            )
-        elif state.player_mode == 1:  # Ship
-            reward = ShipExpert.get_reward(
-                state,
-                action,
-                prev_percent=self.prev_percent
-                # Note: Not passing context to ship expert as it's not requested
-            )
-        else:
-            reward = 0.0
-        
-        return reward
+            return params.death_penalty
+        slice_end = self.current_slice['end'] if self.current_slice else None
+        return frame_reward(
+            params, state, action, self.prev_action,
+            self.prev_percent, self.prev_dist_nearest_hazard, slice_end
+        )
 
     def reset(self, seed=None, options=None):
         super().reset(seed=seed)
         self.steps_in_episode = 0
+        if seed is not None and hasattr(self.bridge, "seed"):
+            self.bridge.seed(seed)  # stand-ins with their own randomness
         
-        # Tell game to reset
-        self.bridge.send_reset()
-        time.sleep(0.1)  # wait for respawn
-        
-        raw_state = self.bridge.read_state()
+        while True:
+            # Tell game to reset (a stalled watchdog bridge reconnects first)
+            self.bridge.send_reset()
+            if self.reset_delay:
+                time.sleep(self.reset_delay)  # wait for respawn
+            try:
+                raw_state = self.bridge.read_state()
+                break
+            except BridgeStall:
+                continue
+        self.episode_start = time.perf_counter()
         self.prev_percent = raw_state.percent
+        self.prev_mode = raw_state.player_mode
         self.prev_dist_nearest_hazard = getattr(raw_state, "dist_nearest_hazard", None)
 
+        if self.recorder is not None:
+            self.recorder.begin_episode()
+            self.recorder.append(
+                raw_state, 0, 0, self.prev_action,
+                self.prev_percent, self.prev_dist_nearest_hazard, self.current_slice
+            )
+
+        if self.level_map is not None:
+            self.level_map.observe(raw_state)
+
         obs_single = normalize_state(raw_state)
-        # reset frame buffer
-        self._frame_buffer.clear()
-        for _ in range(self.frame_stack):
-            self._frame_buffer.append(obs_single.copy())
+        # reset frame stack
+        self._frames.fill(obs_single)
 
-        obs = np.concatenate(list(self._frame_buffer), axis=0)
-        return obs, {}
+        obs = self._stacked_obs()
+        return obs, {"percent": raw_state.percent, "mode": raw_state.player_mode}
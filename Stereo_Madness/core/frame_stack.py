@@ -0,0 +1,53 @@
+import numpy as np
+
+
+class FrameRing:
+    """
+    Frame stack over one preallocated array.
+
+    Frames are written once, in order, into a strip of `capacity + depth - 1`
+    rows; the stacked observation (oldest frame first, like the old deque +
+    np.concatenate) is a contiguous view of the last `depth` rows. When the
+    strip is full, the newest `depth - 1` frames are moved back to the front,
+    once every `capacity` frames.
+    """
+
+    def __init__(self, frame_dim, depth=1, capacity=None, dtype=np.float32):
+        self.frame_dim = frame_dim
+        self.depth = depth
+        self.capacity = capacity or max(256, 16 * depth)
+        self._buf = np.zeros((self.capacity + depth - 1, frame_dim), dtype=dtype)
+        self._flat = self._buf.reshape(-1)
+        self._pos = -1  # row of the newest frame, -1 = empty
+
+    def __len__(self):
+        return 0 if self._pos < 0 else self.depth
+
+    def fill(self, frame):
+        """Start a new stack with `frame` repeated `depth` times (episode start)."""
+        self._buf[:self.depth] = frame
+        self._pos = self.depth - 1
+
+    def push(self, frame):
+        if self._pos < 0:
+            self.fill(frame)
+            return
+        pos = self._pos + 1
+        if pos == len(self._buf):
+            keep = self.depth - 1
+            if keep:
+                self._buf[:keep] = self._buf[pos - keep:pos]
+            pos = keep
+        self._buf[pos] = frame
+        self._pos = pos
+
+    def clear(self):
+        self._pos = -1
+
+    def view(self):
+        """Stacked observation, shape (depth * frame_dim,). Overwritten by later pushes."""
+        start = (self._pos - self.depth + 1) * self.frame_dim
+        return self._flat[start:start + self.depth * self.frame_dim]
+
+    def latest(self):
+        return self._buf[self._pos]
@@ -0,0 +1,295 @@
+"""
+Level map: absolute object geometry accumulated from the streamed objects.
+
+Every frame the mod sends the nearest MAX_OBJECTS objects relative to the
+player (SharedState.objects: dx from the player's front edge, dy from its
+mid height). LevelMap turns them into absolute coordinates with
+player_x/player_y, deduplicates them on a LEVEL_MAP_QUANTUM grid and keeps
+the result sorted by x:
+
+    objects  x (left edge), y (bottom), w, h, type   20 bytes per object
+
+observe() only copies the 600-byte object block; frames are merged in
+batches of MERGE_FRAMES with vectorized NumPy operations. Queries go through
+a sorted-x interval index (starts plus the running maximum of the ends),
+which finds the objects overlapping an x range or the next hazard with two
+bisections: O(log n + k) for k results.
+  objects_in(x0, x1)          objects overlapping [x0, x1)
+  nearest_hazard(x)           distance to and object of the next hazard
+  lookahead(player_x, y, n)   the next n objects as relative ObjectData rows,
+                              over any horizon (the mod stops at ~800 px)
+  death_cause(player_x, y)    the object closest to the player's box
+
+The map is saved as a compressed .npz (objects, origin, quantum, frames).
+
+Usage (from Stereo_Madness/):
+    python -m core.level_map build --sim --out logs/level_map.npz
+    python -m core.level_map build --log logs/bridge.gdlog --out logs/level_map.npz
+    python -m core.level_map info logs/level_map.npz --at 40.5
+"""
+import argparse
+import bisect
+import math
+import os
+import numpy as np
+
+from config import LEVEL_MAP_FILE, LEVEL_MAP_ORIGIN, LEVEL_MAP_QUANTUM
+from core.memory_bridge import ObjectData
+from core.sim_game import (BLOCK, MAX_OBJECTS, OBJ_SCAN_MIN, PLAYER_SIZE, PORTAL, SPIKE, SimBridge, SimulatedGame,
+                           SimulatedLevel)
+
+OBJECT_DTYPE = np.dtype(ObjectData)
+MAP_DTYPE = np.dtype([('x', '<f4'), ('y', '<f4'), ('w', '<f4'), ('h', '<f4'), ('type', '<i4')])
+EMPTY_DX = 9000.0          # the mod pads unused object slots with dx = 9999, type = -1
+HAZARD_TYPES = (SPIKE,)
+TYPE_NAMES = {SPIKE: "spike", BLOCK: "block", PORTAL: "portal"}
+MERGE_FRAMES = 256         # buffered frames before a merge
+
+
+class LevelMap:
+    def __init__(self, origin=LEVEL_MAP_ORIGIN, quantum=LEVEL_MAP_QUANTUM, hazard_types=HAZARD_TYPES):
+        self.origin = tuple(float(v) for v in origin)
+        self.quantum = float(quantum)
+        self.hazard_types = tuple(hazard_types)
+        self.objects = np.zeros(0, dtype=MAP_DTYPE)
+        self.frames = 0
+        self._pending = []         # (objects, player_x, player_y) per observed frame
+        self._build_index()
+
+    def __len__(self):
+        self._sync()
+        return len(self.objects)
+
+    # ACCUMULATION
+    def observe(self, state):
+        """Add the objects of one SharedState frame (buffered, merged every MERGE_FRAMES)."""
+        self._pending.append((np.frombuffer(state.objects, dtype=OBJECT_DTYPE).copy(),
+                              state.player_x, state.player_y))
+        self.frames += 1
+        if len(self._pending) >= MERGE_FRAMES:
+            self._merge()
+
+    def observe_many(self, states):
+        """Add the objects of a structured array of SharedState records (STATE_DTYPE)."""
+        states = np.asarray(states).reshape(-1)
+        self._sync()
+        objs = states['objects']
+        n = objs.shape[1]
+        self._merge_rows(objs.reshape(-1), np.repeat(states['player_x'], n), np.repeat(states['player_y'], n))
+        self.frames += len(states)
+
+    def _sync(self):
+        if self._pending:
+            self._merge()
+
+    def _merge(self):
+        objs = np.concatenate([o for o, _, _ in self._pending])
+        n = len(objs) // len(self._pending)
+        player_x = np.repeat(np.array([x for _, x, _ in self._pending]), n)
+        player_y = np.repeat(np.array([y for _, _, y in self._pending]), n)
+        self._pending = []
+        self._merge_rows(objs, player_x, player_y)
+
+    def _merge_rows(self, objs, player_x, player_y):
+        valid = (objs['type'] >= 0) & (objs['dx'] < EMPTY_DX)
+        o = objs[valid]
+        new = np.empty(len(o), dtype=MAP_DTYPE)
+        new['x'] = player_x[valid] + self.origin[0] + o['dx']
+        new['y'] = player_y[valid] + self.origin[1] + o['dy'] - o['h'] / 2   # dy is to the object's center
+        new['w'] = o['w']
+        new['h'] = o['h']
+        new['type'] = o['type']
+
+        # known objects come first: a stable sort keeps them as the first of each key
+        rows = np.concatenate([self.objects, new])
+        q = self.quantum
+        keys = [rows['type'], np.round(rows['h'] / q), np.round(rows['w'] / q),
+                np.round(rows['y'] / q), np.round(rows['x'] / q)]
+        order = np.lexsort(keys)
+        sorted_keys = np.stack([k[order] for k in keys])
+        first = np.ones(len(rows), dtype=bool)
+        first[1:] = (sorted_keys[:, 1:] != sorted_keys[:, :-1]).any(axis=0)
+        rows = rows[order[first]]
+        self.objects = rows[np.argsort(rows['x'], kind='stable')]
+        self._build_index()
+
+    def _build_index(self):
+        x = self.objects['x'].astype(np.float64)
+        end = x + self.objects['w']
+        self._rows = [tuple(o) for o in self.objects.tolist()]  # fast scalar access
+        self._x = x.tolist()
+        self._end = end.tolist()
+        self._reach = np.maximum.accumulate(end).tolist() if len(end) else []
+        hazard = np.isin(self.objects['type'], self.hazard_types)
+        self._hazards = np.flatnonzero(hazard).tolist()
+        self._hx = x[hazard].tolist()
+        self._hend = end[hazard].tolist()
+        self._hreach = np.maximum.accumulate(end[hazard]).tolist() if hazard.any() else []
+
+    # QUERIES
+    def _span(self, x0, x1):
+        """Index range holding every object overlapping [x0, x1)."""
+        lo = bisect.bisect_right(self._reach, x0)   # earlier objects all end by x0
+        hi = bisect.bisect_left(self._x, x1)        # later objects start at or after x1
+        return lo, hi
+
+    def objects_in(self, x0, x1, types=None):
+        """MAP_DTYPE rows of the objects overlapping [x0, x1), sorted by x."""
+        self._sync()
+        lo, hi = self._span(x0, x1)
+        rows = self.objects[lo:hi]
+        rows = rows[rows['x'] + rows['w'] > x0]
+        if types is not None:
+            rows = rows[np.isin(rows['type'], types)]
+        return rows
+
+    def nearest_hazard(self, x):
+        """
+        (distance, (x, y, w, h, type)) of the first hazard not passed at
+        absolute x (distance 0 while overlapping it), or None past the last one.
+        """
+        self._sync()
+        i = bisect.bisect_right(self._hreach, x)
+        j = bisect.bisect_right(self._hx, x)
+        for k in range(i, j):
+            # started at or before x: still overlapping if it ends after it
+            if self._hend[k] > x:
+                return 0.0, self._rows[self._hazards[k]]
+        if j < len(self._hx):
+            return self._hx[j] - x, self._rows[self._hazards[j]]
+        return None
+
+    def lookahead(self, player_x, player_y, count=MAX_OBJECTS, horizon=2000.0):
+        """
+        The next `count` objects within `horizon` px of the player's front edge,
+        relative like SharedState.objects (OBJECT_DTYPE, padded like the mod).
+        """
+        self._sync()
+        front = player_x + self.origin[0]
+        lo = bisect.bisect_left(self._x, front + OBJ_SCAN_MIN)
+        hi = min(bisect.bisect_left(self._x, front + horizon), lo + count)
+        rows = self.objects[lo:hi]
+        out = np.zeros(count, dtype=OBJECT_DTYPE)
+        out['dx'] = 9999.0
+        out['type'] = -1
+        n = len(rows)
+        out['dx'][:n] = rows['x'] - front
+        out['dy'][:n] = rows['y'] + rows['h'] / 2 - (player_y + self.origin[1])
+        out['w'][:n] = rows['w']
+        out['h'][:n] = rows['h']
+        out['type'][:n] = rows['type']
+        return out
+
+    def death_cause(self, player_x, player_y, margin=PLAYER_SIZE):
+        """
+        (x, y, w, h, type) of the object whose box is closest to the player's
+        box (hazards win ties), or None if nothing is within `margin` px.
+        """
+        self._sync()
+        px0, px1 = player_x, player_x + PLAYER_SIZE
+        py0, py1 = player_y, player_y + PLAYER_SIZE
+        lo, hi = self._span(px0 - margin, px1 + margin)
+        best, best_key = None, (margin, True)
+        for k in range(lo, hi):
+            ox, oy, ow, oh, kind = self._rows[k]
+            gap_x = max(ox - px1, px0 - (ox + ow), 0.0)
+            gap_y = max(oy - py1, py0 - (oy + oh), 0.0)
+            key = (math.hypot(gap_x, gap_y), kind not in self.hazard_types)
+            if key <= best_key:
+                best, best_key = self._rows[k], key
+        return best
+
+    def summary(self):
+        self._sync()
+        if not len(self.objects):
+            return f"[LevelMap] empty | {self.frames:,} frames"
+        hazards = len(self._hazards)
+        return (f"[LevelMap] {len(self.objects):,} objects ({hazards:,} hazards) | x {self._x[0]:,.0f} → "
+                f"{max(self._end):,.0f} px | {self.frames:,} frames | {self.objects.nbytes / 1024:.1f} KiB")
+
+    # STORAGE
+    def save(self, path=LEVEL_MAP_FILE):
+        self._sync()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, 'wb') as f:
+            np.savez_compressed(f, objects=self.objects, origin=np.array(self.origin),
+                                quantum=self.quantum, frames=self.frames)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=LEVEL_MAP_FILE, hazard_types=HAZARD_TYPES):
+        with np.load(path) as data:
+            level_map = cls(tuple(data['origin']), float(data['quantum']), hazard_types)
+            level_map.objects = data['objects'].astype(MAP_DTYPE)
+            level_map.frames = int(data['frames'])
+        level_map._build_index()
+        return level_map
+
+
+def build_from_sim(level_map, level, step_percent=2.0):
+    """Sweep the simulated level with checkpoint respawns (one frame every step_percent)."""
+    bridge = SimBridge(SimulatedGame(level))
+    percent = 0.0
+    while percent < 100.0:
+        bridge.send_checkpoint(percent)
+        bridge.send_reset()
+        level_map.observe(bridge.read_state())
+        percent += step_percent
+
+
+def build_from_log(level_map, path, chunk=65536):
+    """Add every frame of a core/bridge_log.py log."""
+    from core.bridge_log import load_log
+    from core.state_utils import STATE_DTYPE
+    records = load_log(path)
+    for i in range(0, len(records), chunk):
+        states = np.ascontiguousarray(records['state'][i:i + chunk]).view(STATE_DTYPE).reshape(-1)
+        level_map.observe_many(states)
+
+
+def describe(obj):
+    if obj is None:
+        return "-"
+    x, y, w, h, kind = obj
+    return f"{TYPE_NAMES.get(kind, f'type {kind}')} at x {x:,.0f} y {y:.0f} ({w:.0f}x{h:.0f})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or inspect a level map")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    build = sub.add_parser("build")
+    build.add_argument("--sim", action="store_true", help="sweep the simulated level")
+    build.add_argument("--log", nargs="*", default=[], help="bridge logs (core/bridge_log.py)")
+    build.add_argument("--level-seed", type=int, default=0)
+    build.add_argument("--out", default=LEVEL_MAP_FILE)
+    info = sub.add_parser("info")
+    info.add_argument("path", nargs="?", default=LEVEL_MAP_FILE)
+    info.add_argument("--at", type=float, nargs="*", default=[], help="query these percents")
+    info.add_argument("--length", type=float, default=30000.0, help="level length in px (percent → x)")
+    args = parser.parse_args()
+
+    if args.cmd == "build":
+        level_map = LevelMap.load(args.out) if os.path.exists(args.out) else LevelMap()
+        if args.sim:
+            build_from_sim(level_map, SimulatedLevel(seed=args.level_seed))
+        for path in args.log:
+            build_from_log(level_map, path)
+        level_map.save(args.out)
+        print(level_map.summary())
+        print(f"[LevelMap] Saved to {args.out}")
+        return
+
+    level_map = LevelMap.load(args.path)
+    print(level_map.summary())
+    for percent in args.at:
+        x = percent / 100.0 * args.length
+        hit = level_map.nearest_hazard(x)
+        ahead = level_map.objects_in(x, x + 1000.0)
+        print(f"   {percent:5.1f}% (x {x:,.0f}) | next hazard "
+              f"{'-' if hit is None else f'{hit[0]:,.0f} px: ' + describe(hit[1])} | "
+              f"{len(ahead)} objects in the next 1000 px")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,8 @@
-import mmap
 import ctypes
 import time
-from config import MEM_NAME
+from config import MEM_BACKEND
+from core import telemetry
+from core.shm_transport import BridgeHeader, open_segment, segment_name, validate_header, yield_cpu
 
 # C++ STRUCT MAPPING
 # Must match the Struct definition in my Geode C++ Mod (utridu) exactly.
@@ -48,26 +49,65 @@ class SharedState(ctypes.Structure):
     ]
 
 class MemoryBridge:
-    def __init__(self):
+    def __init__(self, instance=0, backend=MEM_BACKEND):
+        """
+        instance: which game/producer to attach to (segment GD_RL_Memory[_<n>]).
+        backend: "windows" (named mapping) or "posix" (/dev/shm, see core/shm_transport.py);
+                 None picks the platform's.
+        """
+        self.instance = instance
+        self.header = None
+        state_size = ctypes.sizeof(SharedState)
         try:
-            # Connect to existing shared memory created by C++
-            self.shmem = mmap.mmap(-1, ctypes.sizeof(SharedState), tagname=MEM_NAME, access=mmap.ACCESS_DEFAULT)
-            self.state = SharedState.from_buffer(self.shmem)
-            print(f"[MemoryBridge] Successfully connected to '{MEM_NAME}'")
+            # Connect to existing shared memory created by C++ (or core/shm_producer.py)
+            self.segment = open_segment(instance, state_size, backend)
         except FileNotFoundError:
-            raise Exception(f"[Critical] Could not find Shared Memory '{MEM_NAME}'.\n"
+            raise Exception(f"[Critical] Could not find Shared Memory '{segment_name(instance)}'.\n"
                             "Make sure Geometry Dash is running with the Mod installed.")
+        self.shmem = self.segment.buf
+        offset = 0
+        if self.segment.has_header:
+            self.header = BridgeHeader.from_buffer(self.shmem)
+            validate_header(self.header, state_size, self.segment.name)
+            offset = self.header.header_size
+        self.state = SharedState.from_buffer(self.shmem, offset)
+        # lockstep producers answer every action with exactly one frame
+        self.lockstep = bool(self.header is not None and self.header.lockstep)
+        # the game advances on its own clock (live game, free-run producer)
+        self.free_running = not self.lockstep
+        # seconds the env waits for the game to respawn after send_reset
+        self.reset_delay = 0.0 if self.lockstep else 0.1
+        print(f"[MemoryBridge] Successfully connected to '{self.segment.name}'")
 
     def read_state(self):
         """
         Reads the current state from shared memory.
         Uses a spinlock to avoid reading while C++ is writing.
         """
+        if self.lockstep:
+            # wait for the frame answering our last action
+            spins = 0
+            deadline = None
+            while self.header.state_seq != self.header.action_seq:
+                spins += 1
+                if spins > 100:
+                    # the producer may share our core: stop burning its time slice
+                    yield_cpu()
+                    if deadline is None:
+                        deadline = time.perf_counter() + 1.0
+                    elif time.perf_counter() > deadline:
+                        telemetry.count("bridge.lockstep_timeouts")
+                        break
+
         # Safety break to prevent infinite freeze if C++ crashes while writing
         timeout = 0
         while self.state.cpp_writing == 1:
             timeout += 1
-            if timeout > 2000: break # Break lock if stuck
+            if timeout > 2000:
+                telemetry.count("bridge.lock_timeouts")
+                break # Break lock if stuck
+        if timeout:
+            telemetry.count("bridge.lock_waits")
             
         self.state.py_writing = 1  # Lock for Python
         
@@ -81,6 +121,8 @@ class MemoryBridge:
         """
         self.state.action_command = int(action)
         self.state.py_writing = 0  # Unlock
+        if self.header is not None:
+            self.header.action_seq += 1
 
     def send_reset(self):
         """
@@ -90,7 +132,19 @@ class MemoryBridge:
         self.state.reset_command = 1
         self.state.action_command = 0 # Ensure player doesn't jump immediately
         self.state.py_writing = 0
+        if self.lockstep:
+            deadline = time.perf_counter() + 2.0
+            while self.state.reset_command == 1 and time.perf_counter() < deadline:
+                pass  # the producer clears it once respawned
+            return
         time.sleep(0.05) # Give C++ time to process
 
+    def frame_index(self):
+        """Game frame counter, or None when the segment has no header (Windows mod)."""
+        return None if self.header is None else self.header.frame
+
     def close(self):
-        self.shmem.close()
+        # ctypes views must go before the mapping can close
+        self.state = None
+        self.header = None
+        self.segment.close()
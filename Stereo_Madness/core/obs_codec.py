@@ -0,0 +1,125 @@
+import numpy as np
+
+from config import INPUT_DIM
+
+# Compact storage codecs for normalized observation frames (normalize_state layout).
+#
+#   float32  lossless
+#   float16  every feature as half precision
+#   int16    continuous features as fixed point int16, discrete ones exact in int8:
+#              vel_y/30, y/900, dy/300    step 2^-13 (range +-4)
+#              dx/1000                    step 2^-11 (range +-16, empty slots = 9.999)
+#              w/50, h/50                 step 2^-12 (range +-8)
+#              is_on_ground, player_mode  exact (x1)
+#              type/10                    exact (x10)
+# Out-of-range values saturate at the int16 limits.
+
+_OBJ = 4 + 5 * np.arange(30)
+DISCRETE_COLS = np.concatenate([[2, 3], _OBJ + 4])
+CONTINUOUS_COLS = np.setdiff1d(np.arange(INPUT_DIM), DISCRETE_COLS)
+
+
+def _scales():
+    scale = np.ones(INPUT_DIM, dtype=np.float64)
+    scale[[0, 1]] = 2.0 ** 13
+    scale[_OBJ + 0] = 2.0 ** 11
+    scale[_OBJ + 1] = 2.0 ** 13
+    scale[_OBJ + 2] = 2.0 ** 12
+    scale[_OBJ + 3] = 2.0 ** 12
+    scale[_OBJ + 4] = 10.0
+    return scale
+
+
+FEATURE_SCALES = _scales()
+
+
+class Float32Codec:
+    name = "float32"
+
+    def __init__(self, frame_dim=INPUT_DIM):
+        self.frame_dim = frame_dim
+
+    def alloc(self, capacity):
+        return (np.zeros((capacity, self.frame_dim), dtype=np.float32),)
+
+    def write(self, storage, row, frame):
+        storage[0][row] = frame
+
+    def read(self, storage, rows):
+        return storage[0][rows]
+
+    def max_error(self):
+        return np.zeros(self.frame_dim)
+
+
+class Float16Codec(Float32Codec):
+    name = "float16"
+
+    def alloc(self, capacity):
+        return (np.zeros((capacity, self.frame_dim), dtype=np.float16),)
+
+    def read(self, storage, rows):
+        return storage[0][rows].astype(np.float32)
+
+    def max_error(self):
+        # relative 2^-11; features of normalized frames stay below ~16
+        return np.full(self.frame_dim, 16.0 * 2.0 ** -11)
+
+
+class Int16Codec(Float32Codec):
+    """Fixed point per feature using the normalize_state value ranges (see table above)."""
+    name = "int16"
+
+    def __init__(self, frame_dim=INPUT_DIM):
+        if frame_dim != INPUT_DIM:
+            raise ValueError(f"[Codec] int16 codec needs single frames of {INPUT_DIM} features")
+        super().__init__(frame_dim)
+        self.cont_scale = FEATURE_SCALES[CONTINUOUS_COLS]
+        self.disc_scale = FEATURE_SCALES[DISCRETE_COLS]
+
+    def alloc(self, capacity):
+        return (np.zeros((capacity, len(CONTINUOUS_COLS)), dtype=np.int16),
+                np.zeros((capacity, len(DISCRETE_COLS)), dtype=np.int8))
+
+    def write(self, storage, row, frame):
+        frame = np.asarray(frame, dtype=np.float64)
+        storage[0][row] = np.clip(np.rint(frame[CONTINUOUS_COLS] * self.cont_scale), -32768, 32767)
+        storage[1][row] = np.clip(np.rint(frame[DISCRETE_COLS] * self.disc_scale), -128, 127)
+
+    def read(self, storage, rows):
+        cont, disc = storage[0][rows], storage[1][rows]
+        out = np.empty((cont.shape[0], self.frame_dim), dtype=np.float32)
+        out[:, CONTINUOUS_COLS] = cont / self.cont_scale
+        out[:, DISCRETE_COLS] = disc / self.disc_scale
+        return out
+
+    def max_error(self):
+        err = 0.5 / FEATURE_SCALES
+        err[DISCRETE_COLS] = 0.0
+        return err
+
+
+CODECS = {c.name: c for c in (Float32Codec, Float16Codec, Int16Codec)}
+
+
+def make_codec(name, frame_dim=INPUT_DIM):
+    if name not in CODECS:
+        raise ValueError(f"[Codec] Unknown codec '{name}' (choose from {sorted(CODECS)})")
+    return CODECS[name](frame_dim)
+
+
+class BitArray:
+    """Packed booleans (1 bit per row) with vectorized reads."""
+
+    def __init__(self, capacity):
+        self.bits = np.zeros((capacity + 7) // 8, dtype=np.uint8)
+
+    def set(self, row, value):
+        mask = np.uint8(1 << (row & 7))
+        if value:
+            self.bits[row >> 3] |= mask
+        else:
+            self.bits[row >> 3] &= ~mask
+
+    def get(self, rows):
+        return (self.bits[rows >> 3] >> (rows & 7).astype(np.uint8)) & 1
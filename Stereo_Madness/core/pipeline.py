@@ -0,0 +1,179 @@
+import threading
+import time
+import numpy as np
+
+from config import INPUT_DIM
+from core import telemetry
+from core.frame_stack import FrameRing
+from core.state_utils import normalize_state
+
+
+class PipelinedActor:
+    """
+    Act loop with inference overlapped with the game.
+
+    The calling thread pumps frames: every frame it reads the state, every
+    `frame_skip` frames it publishes a normalized observation into one of two
+    preallocated slots, and it writes the latest published decision. A
+    dedicated inference thread takes the newest observation, runs
+    `policy(obs, info) -> action` and publishes the action tagged with the
+    frame its observation came from.
+
+    A decision older than `max_staleness` frames is not applied; the frame
+    gets `stale_action` (release) instead and counts as late.
+
+    Frames are paced by the bridge's own frame counter when the game runs on
+    its own clock, otherwise every `frame_period` seconds (0 = flat out).
+    """
+
+    def __init__(self, bridge, policy, frame_skip=4, frame_stack=1, max_staleness=None,
+                 frame_period=1.0 / 60.0, stale_action=0):
+        self.bridge = bridge
+        self.policy = policy
+        self.frame_skip = frame_skip
+        self.max_staleness = max_staleness if max_staleness is not None else 2 * frame_skip
+        self.frame_period = frame_period
+        self.stale_action = stale_action
+
+        self._frames = FrameRing(INPUT_DIM, frame_stack)
+        self._slots = np.zeros((2, INPUT_DIM * frame_stack), dtype=np.float32)
+        self._meta = [None, None]   # (frame, t_read_ns, info) of each slot
+        self._fresh = -1            # slot holding an unconsumed observation
+        self._reading = 0           # slot the inference thread works on
+        self._cond = threading.Condition()
+        # (action, obs frame, obs read time); replaced as one tuple, no lock needed
+        self._decision = (stale_action, None, 0)
+
+        self._running = True
+        self._thread = threading.Thread(target=self._infer_loop, name="inference", daemon=True)
+        self._thread.start()
+
+    # INFERENCE THREAD
+    def _infer_loop(self):
+        while True:
+            with self._cond:
+                while self._fresh < 0 and self._running:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                slot = self._reading = self._fresh
+                self._fresh = -1
+                frame, t_read, info = self._meta[slot]
+            with telemetry.span("pipeline.inference"):
+                action = int(self.policy(self._slots[slot], info))
+            self._decision = (action, frame, t_read)
+
+    # BRIDGE THREAD
+    def _publish(self, state, frame, t_read, first):
+        obs = normalize_state(state)
+        if first:
+            self._frames.fill(obs)
+        else:
+            self._frames.push(obs)
+        with self._cond:
+            slot = 1 - self._reading
+            if self._fresh == slot:
+                self._fresh = -1  # being overwritten with a newer frame
+        self._slots[slot] = self._frames.view()
+        self._meta[slot] = (frame, t_read, {"percent": state.percent, "mode": state.player_mode})
+        with self._cond:
+            self._fresh = slot
+            self._cond.notify()
+
+    def _take_decision(self, frame, log):
+        action, src, t_src = self._decision
+        if src is not None and src != self._applied_src:
+            self._applied_src = src
+            log.append((src, t_src, frame, time.perf_counter_ns()))
+            telemetry.record("pipeline.decision", log[-1][3] - t_src)
+        return action, src
+
+    def _apply_early(self, frame, log):
+        """Write a decision that arrived mid-frame instead of holding it to the next frame."""
+        if self._decision[1] is not None and self._decision[1] != self._applied_src:
+            action, src = self._take_decision(frame, log)
+            if frame - src <= self.max_staleness:
+                self.bridge.write_action(action)
+
+    def _clock(self):
+        frame_index = getattr(self.bridge, "frame_index", lambda: None)()
+        if getattr(self.bridge, "free_running", True) and frame_index is not None:
+            return frame_index
+        return None
+
+    def run_episode(self, max_frames=None):
+        """Play one attempt from reset; returns per-episode timing stats and the decision log."""
+        self.bridge.send_reset()
+        delay = getattr(self.bridge, "reset_delay", 0.0)
+        if delay:
+            time.sleep(delay)
+        self._decision = (self.stale_action, None, 0)
+        with self._cond:
+            self._fresh = -1
+
+        log = []              # (obs frame, obs read ns, first frame applied, applied ns)
+        self._applied_src = None
+        late = missed = 0
+        frame = start = self._clock() or 0
+        last_publish = None
+        next_t = time.perf_counter()
+        # writes between frames only make sense when the game runs on its own clock
+        # (on lockstep bridges every write advances a frame)
+        free_running = getattr(self.bridge, "free_running", True)
+
+        while True:
+            state = self.bridge.read_state()
+            t_read = time.perf_counter_ns()
+            if last_publish is None or frame - last_publish >= self.frame_skip:
+                self._publish(state, frame, t_read, first=last_publish is None)
+                last_publish = frame
+
+            action, src = self._take_decision(frame, log)
+            if src is None or frame - src > self.max_staleness:
+                action = self.stale_action
+                late += 1
+                telemetry.count("pipeline.late_frames")
+            self.bridge.write_action(action)
+
+            done = state.is_dead or state.percent >= 100.0
+            if done or (max_frames is not None and frame - start >= max_frames):
+                break
+
+            # wait for the next frame, applying decisions as soon as they land
+            clock = self._clock()
+            if clock is not None:
+                while self._clock() == clock:
+                    self._apply_early(frame, log)
+                    time.sleep(0)
+                now = self._clock()
+                missed += now - frame - 1
+                frame = now
+            else:
+                frame += 1
+                if self.frame_period:
+                    next_t += self.frame_period
+                    while True:
+                        delay = next_t - time.perf_counter()
+                        if delay <= 0:
+                            break
+                        if free_running:
+                            self._apply_early(frame - 1, log)
+                        time.sleep(min(delay, 0.0005) if free_running else delay)
+                    if next_t < time.perf_counter() - self.frame_period:
+                        next_t = time.perf_counter()  # fell behind: do not burst to catch up
+
+        frames = frame - start + 1
+        return {
+            "percent": float(state.percent),
+            "frames": frames,
+            "decisions": len(log),
+            "late_frames": late,
+            "missed_frames": missed,
+            "log": log,
+        }
+
+    def close(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self._thread.join()
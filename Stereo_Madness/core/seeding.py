@@ -0,0 +1,16 @@
+import random
+import numpy as np
+import torch
+
+
+def seed_everything(seed, deterministic_torch=False):
+    """
+    Seed every RNG the training/playback stack touches: `random` (epsilon-greedy,
+    ReplayBuffer.sample), NumPy and torch (weight init, CUDA included).
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+    if deterministic_torch:
+        torch.use_deterministic_algorithms(True)
+        torch.backends.cudnn.benchmark = False
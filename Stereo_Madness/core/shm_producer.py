@@ -0,0 +1,126 @@
+"""
+Local producer stand-in for the Geode mod on the posix transport.
+
+Creates /dev/shm/GD_RL_Memory[_<instance>] with a BridgeHeader and runs a
+SimulatedGame that writes SharedState exactly like MyPlayLayer::rl_loop.
+Honors reset_command and checkpoint_command.
+
+  lockstep: one frame per action written by MemoryBridge (deterministic, as
+            fast as both sides allow)
+  free-run: frames at --fps regardless of the consumer, like the real game
+
+Usage (from Stereo_Madness/):
+    python -m core.shm_producer --instance 0 --lockstep
+"""
+import argparse
+import ctypes
+import os
+import time
+
+from core.memory_bridge import SharedState
+from core.shm_transport import (BRIDGE_MAGIC, BRIDGE_VERSION, HEADER_SIZE, BridgeHeader,
+                                PosixSegment, pid_alive, segment_name, yield_cpu)
+from core.sim_game import SimulatedGame, SimulatedLevel
+
+
+class ShmProducer:
+    def __init__(self, instance=0, lockstep=True, fps=60.0, level_seed=0, start_percent=0.0):
+        name = segment_name(instance)
+        state_size = ctypes.sizeof(SharedState)
+        try:
+            self.segment = PosixSegment(name, state_size, create=True)
+        except FileExistsError:
+            stale = PosixSegment(name, state_size)
+            pid = BridgeHeader.from_buffer_copy(stale.buf).producer_pid
+            stale.close()
+            if pid and pid_alive(pid):
+                raise RuntimeError(f"[Producer] '{name}' is already served by pid {pid}")
+            print(f"[Producer] Replacing stale segment '{name}'")
+            stale.unlink()
+            self.segment = PosixSegment(name, state_size, create=True)
+
+        self.lockstep = lockstep
+        self.fps = fps
+        self.header = BridgeHeader.from_buffer(self.segment.buf)
+        self.state = SharedState.from_buffer(self.segment.buf, HEADER_SIZE)
+        self.game = SimulatedGame(SimulatedLevel(seed=level_seed), state=self.state)
+        if start_percent:
+            # practice checkpoint already placed, like after a relay run
+            self.game.set_checkpoint(start_percent)
+            self.game.reset()
+
+        h = self.header
+        h.version, h.header_size, h.state_size = BRIDGE_VERSION, HEADER_SIZE, state_size
+        h.lockstep, h.producer_pid = int(lockstep), os.getpid()
+        h.action_seq = h.state_seq = h.frame = 0
+        h.magic = BRIDGE_MAGIC  # last: consumers only accept a complete header
+        print(f"[Producer] Serving '{name}' ({'lockstep' if lockstep else f'{fps:g} fps'})")
+
+    def _commands(self):
+        s = self.state
+        if s.checkpoint_command:
+            self.game.set_checkpoint(s.percent)
+            s.checkpoint_command = 0
+        if s.reset_command:
+            self.game.reset()
+            self.header.state_seq = self.header.action_seq
+            s.reset_command = 0
+
+    def serve(self, stop_event=None):
+        h = self.header
+        next_frame = time.perf_counter()
+        idle = 0
+        while stop_event is None or not stop_event.is_set():
+            self._commands()
+            if self.lockstep:
+                seq = h.action_seq
+                if seq == h.state_seq:
+                    idle += 1
+                    if idle > 100:
+                        yield_cpu()
+                    continue
+                idle = 0
+                self.game.step(self.state.action_command)
+                h.frame += 1
+                h.state_seq = seq
+            else:
+                self.game.step(self.state.action_command)
+                h.frame += 1
+                h.state_seq = h.action_seq
+                next_frame += 1.0 / self.fps
+                delay = next_frame - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+    def close(self):
+        self.header = None
+        self.state = None
+        self.game = None
+        self.segment.close()
+        self.segment.unlink()
+
+
+def run_producer(instance=0, lockstep=True, fps=60.0, level_seed=0, stop_event=None, start_percent=0.0):
+    """Process entry point (multiprocessing target)."""
+    producer = ShmProducer(instance, lockstep, fps, level_seed, start_percent)
+    try:
+        producer.serve(stop_event)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        producer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulated game producer on the posix shared-memory bridge")
+    parser.add_argument("--instance", type=int, default=0)
+    parser.add_argument("--lockstep", action="store_true")
+    parser.add_argument("--fps", type=float, default=60.0)
+    parser.add_argument("--level-seed", type=int, default=0)
+    parser.add_argument("--start-percent", type=float, default=0.0, help="initial practice checkpoint")
+    args = parser.parse_args()
+    run_producer(args.instance, args.lockstep, args.fps, args.level_seed, start_percent=args.start_percent)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import ctypes
+import mmap
+import os
+import time
+
+from config import MEM_NAME, POSIX_SHM_DIR
+
+# Shared memory transports for MemoryBridge.
+#
+#   windows  named mapping (mmap tagname), headerless: the layout the Geode mod
+#            writes today (SharedState at offset 0)
+#   posix    file in /dev/shm mapped with mmap: BridgeHeader at offset 0,
+#            SharedState at HEADER_SIZE. Created by a producer (core/shm_producer.py
+#            or a Linux build of the mod), validated by the consumer.
+
+BRIDGE_MAGIC = 0x4C524447   # b"GDRL" little endian
+BRIDGE_VERSION = 2
+HEADER_SIZE = 64            # SharedState starts on its own cache line
+
+
+class BridgeHeader(ctypes.Structure):
+    _fields_ = [
+        ("magic", ctypes.c_uint32),
+        ("version", ctypes.c_uint32),
+        ("header_size", ctypes.c_uint32),
+        ("state_size", ctypes.c_uint32),
+        ("lockstep", ctypes.c_uint32),     # 1 = producer advances one frame per action
+        ("producer_pid", ctypes.c_uint32),
+        ("action_seq", ctypes.c_uint64),   # bumped by the consumer on write_action
+        ("state_seq", ctypes.c_uint64),    # set to action_seq once that frame is written
+        ("frame", ctypes.c_uint64),        # game frames simulated so far
+    ]
+
+
+def yield_cpu():
+    """Give up the time slice while waiting on the other side of the bridge."""
+    if hasattr(os, "sched_yield"):
+        os.sched_yield()
+    else:
+        time.sleep(0)
+
+
+def pid_alive(pid):
+    """True if process `pid` exists (producer liveness from BridgeHeader.producer_pid)."""
+    try:
+        os.kill(pid, 0)
+    except (OSError, ValueError):
+        return False
+    return True
+
+
+def segment_name(instance=0):
+    """Instance 0 keeps the historical name so existing mods keep working."""
+    return MEM_NAME if instance == 0 else f"{MEM_NAME}_{instance}"
+
+
+def default_backend():
+    return "windows" if os.name == "nt" else "posix"
+
+
+class WindowsSegment:
+    has_header = False
+
+    def __init__(self, name, state_size):
+        self.name = name
+        self.buf = mmap.mmap(-1, state_size, tagname=name, access=mmap.ACCESS_DEFAULT)
+
+    def close(self):
+        self.buf.close()
+
+
+class PosixSegment:
+    has_header = True
+
+    def __init__(self, name, state_size, create=False):
+        self.name = name
+        self.path = os.path.join(POSIX_SHM_DIR, name)
+        self.size = HEADER_SIZE + state_size
+        self.created = create
+        flags = os.O_RDWR | (os.O_CREAT | os.O_EXCL if create else 0)
+        fd = os.open(self.path, flags, 0o600)
+        try:
+            if create:
+                os.ftruncate(fd, self.size)
+            elif os.fstat(fd).st_size < self.size:
+                raise RuntimeError(f"[Bridge] Segment '{name}' is {os.fstat(fd).st_size} bytes, "
+                                   f"expected {self.size}")
+            self.buf = mmap.mmap(fd, self.size)
+        finally:
+            os.close(fd)
+
+    def close(self):
+        self.buf.close()
+
+    def unlink(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+def open_segment(instance, state_size, backend=None):
+    backend = backend or default_backend()
+    name = segment_name(instance)
+    if backend == "windows":
+        return WindowsSegment(name, state_size)
+    if backend == "posix":
+        return PosixSegment(name, state_size)
+    raise ValueError(f"[Bridge] Unknown backend '{backend}'")
+
+
+def validate_header(header, state_size, name):
+    if header.magic != BRIDGE_MAGIC:
+        raise RuntimeError(f"[Bridge] '{name}' has no bridge header (magic {header.magic:#x})")
+    if header.version != BRIDGE_VERSION:
+        raise RuntimeError(f"[Bridge] '{name}' header version {header.version}, expected {BRIDGE_VERSION}")
+    if header.header_size != HEADER_SIZE or header.state_size != state_size:
+        raise RuntimeError(f"[Bridge] '{name}' layout mismatch: header {header.header_size}/state "
+                           f"{header.state_size} bytes, SharedState is {state_size} bytes")
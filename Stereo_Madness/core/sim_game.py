@@ -0,0 +1,301 @@
+import bisect
+import json
+import numpy as np
+
+from config import CURRICULUM_FILE
+from core.memory_bridge import SharedState
+
+# Headless stand-in for the Geode mod: a procedurally generated, Stereo
+# Madness-shaped level with simplified cube/ship physics that fills the same
+# SharedState struct the C++ side writes. Deterministic for a given seed.
+
+FPS = 60
+SPEED = 5.77              # px per frame (normal speed, ~346 px/s)
+GROUND_Y = 105.0
+CEILING_Y = 405.0         # ship corridor top
+PLAYER_SIZE = 30.0
+CUBE_GRAVITY = 0.8        # px/frame^2
+CUBE_JUMP_VEL = 11.2
+SHIP_ACCEL = 0.55
+SHIP_MAX_VEL = 8.0
+SPIKE_HITBOX = (12.0, 14.0)
+OBJ_SCAN_MIN, OBJ_SCAN_MAX = -50.0, 800.0
+MAX_OBJECTS = 30
+
+SPIKE, BLOCK, PORTAL = 1, 2, 5
+
+
+class SimulatedLevel:
+    """
+    Obstacle layout for the stand-in. Mode sections follow the curriculum
+    file, so ship slices really are ship corridors.
+    """
+
+    def __init__(self, seed=0, length_px=30000.0, slices=None, difficulty=1.0):
+        self.seed = seed
+        self.length_px = length_px
+        self.difficulty = difficulty
+        if slices is None:
+            with open(CURRICULUM_FILE, 'r') as f:
+                slices = json.load(f)
+        self.slices = sorted(slices, key=lambda s: s['start'])
+
+        rng = np.random.default_rng(seed)
+        objs = []  # (x, y_bottom, w, h, type)
+        self.mode_changes = []  # (x, mode)
+
+        prev_mode = 0
+        for k, s in enumerate(self.slices):
+            x0 = self.px(s['start'])
+            x1 = self.px(s['end'])
+            if k + 1 < len(self.slices):
+                x1 = min(x1, self.px(self.slices[k + 1]['start']))
+            mode = s.get('mode', 0)
+            if mode != prev_mode:
+                objs.append((x0, GROUND_Y, 30.0, CEILING_Y - GROUND_Y, PORTAL))
+                self.mode_changes.append((x0, mode))
+                prev_mode = mode
+            if mode == 0:
+                self._cube_section(rng, objs, x0 + 300.0, x1 - 100.0)
+            else:
+                self._ship_section(rng, objs, x0 + 300.0, x1 - 100.0)
+        if prev_mode != 0:
+            x = self.px(self.slices[-1]['end'])
+            objs.append((x, GROUND_Y, 30.0, CEILING_Y - GROUND_Y, PORTAL))
+            self.mode_changes.append((x, 0))
+
+        objs.sort(key=lambda o: o[0])
+        self.objects = np.array(objs, dtype=np.float64).reshape(-1, 5)
+        self.rows = [tuple(o) for o in self.objects.tolist()]  # fast per-frame access
+        self.obj_x = self.objects[:, 0].tolist()
+        self.mode_x = [x for x, _ in self.mode_changes]
+
+    def px(self, percent):
+        return percent / 100.0 * self.length_px
+
+    def _cube_section(self, rng, objs, x, end):
+        while x < end:
+            kind = rng.choice(["spikes", "block", "block_spike"], p=[0.6, 0.25, 0.15])
+            if kind == "spikes":
+                count = int(rng.choice([1, 2, 3], p=[0.5, 0.3, 0.2]))
+                for i in range(count):
+                    objs.append((x + i * 30.0, GROUND_Y, 30.0, 30.0, SPIKE))
+                x += count * 30.0
+            elif kind == "block":
+                objs.append((x, GROUND_Y, 30.0, 30.0, BLOCK))
+                x += 30.0
+            else:
+                objs.append((x, GROUND_Y, 30.0, 30.0, BLOCK))
+                objs.append((x + 60.0, GROUND_Y, 30.0, 30.0, SPIKE))
+                x += 90.0
+            x += rng.uniform(220.0, 420.0) / self.difficulty
+
+    def _ship_section(self, rng, objs, x, end):
+        while x < end:
+            # A pillar of spikes from floor or ceiling leaving a flyable gap
+            gap_center = rng.uniform(GROUND_Y + 90.0, CEILING_Y - 90.0)
+            gap = 150.0 / self.difficulty ** 0.5
+            bottom_h = gap_center - gap / 2 - GROUND_Y
+            top_y = gap_center + gap / 2
+            if bottom_h > 0:
+                objs.append((x, GROUND_Y, 30.0, bottom_h, SPIKE))
+            objs.append((x, top_y, 30.0, CEILING_Y - top_y, SPIKE))
+            x += rng.uniform(300.0, 500.0) / self.difficulty
+
+    def mode_at(self, x):
+        i = bisect.bisect_right(self.mode_x, x)
+        return self.mode_changes[i - 1][1] if i > 0 else 0
+
+
+class SimulatedGame:
+    """Frame-by-frame physics writing into a SharedState like MyPlayLayer::rl_loop."""
+
+    def __init__(self, level=None, seed=0, state=None, speed_jitter=0.0):
+        self.level = level or SimulatedLevel(seed=seed)
+        self.state = state if state is not None else SharedState()
+        # Relative per-frame speed noise (frame timing variance of the real game)
+        self.speed_jitter = speed_jitter
+        self.rng = np.random.default_rng(seed)
+        self.respawn_x = 0.0
+        self.frame = 0
+        self._reset_physics(self.respawn_x)
+        self._write_state()
+
+    def seed(self, seed):
+        self.rng = np.random.default_rng(seed)
+
+    def set_checkpoint(self, percent):
+        """Practice-mode style respawn point (what the relay + 'W' press achieves live)."""
+        self.respawn_x = self.level.px(percent)
+
+    def reset(self):
+        self._reset_physics(self.respawn_x)
+        self._write_state()
+
+    def _reset_physics(self, x):
+        self.x = x
+        self.y = GROUND_Y
+        self.vy = 0.0
+        self.on_ground = True
+        self.dead = False
+        self.mode = self.level.mode_at(x)
+
+    def step(self, action):
+        """Advance one frame with button state `action` (0=release, 1=hold)."""
+        self.frame += 1
+        if self.dead or self.x >= self.level.length_px:
+            self._write_state()
+            return
+
+        prev_bottom = self.y
+        if self.speed_jitter:
+            self.x += SPEED * (1.0 + self.speed_jitter * self.rng.standard_normal())
+        else:
+            self.x += SPEED
+        self.mode = self.level.mode_at(self.x)
+
+        if self.mode == 0:
+            if action and self.on_ground:
+                self.vy = CUBE_JUMP_VEL
+                self.on_ground = False
+            self.vy -= CUBE_GRAVITY
+            self.y += self.vy
+        else:
+            self.vy += SHIP_ACCEL if action else -SHIP_ACCEL
+            self.vy = max(-SHIP_MAX_VEL, min(SHIP_MAX_VEL, self.vy))
+            self.y += self.vy
+            if self.y + PLAYER_SIZE > CEILING_Y:
+                self.y = CEILING_Y - PLAYER_SIZE
+                self.vy = 0.0
+
+        if self.y <= GROUND_Y:
+            self.y = GROUND_Y
+            self.vy = 0.0
+            self.on_ground = True
+        elif self.mode == 0:
+            self.on_ground = False
+
+        self._collide(prev_bottom)
+        self._write_state()
+
+    def _collide(self, prev_bottom):
+        px0, px1 = self.x, self.x + PLAYER_SIZE
+        py0, py1 = self.y, self.y + PLAYER_SIZE
+        objs = self.level.rows
+        lo = bisect.bisect_left(self.level.obj_x, px0 - 60.0)
+        hi = bisect.bisect_right(self.level.obj_x, px1)
+        for i in range(lo, hi):
+            ox, oy, ow, oh, otype = objs[i]
+            if otype == SPIKE:
+                if oh > 30.0:
+                    # Ship spike pillar: the whole column is lethal
+                    hx0, hx1, hy0, hy1 = ox, ox + ow, oy, oy + oh
+                else:
+                    hw, hh = SPIKE_HITBOX
+                    hx0 = ox + (ow - hw) / 2
+                    hx1, hy0, hy1 = hx0 + hw, oy, oy + hh
+                if px1 > hx0 and px0 < hx1 and py1 > hy0 and py0 < hy1:
+                    self.dead = True
+            elif otype == BLOCK:
+                if px1 > ox and px0 < ox + ow and py0 < oy + oh and py1 > oy:
+                    top = oy + oh
+                    if prev_bottom >= top - 1.0 and self.vy <= 0:
+                        self.y = top
+                        self.vy = 0.0
+                        self.on_ground = True
+                    else:
+                        self.dead = True
+
+    def _write_state(self):
+        s = self.state
+        s.cpp_writing = 1
+        s.player_x = self.x
+        s.player_y = self.y
+        s.player_vel_x = SPEED * FPS
+        s.player_vel_y = self.vy
+        s.player_rot = 0.0
+        s.gravity = 1
+        s.is_on_ground = int(self.on_ground)
+        s.is_dead = int(self.dead)
+        s.percent = min(100.0, self.x / self.level.length_px * 100.0)
+        s.is_terminal = int(self.dead or s.percent >= 100.0)
+        s.player_mode = self.mode
+        s.player_speed = 1.0
+
+        objs = self.level.rows
+        obj_x = self.level.obj_x
+        front = self.x + PLAYER_SIZE
+        lo = bisect.bisect_left(obj_x, front + OBJ_SCAN_MIN)
+        hi = bisect.bisect_right(obj_x, front + OBJ_SCAN_MAX)
+        mid_y = self.y + PLAYER_SIZE / 2
+
+        nearest_hazard = 9999.0
+        nearest_solid = 9999.0
+        n = 0
+        for i in range(lo, hi):
+            if n == MAX_OBJECTS:
+                break
+            ox, oy, ow, oh, otype = objs[i]
+            dx = ox - front
+            if dx > 0:
+                if otype == SPIKE and dx < nearest_hazard:
+                    nearest_hazard = dx
+                if otype == BLOCK and dx < nearest_solid:
+                    nearest_solid = dx
+            o = s.objects[n]
+            o.dx = dx
+            o.dy = (oy + oh / 2) - mid_y
+            o.w = ow
+            o.h = oh
+            o.type = int(otype)
+            n += 1
+        for i in range(n, MAX_OBJECTS):
+            o = s.objects[i]
+            o.dx = 9999.0
+            o.dy = 0.0
+            o.w = 0.0
+            o.h = 0.0
+            o.type = -1
+
+        s.dist_nearest_hazard = nearest_hazard
+        s.dist_nearest_solid = nearest_solid
+        s.cpp_writing = 0
+
+
+class SimBridge:
+    """
+    In-process MemoryBridge replacement driving a SimulatedGame: every
+    write_action advances the game by one frame, like the mod's 60 Hz loop.
+    """
+
+    # frames advance only on write_action
+    free_running = False
+
+    def __init__(self, game=None, seed=0):
+        self.game = game or SimulatedGame(seed=seed)
+        self.state = self.game.state
+
+    def read_state(self):
+        return self.state
+
+    def write_action(self, action: int):
+        self.state.action_command = int(action)
+        self.game.step(int(action))
+
+    def send_reset(self):
+        self.state.reset_command = 0
+        self.state.action_command = 0
+        self.game.reset()
+
+    def send_checkpoint(self, percent):
+        self.game.set_checkpoint(percent)
+
+    def seed(self, seed):
+        self.game.seed(seed)
+
+    def frame_index(self):
+        return self.game.frame
+
+    def close(self):
+        pass
+
@@ -1,6 +1,10 @@
 import numpy as np
 import torch
 from config import INPUT_DIM, DEVICE
+from core.memory_bridge import SharedState
+
+# NumPy view of the C++ struct: one record per raw SharedState snapshot
+STATE_DTYPE = np.dtype(SharedState)
 
 def normalize_state(state):
     """
@@ -40,6 +44,32 @@ def normalize_state(state):
     
     return full_state
 
+def normalize_states(states):
+    """
+    Vectorized normalize_state over a structured array of STATE_DTYPE records
+    (recorded snapshots). Produces bit-identical rows.
+
+    Output Shape: (N, 154)
+    """
+    n = len(states)
+    out = np.empty((n, INPUT_DIM), dtype=np.float64)
+
+    out[:, 0] = states['player_vel_y'] / 30.0
+    out[:, 1] = states['player_y'] / 900.0
+    out[:, 2] = states['is_on_ground']
+    out[:, 3] = states['player_mode']
+
+    objs = out[:, 4:].reshape(n, 30, 5)
+    o = states['objects']
+    objs[:, :, 0] = o['dx'] / 1000.0
+    objs[:, :, 1] = o['dy'] / 300.0
+    objs[:, :, 2] = o['w'] / 50.0
+    objs[:, :, 3] = o['h'] / 50.0
+    objs[:, :, 4] = o['type'] / 10.0
+
+    full_states = out.astype(np.float32)
+    return np.nan_to_num(full_states, nan=0.0, posinf=1.0, neginf=-1.0)
+
 def to_tensor(obs):
     """Quick helper to convert numpy obs to PyTorch Tensor on GPU"""
     return torch.tensor(obs, dtype=torch.float32, device=DEVICE).unsqueeze(0)
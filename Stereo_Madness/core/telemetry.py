@@ -0,0 +1,294 @@
+"""
+Hot-path instrumentation: named spans, streaming latency histograms,
+counters, a Prometheus-text endpoint and on-demand profiler capture.
+
+Disabled by default; while disabled `span()` hands back one shared no-op
+context manager and `count()` returns immediately, so call sites can stay
+in the hot loop.
+
+    from core import telemetry
+    telemetry.enable()
+    with telemetry.span("env.bridge"):
+        ...
+    telemetry.count("bridge.lock_timeouts")
+    print(telemetry.summary_line())
+"""
+import cProfile
+import os
+import signal
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_enabled = False
+_histograms = {}
+_counters = {}
+_lock = threading.Lock()
+
+# 4 sub-buckets per power of two (<= ~19% relative error) covering 1 ns .. ~1 h
+_SUB_BITS = 2
+_NUM_BUCKETS = 64 << _SUB_BITS
+
+
+def _bucket(ns):
+    b = ns.bit_length()
+    if b <= _SUB_BITS:
+        return ns
+    return (b - _SUB_BITS) << _SUB_BITS | (ns >> (b - _SUB_BITS - 1)) & ((1 << _SUB_BITS) - 1)
+
+
+def _bucket_upper(i):
+    """Upper edge (ns) of bucket i, used as the reported quantile value."""
+    if i < 1 << _SUB_BITS:
+        return float(i)
+    exp, sub = (i >> _SUB_BITS) + _SUB_BITS - 1, i & ((1 << _SUB_BITS) - 1)
+    return float((1 << exp) + (sub + 1) * (1 << (exp - _SUB_BITS)))
+
+
+class Histogram:
+    """Streaming log-bucketed latency histogram (constant memory, O(1) record)."""
+
+    def __init__(self, name):
+        self.name = name
+        self.counts = [0] * _NUM_BUCKETS
+        self.total = 0
+        self.sum_ns = 0
+        self.max_ns = 0
+
+    def record(self, ns):
+        self.counts[_bucket(ns)] += 1
+        self.total += 1
+        self.sum_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+
+    def quantile(self, q):
+        if self.total == 0:
+            return 0.0
+        rank = q * self.total
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank and c:
+                return min(_bucket_upper(i), float(self.max_ns))
+        return float(self.max_ns)
+
+    def mean(self):
+        return self.sum_ns / self.total if self.total else 0.0
+
+    def reset(self):
+        self.counts = [0] * _NUM_BUCKETS
+        self.total = self.sum_ns = self.max_ns = 0
+
+
+class _Span:
+    __slots__ = ("hist", "t0")
+
+    def __init__(self, hist):
+        self.hist = hist
+
+    def __enter__(self):
+        self.t0 = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.hist.record(time.perf_counter_ns() - self.t0)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def enabled():
+    return _enabled
+
+
+def histogram(name):
+    hist = _histograms.get(name)
+    if hist is None:
+        with _lock:
+            hist = _histograms.setdefault(name, Histogram(name))
+    return hist
+
+
+def span(name):
+    """Context manager timing its block into histogram `name`."""
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(histogram(name))
+
+
+def record(name, ns):
+    """Record an externally measured duration (ns)."""
+    if _enabled:
+        histogram(name).record(ns)
+
+
+def count(name, n=1):
+    if _enabled:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def snapshot():
+    """{'spans': {name: {count, mean_us, p50_us, p95_us, p99_us, max_us}}, 'counters': {...}}"""
+    spans = {}
+    for name, h in sorted(_histograms.items()):
+        spans[name] = {
+            "count": h.total,
+            "mean_us": h.mean() / 1e3,
+            "p50_us": h.quantile(0.50) / 1e3,
+            "p95_us": h.quantile(0.95) / 1e3,
+            "p99_us": h.quantile(0.99) / 1e3,
+            "max_us": h.max_ns / 1e3,
+        }
+    return {"spans": spans, "counters": dict(sorted(_counters.items()))}
+
+
+def reset():
+    for h in _histograms.values():
+        h.reset()
+    _counters.clear()
+
+
+def summary_line(reset_after=True):
+    """One-line p50/p99 digest for the training log (per-interval when reset_after)."""
+    snap = snapshot()
+    parts = [f"{name} {s['p50_us']:.0f}/{s['p99_us']:.0f}us"
+             for name, s in snap["spans"].items() if s["count"]]
+    parts += [f"{name}={v}" for name, v in snap["counters"].items()]
+    if reset_after:
+        reset()
+    return "[Perf] p50/p99 " + (" | ".join(parts) if parts else "no samples")
+
+
+# PROMETHEUS TEXT ENDPOINT
+
+def _metric_name(name):
+    return "gd_" + "".join(c if c.isalnum() else "_" for c in name)
+
+
+def prometheus_text():
+    lines = []
+    for name, h in sorted(_histograms.items()):
+        metric = _metric_name(name) + "_seconds"
+        lines.append(f"# TYPE {metric} summary")
+        for q in (0.5, 0.95, 0.99):
+            lines.append(f'{metric}{{quantile="{q}"}} {h.quantile(q) / 1e9:.9f}')
+        lines.append(f"{metric}_sum {h.sum_ns / 1e9:.9f}")
+        lines.append(f"{metric}_count {h.total}")
+    for name, v in sorted(_counters.items()):
+        metric = _metric_name(name) + "_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {v}")
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") not in ("", "/metrics"):
+            self.send_error(404)
+            return
+        body = prometheus_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass  # keep the training log clean
+
+
+def serve(port=9464, host="127.0.0.1"):
+    """Expose /metrics on a daemon thread (local only by default)."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="telemetry-http", daemon=True).start()
+    print(f"[Telemetry] Metrics at http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+
+# ON-DEMAND PROFILER CAPTURE
+
+class ProfileCapture:
+    """
+    Armed by a signal (SIGUSR1, or SIGBREAK / Ctrl+Break on Windows); the next
+    `steps` calls to tick() run under torch.profiler or cProfile and the trace
+    is written to out_dir.
+    """
+
+    def __init__(self, out_dir, steps=200, kind="torch"):
+        self.out_dir = out_dir
+        self.steps = steps
+        self.kind = kind
+        self._armed = False
+        self._remaining = 0
+        self._profiler = None
+
+    def arm(self, *_):
+        self._armed = True
+
+    def install(self):
+        sig = getattr(signal, "SIGUSR1", None) or getattr(signal, "SIGBREAK", None)
+        if sig is None:
+            print("[Telemetry] No profiling signal on this platform; call arm() instead")
+            return None
+        signal.signal(sig, self.arm)
+        print(f"[Telemetry] Send {sig.name} to pid {os.getpid()} to profile {self.steps} steps ({self.kind})")
+        return sig
+
+    def tick(self):
+        if self._profiler is not None:
+            self._remaining -= 1
+            if self._remaining <= 0:
+                self._stop()
+        elif self._armed:
+            self._armed = False
+            self._start()
+
+    def _start(self):
+        if self.kind == "torch":
+            import torch.profiler
+            self._profiler = torch.profiler.profile(
+                activities=[torch.profiler.ProfilerActivity.CPU], record_shapes=True
+            )
+            self._profiler.__enter__()
+        else:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        self._remaining = self.steps
+        print(f"[Telemetry] Profiling next {self.steps} steps...")
+
+    def _stop(self):
+        os.makedirs(self.out_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d_%H%M%S")
+        if self.kind == "torch":
+            self._profiler.__exit__(None, None, None)
+            path = os.path.join(self.out_dir, f"trace_{stamp}.json")
+            self._profiler.export_chrome_trace(path)
+            print(self._profiler.key_averages().table(sort_by="self_cpu_time_total", row_limit=15))
+        else:
+            self._profiler.disable()
+            path = os.path.join(self.out_dir, f"profile_{stamp}.prof")
+            self._profiler.dump_stats(path)
+        self._profiler = None
+        print(f"[Telemetry] Profile written to {path}")
@@ -0,0 +1,158 @@
+"""
+Bridge watchdog: stale-frame detection and reconnection for MemoryBridge.
+
+MemoryBridge.read_state returns whatever the segment holds, so a hung or
+crashed game looks like a frozen frame forever. BridgeWatchdog wraps a
+bridge factory and tracks progress on every read:
+
+  progress   the header frame counter (posix producers), otherwise a
+             fingerprint of the player fields (headerless Windows mod)
+  stall      no progress for `stall_seconds`, or (posix) the producer pid
+             in the header is gone; read_state raises BridgeStall once
+  reconnect  the next send_reset closes the old mapping and reopens the
+             segment every `retry_seconds` until a new one answers with
+             fresh frames; after `max_outage_seconds` it raises BridgeLost
+
+GeometryDashEnv turns BridgeStall into a truncated step (info["stalled"])
+and retries reset(), so the training process, and with it the agent,
+optimizer and replay buffer, survives the outage. Counters: stalls,
+reconnects (also telemetry bridge.stalls / bridge.reconnects).
+
+Enable with BRIDGE_WATCHDOG = True in config.py.
+"""
+import time
+
+from config import WATCHDOG_STALL_SECONDS, WATCHDOG_RETRY_SECONDS, WATCHDOG_MAX_OUTAGE_SECONDS
+from core import telemetry
+from core.shm_transport import pid_alive
+
+
+class BridgeStall(RuntimeError):
+    """The game stopped producing frames (hang or crash)."""
+
+
+class BridgeLost(RuntimeError):
+    """No game came back within the outage limit."""
+
+
+class BridgeWatchdog:
+    def __init__(self, connect, stall_seconds=WATCHDOG_STALL_SECONDS, retry_seconds=WATCHDOG_RETRY_SECONDS,
+                 max_outage_seconds=WATCHDOG_MAX_OUTAGE_SECONDS):
+        """connect: zero-argument callable returning a connected bridge, e.g. lambda: MemoryBridge(instance)."""
+        self.connect = connect
+        self.stall_seconds = stall_seconds
+        self.retry_seconds = retry_seconds
+        self.max_outage_seconds = max_outage_seconds
+        self.bridge = connect()
+        self.stalled = False
+        self.stalls = 0
+        self.reconnects = 0
+        self._mark = None
+        self._last_progress = time.perf_counter()
+
+    def __getattr__(self, name):
+        # lockstep, free_running, reset_delay, send_checkpoint, ... of the current bridge
+        return getattr(self.bridge, name)
+
+    # PROGRESS
+    def _progress_mark(self, state):
+        frame = self.bridge.frame_index()
+        if frame is not None:
+            return frame
+        return (state.player_x, state.player_y, state.player_vel_y, state.percent, state.is_dead)
+
+    @staticmethod
+    def _producer_gone(bridge):
+        header = getattr(bridge, "header", None)
+        return header is not None and header.producer_pid and not pid_alive(header.producer_pid)
+
+    def _check(self, state):
+        now = time.perf_counter()
+        mark = self._progress_mark(state)
+        if mark != self._mark:
+            self._mark = mark
+            self._last_progress = now
+            return
+        exited = self._producer_gone(self.bridge)
+        if exited or now - self._last_progress > self.stall_seconds:
+            self.stalled = True
+            self.stalls += 1
+            telemetry.count("bridge.stalls")
+            print(f"[Watchdog] No new frame for {now - self._last_progress:.1f} s "
+                  f"({'producer exited' if exited else 'game hung'}) → episode truncated")
+            raise BridgeStall(f"no new frame for {now - self._last_progress:.1f} s")
+
+    # BRIDGE INTERFACE
+    def read_state(self):
+        if self.stalled:
+            raise BridgeStall("bridge is stalled; send_reset reconnects")
+        state = self.bridge.read_state()
+        self._check(state)
+        return state
+
+    def write_action(self, action: int):
+        if not self.stalled:
+            self.bridge.write_action(action)
+
+    def send_reset(self):
+        if self.stalled:
+            self.reconnect()
+        self.bridge.send_reset()
+
+    def frame_index(self):
+        return self.bridge.frame_index()
+
+    def close(self):
+        self.bridge.close()
+
+    # RECONNECT
+    def _answers(self, bridge):
+        """True if a freshly opened bridge produces new frames within stall_seconds."""
+        if self._producer_gone(bridge):
+            return False  # the crashed producer's segment, not replaced yet
+        bridge.send_reset()
+        first = None
+        deadline = time.perf_counter() + self.stall_seconds
+        while time.perf_counter() < deadline:
+            bridge.write_action(0)
+            state = bridge.read_state()
+            frame = bridge.frame_index()
+            mark = frame if frame is not None else (state.player_x, state.player_y, state.percent)
+            if first is None:
+                first = mark
+            elif mark != first:
+                return True
+            time.sleep(0.001)
+        return False
+
+    def reconnect(self):
+        """Reopen the segment until a live game answers (blocks up to max_outage_seconds)."""
+        t0 = time.perf_counter()
+        try:
+            self.bridge.close()
+        except Exception:
+            pass  # the mapping of a crashed producer may already be gone
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                bridge = self.connect()
+                if self._answers(bridge):
+                    break
+                bridge.close()
+            except Exception as e:
+                if attempt == 1:
+                    print(f"[Watchdog] Waiting for the game to come back ({e})")
+            if time.perf_counter() - t0 > self.max_outage_seconds:
+                raise BridgeLost(f"no live game after {self.max_outage_seconds:.0f} s")
+            time.sleep(self.retry_seconds)
+        self.bridge = bridge
+        self.stalled = False
+        self._mark = None
+        self._last_progress = time.perf_counter()
+        self.reconnects += 1
+        telemetry.count("bridge.reconnects")
+        print(f"[Watchdog] Reconnected after {time.perf_counter() - t0:.1f} s ({attempt} attempts)")
+
+    def summary(self):
+        return f"[Watchdog] {self.stalls} stalls, {self.reconnects} reconnects"
@@ -0,0 +1,210 @@
+"""
+Propose curriculum slices from death and progress statistics.
+
+Every training episode starts at a slice start and ends at a death or the
+slice end; the episode log (DEATH_LOG, one row per episode) gives, per
+percent bin, how many attempts went through it (progress histogram) and how
+many died in it. The death rate of a bin, smoothed with a Beta prior, turns
+into an additive difficulty -log(1 - hazard): the difficulty of a slice is
+minus the log of its estimated survival probability.
+
+Slices are cut so that every slice of a mode section gets an equal share of
+difficulty: a mode change always starts a new slice, the slice count of each
+section is proportional to its difficulty, and no slice is narrower than
+--min-width. Bins nobody reached yet get the prior hazard.
+
+Usage (from Stereo_Madness/):
+    python -m curriculum.discovery --deaths logs/death_log.csv --num-slices 12 \\
+        --out curriculum/slice_definitions_auto.json
+"""
+import argparse
+import csv
+import json
+import os
+import numpy as np
+
+from config import CURRICULUM_FILE, DEATH_LOG
+
+BIN_WIDTH = 0.5             # percent
+HAZARD_PRIOR = (1.0, 9.0)   # Beta(deaths, survivals) pseudo-counts: 10% per bin before any data
+LOG_FIELDS = ("episode", "slice", "start", "percent", "died")
+
+
+def log_episode(path, episode, slice_id, start, percent, died):
+    """Append one episode to the episode/death log (CSV, header on creation)."""
+    new = not os.path.exists(path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a', newline='') as f:
+        writer = csv.writer(f)
+        if new:
+            writer.writerow(LOG_FIELDS)
+        writer.writerow((episode, slice_id, f"{start:.2f}", f"{percent:.3f}", int(bool(died))))
+
+
+def load_episodes(paths):
+    """(start, percent, died) rows of one or more episode logs."""
+    rows = []
+    for path in paths:
+        with open(path, 'r', newline='') as f:
+            for r in csv.DictReader(f):
+                rows.append((float(r['start']), float(r['percent']), float(r['died'])))
+    return np.asarray(rows, dtype=np.float64).reshape(-1, 3)
+
+
+def progress_histogram(episodes, bin_width=BIN_WIDTH, length=100.0):
+    """(visits, deaths) per bin: attempts that entered the bin, attempts that died in it."""
+    n = int(np.ceil(length / bin_width))
+    visits = np.zeros(n + 1, dtype=np.float64)
+    deaths = np.zeros(n, dtype=np.float64)
+    if len(episodes):
+        start, percent, died = episodes[:, 0], episodes[:, 1], episodes[:, 2].astype(bool)
+        first = np.clip((start / bin_width).astype(int), 0, n - 1)
+        last = np.clip((percent / bin_width).astype(int), 0, n - 1)
+        # a win only entered the bins before its end; a death also its own bin
+        stop = np.maximum(np.where(died, last + 1, last), first)
+        np.add.at(visits, first, 1.0)
+        np.add.at(visits, stop, -1.0)
+        np.add.at(deaths, last[died], 1.0)
+    return np.cumsum(visits)[:n], deaths
+
+
+def bin_difficulty(visits, deaths, prior=HAZARD_PRIOR):
+    """-log(1 - hazard) per bin with a Beta-smoothed hazard."""
+    a, b = prior
+    hazard = (deaths + a) / (visits + a + b)
+    return -np.log1p(-np.minimum(hazard, 0.999))
+
+
+def mode_segments(slices):
+    """Contiguous (start, end, mode) sections of a slice list, split at mode changes."""
+    slices = sorted(slices, key=lambda s: s['start'])
+    segments = []
+    for s in slices:
+        mode = s.get('mode', 0)
+        if segments and segments[-1][2] == mode:
+            segments[-1][1] = s['end']
+        else:
+            if segments:
+                # overlapping hand-made slices: the new mode starts where its slice starts
+                segments[-1][1] = s['start']
+            segments.append([s['start'], s['end'], mode])
+    return [tuple(seg) for seg in segments]
+
+
+def slice_difficulty(cost, start, end, bin_width=BIN_WIDTH):
+    """Summed bin difficulty over [start, end) (partial bins weighted by overlap)."""
+    edges = np.arange(len(cost) + 1) * bin_width
+    overlap = np.clip(np.minimum(edges[1:], end) - np.maximum(edges[:-1], start), 0.0, None) / bin_width
+    return float((cost * overlap).sum())
+
+
+def _allocate(difficulties, widths, total, min_width):
+    """Slices per section: proportional to difficulty, >= 1, within what min_width allows."""
+    cap = np.maximum(1, (np.asarray(widths) / min_width).astype(int))
+    share = np.asarray(difficulties) / max(sum(difficulties), 1e-9) * total
+    count = np.clip(np.floor(share).astype(int), 1, cap)
+    while count.sum() < total and (count < cap).any():
+        room = np.where(count < cap, share - count, -np.inf)
+        count[int(np.argmax(room))] += 1
+    return count
+
+
+def _cuts(cost, start, end, n, min_width, bin_width):
+    """n - 1 interior cut points of [start, end) at equal shares of cumulative difficulty."""
+    if n <= 1:
+        return []
+    grid = np.arange(start, end + 1e-9, bin_width / 4)
+    cum = np.array([slice_difficulty(cost, start, x, bin_width) for x in grid])
+    cuts = []
+    for k in range(1, n):
+        x = float(np.interp(k * cum[-1] / n, cum, grid))
+        lo = (cuts[-1] if cuts else start) + min_width
+        hi = end - (n - k) * min_width
+        cuts.append(round(min(max(x, lo), hi) / bin_width * 2) * bin_width / 2)
+    return cuts
+
+
+def propose_slices(visits, deaths, segments, num_slices, min_width=2.0, bin_width=BIN_WIDTH):
+    """New slice definitions (same fields as slice_definitions.json)."""
+    cost = bin_difficulty(visits, deaths)
+    difficulties = [slice_difficulty(cost, a, b, bin_width) for a, b, _ in segments]
+    counts = _allocate(difficulties, [b - a for a, b, _ in segments], num_slices, min_width)
+
+    slices = []
+    for (a, b, mode), n in zip(segments, counts):
+        bounds = [a] + _cuts(cost, a, b, int(n), min_width, bin_width) + [b]
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            survival = np.exp(-slice_difficulty(cost, lo, hi, bin_width))
+            slices.append({
+                'id': len(slices) + 1, 'start': round(lo, 2), 'end': round(hi, 2), 'mode': int(mode),
+                'target_w': round(hi, 2),
+                'description': f"Auto - {'Ship' if mode == 1 else 'Cube'}, est. survival {survival * 100:.0f}%",
+            })
+    return slices
+
+
+def propose_split(episodes, current_slice, min_width=2.0, bin_width=BIN_WIDTH):
+    """Cut point halving the estimated difficulty of `current_slice`, or None if it is too narrow."""
+    start, end = current_slice['start'], current_slice['end']
+    if end - start < 2 * min_width:
+        return None
+    visits, deaths = progress_histogram(episodes, bin_width, length=max(100.0, end + bin_width))
+    cost = bin_difficulty(visits, deaths)
+    return _cuts(cost, start, end, 2, min_width, bin_width)[0]
+
+
+def danger_zones(visits, deaths, top=3, bin_width=BIN_WIDTH, min_visits=20):
+    """(start, end, label) of the `top` deadliest runs of adjacent bins (for plots)."""
+    hazard = np.where(visits >= min_visits, deaths / np.maximum(visits, 1), 0.0)
+    hot = hazard >= max(np.percentile(hazard[hazard > 0], 90) if (hazard > 0).any() else 1.0, 1e-9)
+    zones, i = [], 0
+    while i < len(hot):
+        if hot[i]:
+            j = i
+            while j + 1 < len(hot) and hot[j + 1]:
+                j += 1
+            zones.append((i * bin_width, (j + 1) * bin_width, float(hazard[i:j + 1].max())))
+            i = j + 1
+        else:
+            i += 1
+    zones.sort(key=lambda z: -z[2])
+    return [(a, b, f"{h * 100:.0f}% deaths") for a, b, h in sorted(zones[:top])]
+
+
+def describe(slices, cost, bin_width=BIN_WIDTH):
+    for s in slices:
+        d = slice_difficulty(cost, s['start'], s['end'], bin_width)
+        print(f"   Slice {s['id']:>2}: {s['start']:5.1f} → {s['end']:5.1f} | mode {s.get('mode', 0)} | "
+              f"difficulty {d:5.2f} | est. survival {np.exp(-d) * 100:5.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Propose slice boundaries from death/progress statistics")
+    parser.add_argument("--deaths", nargs="+", default=[DEATH_LOG], help="episode logs (CSV)")
+    parser.add_argument("--slices", default=CURRICULUM_FILE, help="current definitions (mode sections)")
+    parser.add_argument("--num-slices", type=int, default=None, help="default: as many as now")
+    parser.add_argument("--min-width", type=float, default=2.0)
+    parser.add_argument("--out", default=None, help="write the proposal here")
+    args = parser.parse_args()
+
+    with open(args.slices, 'r') as f:
+        current = json.load(f)
+    episodes = load_episodes(args.deaths)
+    visits, deaths = progress_histogram(episodes)
+    cost = bin_difficulty(visits, deaths)
+    print(f"[Discovery] {len(episodes):,} episodes, {int(episodes[:, 2].sum()) if len(episodes) else 0:,} deaths")
+    print("[Discovery] Current slices:")
+    describe(current, cost)
+
+    proposal = propose_slices(visits, deaths, mode_segments(current), args.num_slices or len(current),
+                              args.min_width)
+    print("[Discovery] Proposed slices:")
+    describe(proposal, cost)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(proposal, f, indent=4)
+        print(f"[Discovery] Written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
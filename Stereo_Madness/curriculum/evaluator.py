@@ -0,0 +1,204 @@
+"""
+Greedy evaluation of weight snapshots in a side process.
+
+The orchestrator submits a copy of the online network every few episodes;
+the evaluator process plays N greedy episodes of the slice on its own env
+instance and sends back win rate, mean death percent and episode length.
+Submitting never waits; snapshots that queued up while an evaluation ran
+are skipped in favour of the newest one.
+
+Env instances:
+  sim     in-process SimulatedGame, respawning at the slice start. Its
+          level is random, not Stereo Madness: fine for smoke tests and
+          the scripted benchmarks, not for gating the live curriculum.
+  memory  an already running game on MemoryBridge(instance=EVAL_INSTANCE).
+          MemoryBridge cannot place a practice checkpoint, and key presses
+          only reach the focused window, so place it at the slice start by
+          hand in that game (again after every promotion). An episode that
+          respawns more than CHECKPOINT_TOLERANCE away from the slice start
+          fails the evaluation instead of scoring another part of the level.
+
+Usage (from Stereo_Madness/):
+    python -m curriculum.evaluator --slice 1 --episodes 10
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import queue
+import time
+import numpy as np
+import torch
+
+from config import *
+from core.environment import GeometryDashEnv
+from core.sim_game import SimBridge, SimulatedGame, SimulatedLevel
+from agents.ddqn import make_agent
+
+CHECKPOINT_TOLERANCE = 1.0  # percent; main.py's relay places the checkpoint 0.5% before the start
+
+
+def _open_env(bridge_kind, instance, level_seed):
+    if bridge_kind == "sim":
+        bridge = SimBridge(SimulatedGame(SimulatedLevel(seed=level_seed)))
+    elif bridge_kind == "memory":
+        from core.memory_bridge import MemoryBridge
+        bridge = MemoryBridge(instance=instance)
+    else:
+        raise ValueError(f"[Eval] Unknown bridge '{bridge_kind}'")
+    return GeometryDashEnv(bridge=bridge, frame_skip=FRAME_SKIP, action_repeats=ACTION_REPEATS,
+                           frame_gamma=FRAME_GAMMA if ACTION_REPEATS else 1.0)
+
+
+def evaluate_policy(env, agent, current_slice, episodes, max_steps=5000):
+    """N greedy episodes of `current_slice`: win rate, mean death percent, mean length."""
+    placed = hasattr(env.bridge, "send_checkpoint")
+    if placed:
+        env.bridge.send_checkpoint(current_slice['start'])
+    env.set_slice(current_slice)
+    wins, deaths, steps_taken, frames_taken = 0, [], [], []
+    for _ in range(episodes):
+        obs, info = env.reset()
+        if not placed and abs(info['percent'] - current_slice['start']) > CHECKPOINT_TOLERANCE:
+            raise RuntimeError(f"[Eval] The game respawns at {info['percent']:.1f}%, not at the Slice "
+                               f"{current_slice['id']} start ({current_slice['start']:.1f}%): "
+                               f"place its practice checkpoint there by hand")
+        steps = frames = 0
+        terminated = False
+        while steps < max_steps:
+            obs, _, terminated, _, info = env.step(agent.select_action(obs, is_training=False))
+            steps += 1
+            frames += info['frames']
+            if terminated or info['percent'] >= current_slice['end']:
+                break
+        if info['percent'] >= current_slice['end']:
+            wins += 1
+        elif terminated:
+            deaths.append(float(info['percent']))
+        steps_taken.append(steps)
+        frames_taken.append(frames)
+    return {
+        "episodes": episodes,
+        "win_rate": wins / episodes,
+        "mean_death_percent": float(np.mean(deaths)) if deaths else None,
+        "mean_steps": float(np.mean(steps_taken)),
+        "mean_frames": float(np.mean(frames_taken)),
+    }
+
+
+def _eval_worker(jobs, results, settings):
+    """Side process: evaluate snapshots until a None job arrives."""
+    torch.set_num_threads(1)
+    env = _open_env(settings['bridge'], settings['instance'], settings['level_seed'])
+    agent = make_agent(INPUT_DIM, NUM_ACTIONS, make_agent_config(device="cpu"), CHECKPOINT_DIR)
+    agent.online_net.eval()
+    try:
+        while True:
+            job = jobs.get()
+            skipped = 0
+            while job is not None:
+                try:
+                    newer = jobs.get_nowait()
+                except queue.Empty:
+                    break
+                job = newer
+                skipped += 1
+            if job is None:
+                return
+            t0 = time.perf_counter()
+            agent.online_net.load_state_dict({k: torch.from_numpy(v) for k, v in job['weights'].items()})
+            try:
+                result = evaluate_policy(env, agent, job['slice'], settings['episodes'])
+            except RuntimeError as e:
+                # no slice_id: the curriculum ignores it, the next snapshot tries again
+                results.put({"tag": job['tag'], "slice_id": None, "skipped": skipped, "error": str(e)})
+                continue
+            result.update(tag=job['tag'], slice_id=job['slice']['id'], skipped=skipped,
+                          eval_s=time.perf_counter() - t0)
+            results.put(result)
+    except Exception as e:
+        results.put({"tag": None, "slice_id": None, "error": repr(e)})
+    finally:
+        env.bridge.close()
+
+
+class BackgroundEvaluator:
+    def __init__(self, bridge=EVAL_BRIDGE, episodes=EVAL_EPISODES, instance=EVAL_INSTANCE, level_seed=0):
+        ctx = mp.get_context("spawn")
+        self.jobs = ctx.Queue()
+        self.results = ctx.Queue()
+        settings = {'bridge': bridge, 'episodes': episodes, 'instance': instance, 'level_seed': level_seed}
+        self.process = ctx.Process(target=_eval_worker, args=(self.jobs, self.results, settings),
+                                   name="evaluator", daemon=True)
+        self.process.start()
+        self.submitted = self.replaced = self.received = 0
+        print(f"[Eval] Background evaluator started ({bridge}, {episodes} greedy episodes per snapshot)")
+
+    def submit(self, state_dict, current_slice, tag):
+        """Queue a snapshot of `state_dict` for `current_slice`; never blocks."""
+        job = {'weights': {k: v.detach().cpu().numpy().copy() for k, v in state_dict.items()},
+               'slice': dict(current_slice), 'tag': tag}
+        self.jobs.put_nowait(job)
+        self.submitted += 1
+
+    def pending(self):
+        """Snapshots submitted whose result has not been polled yet."""
+        return self.submitted - self.replaced - self.received
+
+    def poll(self):
+        """Results that arrived since the last call."""
+        out = []
+        while True:
+            try:
+                out.append(self.results.get_nowait())
+            except queue.Empty:
+                self.received += len(out)
+                self.replaced += sum(r.get('skipped', 0) for r in out)
+                return out
+
+    def close(self):
+        self.jobs.put(None)
+        self.process.join(timeout=30)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+def format_result(r):
+    if r.get('error'):
+        return f"[Eval] Evaluator failed: {r['error']}"
+    death = f"{r['mean_death_percent']:.1f}%" if r['mean_death_percent'] is not None else "-"
+    return (f"[Eval] Slice {r['slice_id']} @ {r['tag']} | Win% {r['win_rate'] * 100:5.1f}% | "
+            f"mean death {death} | length {r['mean_steps']:.0f} steps / {r['mean_frames']:.0f} frames | "
+            f"{r['eval_s']:.1f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate a slice expert with the background evaluator")
+    parser.add_argument("--slice", type=int, default=1)
+    parser.add_argument("--model", help="state_dict (default: checkpoints/final_models/slice_XX_model.pth)")
+    parser.add_argument("--episodes", type=int, default=EVAL_EPISODES)
+    parser.add_argument("--snapshots", type=int, default=3, help="submit the model this many times in a row")
+    args = parser.parse_args()
+
+    with open(CURRICULUM_FILE, 'r') as f:
+        current_slice = next(s for s in json.load(f) if s['id'] == args.slice)
+    path = args.model or os.path.join(CHECKPOINT_DIR, "final_models", f"slice_{args.slice:02d}_model.pth")
+    weights = torch.load(path, map_location="cpu")
+
+    evaluator = BackgroundEvaluator(bridge="sim", episodes=args.episodes)
+    try:
+        for i in range(args.snapshots):
+            t0 = time.perf_counter_ns()
+            evaluator.submit(weights, current_slice, tag=f"snapshot {i}")
+            print(f"[Eval] submit took {(time.perf_counter_ns() - t0) / 1000:.0f} us")
+        while evaluator.pending() > 0 and evaluator.process.is_alive():
+            for r in evaluator.poll():
+                print(format_result(r))
+            time.sleep(0.05)
+        print(f"[Eval] {evaluator.submitted} snapshots submitted, {evaluator.replaced} skipped for a newer one")
+    finally:
+        evaluator.close()
+
+
+if __name__ == "__main__":
+    main()
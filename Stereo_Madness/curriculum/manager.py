@@ -1,26 +1,38 @@
 import json
 import os
 import numpy as np
-from config import CURRICULUM_FILE, META_FILE, CHECKPOINT_DIR
+from config import (CURRICULUM_FILE, META_FILE, CHECKPOINT_DIR, EVAL_GATE_PROMOTION, EVAL_PROMOTE_WIN_RATE,
+                    CURRICULUM_AUTO_SPLIT, SPLIT_PLATEAU_EPISODES, SPLIT_MIN_WIDTH)
+from curriculum.discovery import propose_split
 
 class CurriculumManager:
-    def __init__(self):
+    def __init__(self, meta_file=META_FILE, slices=None, auto_split=CURRICULUM_AUTO_SPLIT):
+        self.meta_file = meta_file
+        self.auto_split = auto_split
         # Load the Slice Definitions
-        with open(CURRICULUM_FILE, 'r') as f:
-            self.slices = json.load(f) 
+        if slices is not None:
+            self.slices = [dict(s) for s in slices]
+        else:
+            with open(CURRICULUM_FILE, 'r') as f:
+                self.slices = json.load(f)
             
         # Initialize Metrics
         self.slice_idx = 0       # Current index (0 to 8)
         self.wins_window = []    # Rolling window of last 50 episodes (0=Fail, 1=Success)
         self.total_steps = 0
         self.best_rate_current_slice = 0.0
+        self.last_eval = None    # latest background evaluation of the current slice
+        self.episodes = []       # (start, end percent, died) of the current slice, for splitting
+        self.plateau_best = 0.0  # best full-window win rate of the current slice
+        self.since_best = 0      # full-window episodes since plateau_best last improved
+        self.splits = 0
         
         # Create Directories
         os.makedirs(CHECKPOINT_DIR, exist_ok=True)
-        os.makedirs(os.path.dirname(META_FILE), exist_ok=True)
+        os.makedirs(os.path.dirname(self.meta_file), exist_ok=True)
         
         # Resume Progress if Meta file exists
-        if os.path.exists(META_FILE):
+        if os.path.exists(self.meta_file):
             self.load_state()
         else:
             print(f"[Curriculum] Starting fresh from Slice 1: {self.slices[0]['description']}")
@@ -29,12 +41,16 @@ class CurriculumManager:
         """Returns the dictionary for the active slice."""
         return self.slices[self.slice_idx]
 
-    def update(self, won_episode, steps_taken):
+    def update(self, won_episode, steps_taken, percent=None):
         """
         Called after every episode to update statistics.
+        `percent` (where the episode ended) feeds the plateau split.
         Returns the current rolling success rate (0.0 to 1.0).
         """
         self.total_steps += steps_taken
+        if percent is not None:
+            self.episodes.append((self.get_current_slice()['start'], float(percent), 0.0 if won_episode else 1.0))
+            del self.episodes[:-2000]
         
         # Update Window
         self.wins_window.append(1 if won_episode else 0)
@@ -49,6 +65,14 @@ class CurriculumManager:
         # Track 'High Score' for this slice
         if current_rate > self.best_rate_current_slice:
             self.best_rate_current_slice = current_rate
+
+        # Plateau: no better full-window win rate for a while
+        if len(self.wins_window) == 50:
+            if current_rate > self.plateau_best:
+                self.plateau_best = current_rate
+                self.since_best = 0
+            else:
+                self.since_best += 1
             
         return current_rate
 
@@ -61,8 +85,60 @@ class CurriculumManager:
             return False 
         
         current_rate = sum(self.wins_window) / len(self.wins_window)
+        if EVAL_GATE_PROMOTION:
+            # the greedy policy must also pass, not only the epsilon-greedy one
+            if self.last_eval is None or self.last_eval['win_rate'] < EVAL_PROMOTE_WIN_RATE:
+                return False
         return current_rate >= 0.70
 
+    def defer_promotion(self):
+        """Keep training the current slice: a fresh window has to pass the gate again."""
+        self.wins_window = []
+        self.best_rate_current_slice = 0.0
+
+    def should_split(self):
+        """True if auto-splitting is on and the win rate stopped improving."""
+        return self.auto_split and self.since_best >= SPLIT_PLATEAU_EPISODES and not self.should_promote()
+
+    def split_current_slice(self):
+        """
+        Split the current slice where its estimated difficulty (death statistics
+        since it started) is halved. The first half keeps the slice id, so its
+        checkpoint keeps training; the second half gets a new id, so ids no
+        longer follow level order (order slices by 'start').
+        Returns True if the slice was split.
+        """
+        current = self.get_current_slice()
+        cut = propose_split(np.asarray(self.episodes).reshape(-1, 3), current, SPLIT_MIN_WIDTH)
+        self.since_best = 0
+        if cut is None:
+            print(f"[Curriculum] Slice {current['id']} plateaued but is too narrow to split")
+            return False
+
+        second = dict(current)
+        second['id'] = max(s['id'] for s in self.slices) + 1
+        second['start'] = cut
+        second['description'] = f"{current['description']} (second half)"
+        current['end'] = cut
+        current['target_w'] = min(current.get('target_w', cut), cut)
+        self.slices.insert(self.slice_idx + 1, second)
+        self.splits += 1
+
+        self.wins_window = []
+        self.best_rate_current_slice = 0.0
+        self.plateau_best = 0.0
+        self.episodes = []
+        self.last_eval = None
+        self.save_state()
+        print(f"[Curriculum] Slice {current['id']} plateaued → split at {cut:.2f}% "
+              f"(Slice {current['id']}: {current['start']} → {cut}, Slice {second['id']}: {cut} → {second['end']})")
+        return True
+
+    def record_evaluation(self, result):
+        """Keep a background evaluation result if it belongs to the current slice."""
+        if result.get('slice_id') == self.get_current_slice()['id']:
+            self.last_eval = result
+
     def advance_slice(self):
         """
         Moves the index to the next slice and resets slice-specific metrics.
@@ -75,6 +151,10 @@ class CurriculumManager:
             # Reset Metrics for the new challenge
             self.wins_window = []
             self.best_rate_current_slice = 0.0
+            self.last_eval = None
+            self.episodes = []
+            self.plateau_best = 0.0
+            self.since_best = 0
             
             # Save immediately so progress isn't lost
             self.save_state()
@@ -91,16 +171,23 @@ class CurriculumManager:
             "slice_idx": self.slice_idx,
             "total_steps": self.total_steps
         }
-        with open(META_FILE, 'w') as f:
+        if self.splits:
+            # split slices replace the definitions file from now on
+            data["slices"] = self.slices
+            data["splits"] = self.splits
+        with open(self.meta_file, 'w') as f:
             json.dump(data, f)
 
     def load_state(self):
         """Loads progress from JSON."""
         try:
-            with open(META_FILE, 'r') as f:
+            with open(self.meta_file, 'r') as f:
                 data = json.load(f)
                 self.slice_idx = data.get("slice_idx", 0)
                 self.total_steps = data.get("total_steps", 0)
+                if "slices" in data:
+                    self.slices = data["slices"]
+                    self.splits = data.get("splits", 0)
                 
             curr = self.slices[self.slice_idx]
             print(f"[Curriculum] Resumed at Slice {curr['id']} ({curr['description']})")
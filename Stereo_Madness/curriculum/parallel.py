@@ -0,0 +1,306 @@
+"""
+Train several slice experts at once, one process per slice.
+
+Every worker owns its env instance, replay buffer, checkpoint directory and
+CurriculumManager state (<out>/slice_XX/). The coordinator hands out slices
+to a pool of worker slots:
+  - a slice whose physics mode already appeared earlier in the level waits
+    for the previous same-mode expert and warm-starts from it the moment it
+    is promoted (the orchestrator's transfer rule)
+  - with --eager an idle slot instead starts a waiting slice right away from
+    the newest same-mode weights available (promoted expert, else that
+    slice's in-progress checkpoint, else fresh)
+Promoted experts land in <out>/final_models/slice_XX_model.pth, the layout
+main.py and play_stereo_madness.py read. Rerunning resumes: promoted slices
+are skipped and unfinished ones continue from slice_XX/current.pth.
+
+Environment stand-ins (one per worker):
+  sim  in-process SimBridge
+  shm  a core.shm_producer process on its own posix segment (instance = slot + 1),
+       driven through MemoryBridge like the real game
+
+Usage (from Stereo_Madness/):
+    python -m curriculum.parallel --workers 4 --bridge sim
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import queue
+import shutil
+import signal
+import time
+import numpy as np
+import torch
+
+from config import *
+from core.environment import GeometryDashEnv
+from core.seeding import seed_everything
+from core.sim_game import SimBridge, SimulatedGame, SimulatedLevel
+from agents.ddqn import make_agent
+from agents.replay_buffer import ReplayBuffer
+from curriculum.manager import CurriculumManager
+from tuning.sweep import train_episode
+
+
+def previous_same_mode(slices, s):
+    return next((p for p in reversed(slices) if p['start'] < s['start'] and p['mode'] == s['mode']), None)
+
+
+def _open_bridge(bridge_kind, slot, level_seed, start_percent, stop):
+    """(bridge, producer process or None) for one worker."""
+    if bridge_kind == "sim":
+        bridge = SimBridge(SimulatedGame(SimulatedLevel(seed=level_seed)))
+        bridge.send_checkpoint(start_percent)
+        return bridge, None
+
+    from core.memory_bridge import MemoryBridge
+    from core.shm_producer import run_producer
+    producer = mp.get_context("spawn").Process(
+        target=run_producer, args=(slot + 1, True, 60.0, level_seed, stop, start_percent))
+    producer.start()
+    deadline = time.perf_counter() + 30.0
+    while True:
+        try:
+            return MemoryBridge(instance=slot + 1, backend="posix"), producer
+        except Exception:
+            if time.perf_counter() > deadline or not producer.is_alive():
+                raise
+            time.sleep(0.1)
+
+
+def _save_current(agent, slice_dir):
+    """Weights, optimizer and exploration state, so a resumed slice does not start exploring again."""
+    torch.save(agent.training_state(), os.path.join(slice_dir, "current.pth"))
+
+
+def train_slice(slot, current_slice, init_path, slice_dir, events, stop, settings):
+    """Worker process: train one slice until promotion, budget or stop."""
+    # Ctrl+C reaches the whole process group: the coordinator stops workers through `stop`
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    torch.set_num_threads(1)
+    sid = current_slice['id']
+    seed_everything(settings['seed'] + sid)
+    os.makedirs(slice_dir, exist_ok=True)
+
+    bridge, producer = _open_bridge(settings['bridge'], slot, settings['level_seed'], current_slice['start'], stop)
+    try:
+        env = GeometryDashEnv(bridge=bridge, frame_skip=FRAME_SKIP, action_repeats=ACTION_REPEATS,
+                              frame_gamma=FRAME_GAMMA if ACTION_REPEATS else 1.0)
+        env.set_slice(current_slice)
+        agent = make_agent(INPUT_DIM, NUM_ACTIONS, make_agent_config(), slice_dir)
+        memory = ReplayBuffer(MEMORY_SIZE)
+
+        manager = CurriculumManager(meta_file=os.path.join(slice_dir, "training_meta.json"))
+        manager.slice_idx = next(i for i, s in enumerate(manager.slices) if s['id'] == sid)
+
+        current = os.path.join(slice_dir, "current.pth")
+        if os.path.exists(current):
+            state = torch.load(current, map_location=agent.device)
+            if 'steps_done' in state:
+                agent.load_training_state(state)
+                print(f"[Parallel] Slice {sid} resumed at step {agent.steps_done:,}")
+            else:
+                agent.load(current)  # weights-only checkpoint of an older run
+        elif init_path is not None:
+            agent.load(init_path)
+            # transfer: resume with moderate exploration (epsilon 0.5) like the orchestrator
+            agent.steps_done = int(-agent.epsilon_decay * np.log(
+                (0.5 - agent.epsilon_end) / (agent.epsilon_start - agent.epsilon_end)))
+
+        frames = 0
+        t0 = time.perf_counter()
+        for episode in range(1, settings['max_episodes'] + 1):
+            if stop.is_set():
+                _save_current(agent, slice_dir)
+                events.put(("stopped", sid, frames))
+                return
+            percent, _, steps, won = train_episode(env, agent, memory, current_slice)
+            frames += steps * env.frame_skip
+            win_rate = manager.update(won, steps)
+            if episode % settings['report_every'] == 0:
+                events.put(("progress", sid, episode, win_rate, percent, frames))
+            if manager.should_promote():
+                agent.save(filename="final_model.pth")
+                manager.save_state()
+                events.put(("promoted", sid, os.path.join(slice_dir, "final_model.pth"), episode, frames,
+                            time.perf_counter() - t0))
+                return
+            if episode % 50 == 0:
+                _save_current(agent, slice_dir)
+                manager.save_state()
+
+        _save_current(agent, slice_dir)
+        events.put(("budget", sid, frames))
+    except Exception as e:
+        events.put(("failed", sid, repr(e)))
+    finally:
+        bridge.close()
+        if producer is not None:
+            stop.set()
+            producer.join()
+
+
+class ParallelCurriculum:
+    def __init__(self, out_dir, workers=2, bridge="sim", eager=False, max_episodes=5000,
+                 report_every=10, level_seed=0, seed=0, slice_ids=None):
+        with open(CURRICULUM_FILE, 'r') as f:
+            self.slices = sorted(json.load(f), key=lambda s: s['start'])
+        for s in self.slices:
+            s.setdefault('mode', 0)
+        self.todo = [s for s in self.slices if slice_ids is None or s['id'] in slice_ids]
+        self.out_dir = out_dir
+        self.final_dir = os.path.join(out_dir, "final_models")
+        self.workers = workers
+        self.eager = eager
+        self.settings = {'bridge': bridge, 'max_episodes': max_episodes, 'report_every': report_every,
+                         'level_seed': level_seed, 'seed': seed}
+
+        self.ctx = mp.get_context("spawn")
+        self.events = self.ctx.Queue()
+        self.running = {}   # sid -> (process, slot, per-worker stop event)
+        self.status = {}    # sid -> latest progress dict
+        self.promoted = {}  # sid -> final model path
+        self.given_up = set()
+
+        os.makedirs(self.final_dir, exist_ok=True)
+        for s in self.slices:
+            path = self.expert_path(s['id'])
+            if os.path.exists(path):
+                self.promoted[s['id']] = path
+
+    def expert_path(self, sid):
+        return os.path.join(self.final_dir, f"slice_{sid:02d}_model.pth")
+
+    def slice_dir(self, sid):
+        return os.path.join(self.out_dir, f"slice_{sid:02d}")
+
+    # SCHEDULING
+    def _init_weights(self, s):
+        """(ready, init path): warm start from the previous same-mode expert."""
+        prev = previous_same_mode(self.slices, s)
+        if prev is None:
+            return True, None
+        if prev['id'] in self.promoted:
+            return True, self.promoted[prev['id']]
+        if not self.eager or prev['id'] in self.given_up:
+            return False, None
+        # newest same-mode weights available right now
+        p = prev
+        while p is not None:
+            if p['id'] in self.promoted:
+                return True, self.promoted[p['id']]
+            current = os.path.join(self.slice_dir(p['id']), "current.pth")
+            if os.path.exists(current):
+                return True, current
+            p = previous_same_mode(self.slices, p)
+        return True, None
+
+    def _free_slot(self):
+        used = {slot for _, slot, _ in self.running.values()}
+        return next(i for i in range(self.workers) if i not in used)
+
+    def _schedule(self):
+        for s in self.todo:
+            if len(self.running) >= self.workers:
+                return
+            sid = s['id']
+            if sid in self.promoted or sid in self.running or sid in self.given_up:
+                continue
+            ready, init = self._init_weights(s)
+            if not ready:
+                continue
+            slot = self._free_slot()
+            stop = self.ctx.Event()
+            proc = self.ctx.Process(target=train_slice, name=f"slice_{sid:02d}",
+                                    args=(slot, s, init, self.slice_dir(sid), self.events, stop, self.settings))
+            proc.start()
+            self.running[sid] = (proc, slot, stop)
+            self.status[sid] = {'episode': 0, 'win_rate': 0.0, 'percent': s['start'], 'frames': 0}
+            src = os.path.relpath(init, self.out_dir) if init else "fresh"
+            print(f"[Parallel] Slice {sid} → worker {slot} ({src})")
+
+    # EVENTS
+    def _handle(self, event):
+        kind, sid = event[0], event[1]
+        if kind == "progress":
+            _, _, episode, win_rate, percent, frames = event
+            self.status[sid] = {'episode': episode, 'win_rate': win_rate, 'percent': percent, 'frames': frames}
+            return
+        proc, _, _ = self.running.pop(sid)
+        proc.join()
+        if kind == "promoted":
+            _, _, path, episode, frames, wall = event
+            shutil.copyfile(path, self.expert_path(sid))
+            self.promoted[sid] = self.expert_path(sid)
+            print(f"[Parallel] Expert {sid} promoted after {episode} episodes / {frames:,} frames ({wall / 60:.1f} min)")
+        elif kind == "stopped":
+            print(f"[Parallel] Slice {sid} stopped, progress saved")
+        else:
+            self.given_up.add(sid)
+            reason = "episode budget spent" if kind == "budget" else event[2]
+            print(f"[Parallel] Slice {sid} not promoted: {reason}")
+
+    def _reap_dead(self):
+        for sid, (proc, _, _) in list(self.running.items()):
+            if not proc.is_alive() and proc.exitcode not in (0, None):
+                self.running.pop(sid)
+                self.given_up.add(sid)
+                print(f"[Parallel] Slice {sid} worker died (exit code {proc.exitcode})")
+
+    def progress_line(self):
+        parts = [f"S{sid} ep {st['episode']} win {st['win_rate'] * 100:.0f}% @{st['percent']:.1f}%"
+                 for sid, st in sorted(self.status.items()) if sid in self.running]
+        done = sum(s['id'] in self.promoted for s in self.todo)
+        return " | ".join([f"[Parallel] {done}/{len(self.todo)} promoted"] + parts)
+
+    def run(self, log_every=30.0):
+        t0 = time.perf_counter()
+        last_log = t0
+        try:
+            while True:
+                self._schedule()
+                if not self.running:
+                    break
+                try:
+                    self._handle(self.events.get(timeout=1.0))
+                except queue.Empty:
+                    self._reap_dead()
+                if time.perf_counter() - last_log >= log_every:
+                    print(self.progress_line())
+                    last_log = time.perf_counter()
+        except KeyboardInterrupt:
+            print("\n[Parallel] Stopping workers...")
+            for _, _, stop in self.running.values():
+                stop.set()
+            while self.running:
+                try:
+                    self._handle(self.events.get(timeout=5.0))
+                except queue.Empty:
+                    self._reap_dead()
+
+        blocked = [s['id'] for s in self.todo if s['id'] not in self.promoted]
+        print(f"[Parallel] Done in {(time.perf_counter() - t0) / 60:.1f} min | "
+              f"promoted {sorted(self.promoted)} | not promoted {blocked}")
+        return self.promoted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent per-slice expert training")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1))
+    parser.add_argument("--bridge", choices=("sim", "shm"), default="sim")
+    parser.add_argument("--eager", action="store_true",
+                        help="start waiting slices from the newest same-mode weights instead of idling")
+    parser.add_argument("--slices", type=int, nargs="*", help="slice ids (default: all)")
+    parser.add_argument("--max-episodes", type=int, default=5000, help="per slice")
+    parser.add_argument("--level-seed", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=os.path.join(CHECKPOINT_DIR, "parallel"))
+    args = parser.parse_args()
+
+    ParallelCurriculum(args.out, args.workers, args.bridge, args.eager, args.max_episodes,
+                       level_seed=args.level_seed, seed=args.seed, slice_ids=args.slices).run()
+
+
+if __name__ == "__main__":
+    main()
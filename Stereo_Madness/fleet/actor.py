@@ -0,0 +1,258 @@
+"""
+Fleet actor: plays on its own game instance and streams transitions to the
+learner (fleet/learner.py) over TCP.
+
+FleetClient runs the connection on a background asyncio thread, so the act
+loop never waits on the network:
+  - transitions are batched (FLEET_BATCH_SIZE) and compressed on push()
+  - at most FLEET_WINDOW batches are in flight unacknowledged; the learner
+    acks a batch once it is queued for training, so a lagging learner stops
+    the flow, and the actor then keeps at most FLEET_MAX_OUTBOX batches
+    (oldest dropped, counted in the stats)
+  - a dropped connection is retried with backoff; unacknowledged batches are
+    resent (the learner ignores sequence numbers it has already seen)
+  - weights pushed by the learner are picked up between steps
+
+Exploration is fixed per actor: actor i of N uses
+FLEET_EPSILON ** (1 + 7 i / (N - 1)), spreading the fleet from exploratory to
+nearly greedy.
+
+Usage (from Stereo_Madness/):
+    python -m fleet.actor --host 192.168.1.20 --actor-id 1 --bridge memory
+"""
+import argparse
+import asyncio
+import collections
+import json
+import os
+import threading
+import time
+import numpy as np
+import torch
+
+from config import *
+from core.environment import GeometryDashEnv
+from core.sim_game import SimBridge, SimulatedGame, SimulatedLevel
+from agents.ddqn import make_agent
+from fleet.protocol import (MSG_ACK, MSG_BATCH, MSG_HELLO, MSG_WEIGHTS, decode_weights, encode_batch,
+                            encode_json, pack_message, read_message, split_meta)
+
+
+def actor_epsilon(actor_id, num_actors, base=FLEET_EPSILON, alpha=7.0):
+    return base ** (1.0 + alpha * actor_id / max(1, num_actors - 1))
+
+
+class FleetClient:
+    def __init__(self, host, port, actor_id, batch_size=FLEET_BATCH_SIZE, window=FLEET_WINDOW,
+                 max_outbox=FLEET_MAX_OUTBOX, codec=FLEET_CODEC):
+        self.host, self.port = host, port
+        self.actor_id = actor_id
+        self.batch_size = batch_size
+        self.window = window
+        self.max_outbox = max_outbox
+        self.codec = codec
+
+        self._rows = []               # transitions of the batch being filled
+        self._episodes = []           # (percent, return) finished since the last batch
+        self._seq = 0
+        # batch seqs restart with the process: the learner resets its duplicate filter per session
+        self.session = os.urandom(8).hex()
+        self.outbox = collections.deque()
+        self.unacked = {}             # seq -> payload, resent after a reconnect
+        self._weights = None          # newest WEIGHTS payload not yet applied
+        self.version = 0              # weights version in use
+
+        self.sent = self.dropped = self.connects = 0
+        self.raw_bytes = self.wire_bytes = 0
+
+        self._closing = False
+        self._loop = asyncio.new_event_loop()
+        self._wake = asyncio.Event()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="fleet-client", daemon=True)
+        self._thread.start()
+        self._task = asyncio.run_coroutine_threadsafe(self._run(), self._loop)
+
+    # ACT LOOP SIDE
+    def push(self, obs, action, reward, next_obs, done):
+        self._rows.append((np.array(obs, dtype=np.float32), action, reward,
+                           np.array(next_obs, dtype=np.float32), done))
+        if len(self._rows) >= self.batch_size:
+            self.flush()
+
+    def end_episode(self, percent, total_reward):
+        self._episodes.append((round(float(percent), 2), round(float(total_reward), 3)))
+
+    def flush(self):
+        if not self._rows:
+            return
+        obs, actions, rewards, next_obs, dones = map(np.asarray, zip(*self._rows))
+        self._rows = []
+        self._seq += 1
+        stats = {"episodes": self._episodes, "dropped": self.dropped,
+                 "reconnects": max(0, self.connects - 1), "version": self.version}
+        self._episodes = []
+        payload, raw = encode_batch(self._seq, obs, actions, rewards, next_obs, dones, self.codec, stats)
+        self.raw_bytes += raw
+        self.wire_bytes += len(payload)
+        self.outbox.append((self._seq, payload))
+        while len(self.outbox) > self.max_outbox:
+            self.outbox.popleft()
+            self.dropped += 1
+        self._loop.call_soon_threadsafe(self._wake.set)
+
+    def latest_weights(self):
+        """(version, state_dict) pushed since the last call, else None."""
+        payload, self._weights = self._weights, None
+        if payload is None:
+            return None
+        version, arrays = decode_weights(payload)
+        self.version = version
+        return version, {k: torch.from_numpy(v) for k, v in arrays.items()}
+
+    def close(self, timeout=10.0):
+        """Send what is left (up to `timeout` s), then stop the connection thread."""
+        self.flush()
+        deadline = time.perf_counter() + timeout
+        while (self.outbox or self.unacked) and time.perf_counter() < deadline:
+            time.sleep(0.05)
+        self._closing = True
+        self._loop.call_soon_threadsafe(self._wake.set)
+        try:
+            self._task.result(timeout=10.0)
+        except Exception:
+            pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5.0)
+        if not self._thread.is_alive():
+            self._loop.close()
+
+    # CONNECTION THREAD
+    async def _recv(self, reader):
+        try:
+            while True:
+                kind, payload = await read_message(reader)
+                if kind == MSG_ACK:
+                    self.unacked.pop(split_meta(payload)[0]['seq'], None)
+                elif kind == MSG_WEIGHTS:
+                    self._weights = payload
+                self._wake.set()
+        except (asyncio.IncompleteReadError, ConnectionError, OSError):
+            self._wake.set()
+
+    async def _run(self):
+        backoff = 0.5
+        while not self._closing:
+            try:
+                reader, writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), 5.0)
+            except (OSError, asyncio.TimeoutError):
+                # close() cuts the wait short
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), backoff)
+                except asyncio.TimeoutError:
+                    pass
+                backoff = min(2 * backoff, 10.0)
+                continue
+            backoff = 0.5
+            self.connects += 1
+            if self.connects > 1:
+                print(f"[Fleet] Actor {self.actor_id} reconnected ({len(self.unacked)} batches to resend)")
+            # in-flight batches of the dead connection go first
+            for seq in sorted(self.unacked, reverse=True):
+                self.outbox.appendleft((seq, self.unacked.pop(seq)))
+
+            recv = asyncio.ensure_future(self._recv(reader))
+            try:
+                writer.write(pack_message(MSG_HELLO, encode_json({"actor_id": self.actor_id,
+                                                                  "version": self.version,
+                                                                  "session": self.session})))
+                while not self._closing and not recv.done():
+                    while self.outbox and len(self.unacked) < self.window:
+                        seq, payload = self.outbox.popleft()
+                        self.unacked[seq] = payload
+                        writer.write(pack_message(MSG_BATCH, payload))
+                        self.sent += 1
+                    await writer.drain()
+                    self._wake.clear()
+                    try:
+                        await asyncio.wait_for(self._wake.wait(), 0.5)
+                    except asyncio.TimeoutError:
+                        pass
+            except (ConnectionError, OSError):
+                pass
+            finally:
+                recv.cancel()
+                writer.close()
+
+
+def _open_env(bridge_kind, level_seed, start_percent):
+    if bridge_kind == "sim":
+        bridge = SimBridge(SimulatedGame(SimulatedLevel(seed=level_seed)))
+        bridge.send_checkpoint(start_percent)
+    else:
+        from core.memory_bridge import MemoryBridge
+        bridge = MemoryBridge()
+    return GeometryDashEnv(bridge=bridge, frame_skip=FRAME_SKIP, action_repeats=ACTION_REPEATS,
+                           frame_gamma=FRAME_GAMMA if ACTION_REPEATS else 1.0)
+
+
+def run_actor(actor_id, num_actors, host, port, bridge_kind="sim", slice_id=1, level_seed=0,
+              stop=None, log_every=30.0):
+    """Act loop of one fleet actor; runs until `stop` is set or Ctrl+C."""
+    torch.set_num_threads(1)
+    with open(CURRICULUM_FILE, 'r') as f:
+        current_slice = next(s for s in json.load(f) if s['id'] == slice_id)
+    env = _open_env(bridge_kind, level_seed + actor_id, current_slice['start'])
+    env.set_slice(current_slice)
+    eps = actor_epsilon(actor_id, num_actors)
+    agent = make_agent(INPUT_DIM, NUM_ACTIONS, make_agent_config(device="cpu", epsilon_start=eps, epsilon_end=eps),
+                  CHECKPOINT_DIR)
+    client = FleetClient(host, port, actor_id)
+    print(f"[Fleet] Actor {actor_id} → {host}:{port} | Slice {slice_id} | epsilon {eps:.3f}")
+
+    steps, t0, last_log = 0, time.perf_counter(), time.perf_counter()
+    try:
+        while stop is None or not stop.is_set():
+            obs, info = env.reset()
+            total = 0.0
+            while True:
+                weights = client.latest_weights()
+                if weights is not None:
+                    agent.online_net.load_state_dict(weights[1])
+                action = agent.select_action(obs, is_training=True)
+                next_obs, reward, terminated, _, info = env.step(action)
+                client.push(obs, action, reward, next_obs, float(terminated))
+                obs = next_obs
+                total += reward
+                steps += 1
+                if terminated or info['percent'] >= current_slice['end']:
+                    break
+            client.end_episode(info['percent'], total)
+
+            if time.perf_counter() - last_log >= log_every:
+                last_log = time.perf_counter()
+                ratio = client.raw_bytes / max(1, client.wire_bytes)
+                print(f"[Fleet] Actor {actor_id} | {steps / (last_log - t0):,.0f} steps/s | "
+                      f"weights v{client.version} | sent {client.sent} | in flight {len(client.unacked)} | "
+                      f"queued {len(client.outbox)} | dropped {client.dropped} | compression {ratio:.1f}x")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        client.close()
+        env.bridge.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fleet actor streaming transitions to a learner")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=FLEET_PORT)
+    parser.add_argument("--actor-id", type=int, default=0)
+    parser.add_argument("--num-actors", type=int, default=1, help="fleet size (sets this actor's epsilon)")
+    parser.add_argument("--bridge", choices=("sim", "memory"), default="memory")
+    parser.add_argument("--slice", type=int, default=1)
+    args = parser.parse_args()
+    run_actor(args.actor_id, args.num_actors, args.host, args.port, args.bridge, args.slice)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""
+Fleet learner: one replay buffer and one Agent fed by actors on other
+machines (fleet/actor.py) over TCP.
+
+An asyncio server takes batches from every actor connection and queues them
+for the training coroutine (at most FLEET_MAX_PENDING batches). A batch is
+acknowledged only once it is queued, so when training falls behind the acks
+stall and the actors' send windows fill: backpressure reaches the actors
+instead of growing memory here. The trainer runs FLEET_REPLAY_RATIO updates
+per received transition and pushes versioned weights to every connected actor
+each FLEET_PUBLISH_EVERY updates (skipping actors whose socket is still busy
+with the previous push).
+
+--local-actors N also spawns N actor processes on localhost against the
+simulated level, for testing without game machines.
+
+Usage (from Stereo_Madness/):
+    python -m fleet.learner --local-actors 3 --duration 300
+    python -m fleet.learner --host 0.0.0.0 --port 5555        # remote actors connect here
+"""
+import argparse
+import asyncio
+import multiprocessing as mp
+import time
+import torch
+
+from config import *
+from agents.ddqn import make_agent
+from agents.replay_buffer import ReplayBuffer
+from fleet.actor import run_actor
+from fleet.protocol import (MSG_ACK, MSG_BATCH, MSG_HELLO, MSG_WEIGHTS, decode_batch, encode_json,
+                            encode_weights, pack_message, read_message, split_meta)
+
+# weights are not pushed to an actor with more than this still unsent
+WEIGHTS_BACKLOG_BYTES = 4 << 20
+
+
+class FleetLearner:
+    def __init__(self, agent, memory, host=FLEET_HOST, port=FLEET_PORT, max_pending=FLEET_MAX_PENDING,
+                 replay_ratio=FLEET_REPLAY_RATIO, publish_every=FLEET_PUBLISH_EVERY, save_every=5000):
+        self.agent = agent
+        self.memory = memory
+        self.host, self.port = host, port
+        self.max_pending = max_pending
+        self.replay_ratio = replay_ratio
+        self.publish_every = publish_every
+        self.save_every = save_every
+
+        self.writers = {}       # actor_id -> StreamWriter
+        self.actors = {}        # actor_id -> stats dict
+        self.version = 0
+        self._weights = None    # encoded WEIGHTS payload of self.version
+        self.updates = 0
+        self.transitions = 0
+        self._credit = 0.0
+
+    def _stats(self, actor_id):
+        if actor_id not in self.actors:
+            self.actors[actor_id] = {'transitions': 0, 'batches': 0, 'duplicates': 0, 'wire_bytes': 0,
+                                     'raw_bytes': 0, 'connects': 0, 'dropped': 0, 'reconnects': 0,
+                                     'version': 0, 'episodes': 0, 'percents': [],
+                                     'window_t': time.perf_counter(), 'window_n': 0, 'rate': 0.0,
+                                     'last_seq': 0, 'session': None, 'weights_skipped': 0}
+        return self.actors[actor_id]
+
+    # CONNECTIONS
+    async def _handle(self, reader, writer):
+        actor_id = None
+        try:
+            kind, payload = await read_message(reader)
+            if kind != MSG_HELLO:
+                return
+            hello = split_meta(payload)[0]
+            actor_id = hello['actor_id']
+            st = self._stats(actor_id)
+            st['connects'] += 1
+            if hello.get('session') != st['session']:
+                # a restarted actor process numbers its batches from 1 again
+                st['session'] = hello.get('session')
+                st['last_seq'] = 0
+            self.writers[actor_id] = writer
+            print(f"[Fleet] Actor {actor_id} connected from {writer.get_extra_info('peername')}")
+            if self._weights is not None and hello.get('version', 0) < self.version:
+                writer.write(pack_message(MSG_WEIGHTS, self._weights))
+
+            while True:
+                kind, payload = await read_message(reader)
+                if kind != MSG_BATCH:
+                    continue
+                meta, obs, actions, rewards, next_obs, dones = decode_batch(payload)
+                st['wire_bytes'] += len(payload)
+                st['raw_bytes'] += 2 * obs.nbytes + len(obs) * 7
+                if meta['seq'] <= st['last_seq']:
+                    st['duplicates'] += 1    # resent after a reconnect, already queued
+                else:
+                    # blocks while the learner is behind: no ack, the actor's window fills
+                    await self.queue.put((actor_id, obs, actions, rewards, next_obs, dones))
+                    st['last_seq'] = meta['seq']
+                    self._account(st, meta, len(obs))
+                writer.write(pack_message(MSG_ACK, encode_json({"seq": meta['seq']})))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, OSError, asyncio.CancelledError):
+            pass  # cancelled: the learner is shutting down
+        finally:
+            if actor_id is not None and self.writers.get(actor_id) is writer:
+                del self.writers[actor_id]
+                print(f"[Fleet] Actor {actor_id} disconnected")
+            writer.close()
+
+    def _account(self, st, meta, n):
+        st['batches'] += 1
+        st['transitions'] += n
+        st['window_n'] += n
+        s = meta['stats']
+        st['dropped'], st['reconnects'], st['version'] = s['dropped'], s['reconnects'], s['version']
+        st['episodes'] += len(s['episodes'])
+        st['percents'] = (st['percents'] + [p for p, _ in s['episodes']])[-50:]
+
+    # TRAINING
+    async def _train(self):
+        while True:
+            actor_id, obs, actions, rewards, next_obs, dones = await self.queue.get()
+            for i in range(len(obs)):
+                self.memory.push(obs[i], int(actions[i]), float(rewards[i]), next_obs[i], float(dones[i]))
+            self.transitions += len(obs)
+            self._credit += self.replay_ratio * len(obs)
+            while self._credit >= 1.0:
+                self._credit -= 1.0
+                # no select_action here: advance the step count learn() keys the target sync on
+                self.agent.steps_done += 1
+                if self.agent.learn(self.memory) is not None:
+                    self.updates += 1
+                    if self.updates % self.publish_every == 0:
+                        self.publish()
+                    if self.updates % self.save_every == 0:
+                        self.agent.save(filename="fleet_current.pth")
+                # let the connections read and ack between updates
+                await asyncio.sleep(0)
+
+    def publish(self):
+        self.version += 1
+        self._weights = encode_weights(self.version, self.agent.online_net.state_dict())
+        message = pack_message(MSG_WEIGHTS, self._weights)
+        for actor_id, writer in list(self.writers.items()):
+            if writer.transport.get_write_buffer_size() > WEIGHTS_BACKLOG_BYTES:
+                self.actors[actor_id]['weights_skipped'] += 1
+                continue
+            writer.write(message)
+
+    # REPORTING
+    def report(self):
+        now = time.perf_counter()
+        lines = [f"[Fleet] Learner | {self.transitions:,} transitions | {self.updates:,} updates | "
+                 f"weights v{self.version} | pending {self.queue.qsize()}/{self.max_pending} | "
+                 f"replay {len(self.memory):,}"]
+        for actor_id, st in sorted(self.actors.items()):
+            st['rate'] = st['window_n'] / max(1e-9, now - st['window_t'])
+            st['window_t'], st['window_n'] = now, 0
+            mean_pct = sum(st['percents']) / len(st['percents']) if st['percents'] else 0.0
+            state = "up" if actor_id in self.writers else "down"
+            lines.append(f"   actor {actor_id} ({state}) | {st['rate']:7,.0f} tr/s | {st['transitions']:,} tr | "
+                         f"{st['episodes']} ep, mean {mean_pct:.1f}% | weights v{st['version']} | "
+                         f"compression {st['raw_bytes'] / max(1, st['wire_bytes']):.1f}x | "
+                         f"dropped {st['dropped']} | reconnects {st['reconnects']} | resent {st['duplicates']}")
+        return "\n".join(lines)
+
+    async def serve(self, duration=None, log_every=30.0):
+        self.queue = asyncio.Queue(maxsize=self.max_pending)
+        server = await asyncio.start_server(self._handle, self.host, self.port)
+        print(f"[Fleet] Learner listening on {self.host}:{self.port}")
+        trainer = asyncio.ensure_future(self._train())
+        t0 = time.perf_counter()
+        try:
+            while duration is None or time.perf_counter() - t0 < duration:
+                left = log_every if duration is None else duration - (time.perf_counter() - t0)
+                await asyncio.sleep(min(log_every, left))
+                if trainer.done():
+                    trainer.result()   # surface a training error
+                print(self.report())
+        finally:
+            trainer.cancel()
+            server.close()
+            for writer in self.writers.values():
+                writer.close()
+            self.agent.save(filename="fleet_current.pth")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Central learner for a fleet of actors")
+    parser.add_argument("--host", default=FLEET_HOST)
+    parser.add_argument("--port", type=int, default=FLEET_PORT)
+    parser.add_argument("--local-actors", type=int, default=0, help="spawn this many sim actors on localhost")
+    parser.add_argument("--slice", type=int, default=1)
+    parser.add_argument("--duration", type=float, default=None, help="seconds (default: until Ctrl+C)")
+    parser.add_argument("--log-every", type=float, default=30.0)
+    args = parser.parse_args()
+
+    torch.set_num_threads(1)
+    agent = make_agent(INPUT_DIM, NUM_ACTIONS, make_agent_config(), CHECKPOINT_DIR)
+    learner = FleetLearner(agent, ReplayBuffer(MEMORY_SIZE), args.host, args.port)
+
+    ctx = mp.get_context("spawn")
+    stop = ctx.Event()
+    actors = [ctx.Process(target=run_actor, name=f"actor_{i}",
+                          args=(i, args.local_actors, "127.0.0.1", args.port, "sim", args.slice, 0, stop,
+                                args.log_every))
+              for i in range(args.local_actors)]
+    for p in actors:
+        p.start()
+    try:
+        asyncio.run(learner.serve(args.duration, args.log_every))
+    except KeyboardInterrupt:
+        print("\n[Fleet] Stopping...")
+    finally:
+        stop.set()
+        for p in actors:
+            p.join(timeout=30)
+            if p.is_alive():
+                p.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import io
+import json
+import struct
+import zlib
+import numpy as np
+
+from config import INPUT_DIM
+from core.obs_codec import make_codec
+
+# Actor <-> learner wire format. Every message is a 5-byte frame header
+# (kind, payload length) followed by the payload:
+#
+#   HELLO    actor -> learner   json {actor_id, version, session}; session is new per actor process
+#   BATCH    actor -> learner   json meta + zlib(arrays), see encode_batch
+#   ACK      learner -> actor   json {seq}; sent once the batch is queued for the learner
+#   WEIGHTS  learner -> actor   json {version} + zlib(np.savez of the state_dict)
+#
+# Observations within a batch are sent once: next_obs[i] is only sent when it
+# is not obs[i + 1] (episode ends and the last transition).
+
+MSG_HELLO, MSG_BATCH, MSG_ACK, MSG_WEIGHTS = 1, 2, 3, 4
+FRAME = struct.Struct("<BI")
+_META_LEN = struct.Struct("<I")
+COMPRESS_LEVEL = 1
+
+
+def pack_message(kind, payload):
+    return FRAME.pack(kind, len(payload)) + payload
+
+
+async def read_message(reader):
+    kind, size = FRAME.unpack(await reader.readexactly(FRAME.size))
+    return kind, await reader.readexactly(size)
+
+
+def _with_meta(meta, blob=b""):
+    head = json.dumps(meta).encode()
+    return _META_LEN.pack(len(head)) + head + blob
+
+
+def split_meta(payload):
+    (n,) = _META_LEN.unpack_from(payload)
+    end = _META_LEN.size + n
+    return json.loads(payload[_META_LEN.size:end]), payload[end:]
+
+
+def encode_json(meta):
+    return _with_meta(meta)
+
+
+def _encode_frames(codec, obs):
+    rows = obs.reshape(-1, INPUT_DIM)
+    storage = codec.alloc(len(rows))
+    for r, frame in enumerate(rows):
+        codec.write(storage, r, frame)
+    return [a.tobytes() for a in storage]
+
+
+def encode_batch(seq, obs, actions, rewards, next_obs, dones, codec_name="float32", stats=None):
+    """One compressed BATCH payload; returns (payload, raw float32 bytes it stands for)."""
+    n, dim = obs.shape
+    # rows whose next observation is not the following row's observation
+    linked = np.zeros(n, dtype=bool)
+    linked[:-1] = (dones[:-1] == 0) & np.all(next_obs[:-1] == obs[1:], axis=1)
+    extra = np.flatnonzero(~linked)
+
+    codec = make_codec(codec_name)
+    parts = _encode_frames(codec, np.concatenate([obs, next_obs[extra]]))
+    parts += [np.packbits(linked).tobytes(), actions.astype(np.int16).tobytes(),
+              rewards.astype(np.float32).tobytes(), np.packbits(dones.astype(bool)).tobytes()]
+    meta = {"seq": seq, "n": n, "dim": dim, "extra": len(extra), "codec": codec_name,
+            "sizes": [len(p) for p in parts], "stats": stats or {}}
+    payload = _with_meta(meta, zlib.compress(b"".join(parts), COMPRESS_LEVEL))
+    return payload, 2 * obs.nbytes + n * 7
+
+
+def decode_batch(payload):
+    """(meta, obs, actions, rewards, next_obs, dones) of a BATCH payload."""
+    meta, blob = split_meta(payload)
+    raw = zlib.decompress(blob)
+    parts, off = [], 0
+    for size in meta['sizes']:
+        parts.append(raw[off:off + size])
+        off += size
+    n, dim, extra = meta['n'], meta['dim'], meta['extra']
+    codec = make_codec(meta['codec'])
+    frames = (n + extra) * (dim // INPUT_DIM)
+    storage = codec.alloc(0)
+    storage = tuple(np.frombuffer(p, dtype=a.dtype).reshape((frames,) + a.shape[1:])
+                    for p, a in zip(parts, storage))
+    decoded = codec.read(storage, np.arange(frames)).reshape(n + extra, dim)
+
+    obs = decoded[:n]
+    linked = np.unpackbits(np.frombuffer(parts[-4], dtype=np.uint8), count=n).astype(bool)
+    next_obs = np.empty_like(obs)
+    next_obs[:-1] = obs[1:]
+    next_obs[~linked] = decoded[n:]
+    actions = np.frombuffer(parts[-3], dtype=np.int16).astype(np.int64)
+    rewards = np.frombuffer(parts[-2], dtype=np.float32)
+    dones = np.unpackbits(np.frombuffer(parts[-1], dtype=np.uint8), count=n).astype(np.float32)
+    return meta, obs, actions, rewards, next_obs, dones
+
+
+def encode_weights(version, state_dict):
+    buf = io.BytesIO()
+    np.savez(buf, **{k: v.detach().cpu().numpy() for k, v in state_dict.items()})
+    return _with_meta({"version": version}, zlib.compress(buf.getvalue(), COMPRESS_LEVEL))
+
+
+def decode_weights(payload):
+    """(version, {name: ndarray})"""
+    meta, blob = split_meta(payload)
+    with np.load(io.BytesIO(zlib.decompress(blob))) as arrays:
+        return meta['version'], {k: arrays[k] for k in arrays.files}
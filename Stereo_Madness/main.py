@@ -2,21 +2,54 @@ import torch
 import keyboard
 import time
 import os
+import pickle
 
 # MY MODULES IMPORTS
 from config import *
+from core import telemetry
 from core.environment import GeometryDashEnv
-from agents.ddqn import Agent
-from agents.replay_buffer import ReplayBuffer
+from core.memory_bridge import MemoryBridge
+from core.bridge_log import RecordingBridge
+from core.watchdog import BridgeWatchdog, BridgeLost
+from core.level_map import LevelMap, describe
+from agents.ddqn import make_agent
+from agents.replay_buffer import ReplayBuffer, FrameReplayBuffer, TaggedReplayBuffer
+from agents.world_model import ModelBasedReplay
+from agents.novelty import NoveltyBonus
 from curriculum.manager import CurriculumManager
+from curriculum.evaluator import BackgroundEvaluator, evaluate_policy, format_result
+from curriculum.discovery import log_episode
+from offline.trajectory_store import TrajectoryWriter
+from offline.dataset import TransitionDatasetWriter
 
 
 class GDAgentOrchestrator:
     def __init__(self):
+        # TELEMETRY
+        self.profiler = None
+        if TELEMETRY:
+            telemetry.enable()
+            if TELEMETRY_PORT:
+                telemetry.serve(TELEMETRY_PORT)
+            self.profiler = telemetry.ProfileCapture(PROFILE_DIR, PROFILE_STEPS, PROFILE_KIND)
+            self.profiler.install()
+
         # ENV
-        self.env = GeometryDashEnv()
-        self.env.frame_skip = 4
+        bridge = BridgeWatchdog(MemoryBridge) if BRIDGE_WATCHDOG else None
+        if RECORD_BRIDGE_LOG:
+            bridge = RecordingBridge(bridge or MemoryBridge(), BRIDGE_LOG_FILE)
+        self.env = GeometryDashEnv(bridge=bridge, action_repeats=ACTION_REPEATS,
+                                   frame_gamma=FRAME_GAMMA if ACTION_REPEATS else 1.0)
+        self.env.frame_skip = FRAME_SKIP
         self.env.frame_stack = 2
+        self.env.max_episode_steps = EPISODE_MAX_STEPS
+        self.env.max_episode_seconds = EPISODE_MAX_SECONDS
+        self.reconnects_seen = 0
+        if RECORD_TRAJECTORIES:
+            self.env.recorder = TrajectoryWriter(TRAJECTORY_DIR)
+        if LEVEL_MAP:
+            self.env.level_map = LevelMap.load(LEVEL_MAP_FILE) if os.path.exists(LEVEL_MAP_FILE) else LevelMap()
+            print(self.env.level_map.summary())
 
         # CURRICULUM
         self.manager = CurriculumManager()
@@ -24,20 +57,37 @@ class GDAgentOrchestrator:
         self.env.set_slice(self.current_slice)
 
         # MEMORY
-        self.memory = ReplayBuffer(MEMORY_SIZE)
+        if MULTI_HEAD and REPLAY_MODE != "tagged":
+            # a head fine-tuned on a new slice must keep rehearsing the earlier slices of its mode
+            raise ValueError('[System] MULTI_HEAD needs REPLAY_MODE = "tagged"')
+        self.dataset = None
+        if RECORD_DATASET:
+            self.dataset = TransitionDatasetWriter(DATASET_DIR, self.env.observation_space.shape[0])
+        if REPLAY_MODE == "frames":
+            depth = self.env.observation_space.shape[0] // INPUT_DIM
+            self.memory = FrameReplayBuffer(MEMORY_SIZE, INPUT_DIM, depth, codec=REPLAY_CODEC,
+                                            num_actions=NUM_ACTIONS)
+            # the frame buffer copies what it keeps; the dataset writer and the world model's window do not
+            self.env.obs_view = self.dataset is None and not WORLD_MODEL
+        elif REPLAY_MODE == "tagged":
+            self.memory = TaggedReplayBuffer(MEMORY_SIZE, self.env.observation_space.shape[0],
+                                             current_fraction=REPLAY_CURRENT_FRACTION)
+            self.memory.focus(self.current_slice['id'], self.current_slice.get('mode', 0))
+        else:
+            self.memory = ReplayBuffer(MEMORY_SIZE)
 
         # AGENT
-        agent_config = {
-            'device': DEVICE,
-            'lr': LR,
-            'gamma': GAMMA,
-            'batch_size': BATCH_SIZE,
-            'target_update': TARGET_UPDATE,
-            'epsilon_start': EPSILON_START,
-            'epsilon_end': EPSILON_END,
-            'epsilon_decay': EPSILON_DECAY,
-        }
-        self.agent = Agent(INPUT_DIM, OUTPUT_DIM, agent_config, CHECKPOINT_DIR)
+        agent_config = make_agent_config()
+        self.agent = make_agent(INPUT_DIM, NUM_ACTIONS, agent_config, CHECKPOINT_DIR)
+        if WORLD_MODEL:
+            # learn() samples through the wrapper: real batches plus imagined rollouts
+            self.memory = ModelBasedReplay(self.memory, self.agent, self.env.observation_space.shape[0], NUM_ACTIONS)
+
+        # EVALUATION (side process, own env instance)
+        if EVAL_GATE_PROMOTION and EVAL_BRIDGE == "sim":
+            # the simulated level is random, not Stereo Madness: its win rate says nothing about the slice
+            raise ValueError('[System] EVAL_GATE_PROMOTION needs EVAL_BRIDGE = "memory"')
+        self.evaluator = BackgroundEvaluator() if EVAL_IN_BACKGROUND else None
 
         # EXPERTS
         self.final_models_dir = os.path.join(CHECKPOINT_DIR, "final_models")
@@ -45,6 +95,7 @@ class GDAgentOrchestrator:
 
         # RELAY
         self._bridge_to_training_zone()
+        self._resume_salvage()
         
     # CURRICULUM ACCESS (ROBUST)
     def _get_all_slices(self):
@@ -71,7 +122,7 @@ class GDAgentOrchestrator:
     # EXPERT LOADING
     def _load_experts_to_ram(self):
         cache = {}
-        if not os.path.exists(self.final_models_dir):
+        if MULTI_HEAD or not os.path.exists(self.final_models_dir):
             return cache
 
         print("\n[System] Loading All Expert Models into RAM...")
@@ -92,9 +143,13 @@ class GDAgentOrchestrator:
 
         if sid == 1:
             self._load_current_progress()
+            self._load_novelty()
             return
 
         target_pct = max(0.0, self.current_slice['start'] - 0.5)
+        if MULTI_HEAD:
+            # the relay plays the shared model; there are no experts to swap
+            self.agent.load(os.path.join(self.final_models_dir, MULTI_HEAD_MODEL))
 
         print("\n" + "═" * 60)
         print(f" RELAY RACE ACTIVE | TARGET: {target_pct:.1f}%")
@@ -106,8 +161,17 @@ class GDAgentOrchestrator:
 
         print("[Bridge] Checkpoint marked successfully.")
         self._load_current_progress()
+        self._load_novelty()
 
     def _run_relay_navigation(self, target_percent):
+        # the relay's frames are not training visits
+        novelty, self.env.novelty = self.env.novelty, None
+        try:
+            return self._relay_attempts(target_percent)
+        finally:
+            self.env.novelty = novelty
+
+    def _relay_attempts(self, target_percent):
         slice_list = self._get_all_slices()
 
         print("[Relay] Curriculum map:")
@@ -126,17 +190,18 @@ class GDAgentOrchestrator:
                 current_pos = float(info.get("percent", 0.0))
 
                 # EXPERT SWITCH (AFTER STEP)
+                # slices are ordered by start: split slices get new ids out of level order
                 correct_expert = None
                 for s in slice_list:
                     if s['start'] <= current_pos < s['end']:
-                        correct_expert = s['id']
+                        if s['start'] < self.current_slice['start']:
+                            correct_expert = s['id']
                         break
 
                 if (
                     correct_expert is not None
                     and correct_expert != active_expert
                     and correct_expert in self.experts_cache
-                    and correct_expert < self.current_slice['id']
                 ):
                     self.agent.online_net.load_state_dict(
                         self.experts_cache[correct_expert]
@@ -167,22 +232,26 @@ class GDAgentOrchestrator:
         sid = self.current_slice['id']
         path = os.path.join(CHECKPOINT_DIR, f"slice_{sid:02d}_current.pth")
 
-        # Resume existing checkpoint
-        if os.path.exists(path):
-            self.agent.load(path)
-            print(f"[System] Resumed Slice {sid}")
-            return
-
         # Get all slices
         all_slices = self._get_all_slices()
 
-        # Determine previous slice with SAME mode
+        # Determine previous slice with SAME mode (by start: split slices get new ids)
         prev_same_mode = None
         for s in reversed(all_slices):
-            if s["id"] < sid and s["mode"] == self.current_slice["mode"]:
+            if s["start"] < self.current_slice["start"] and s["mode"] == self.current_slice["mode"]:
                 prev_same_mode = s
                 break
 
+        if MULTI_HEAD:
+            self._load_multi_head_progress(path, prev_same_mode)
+            return
+
+        # Resume existing checkpoint
+        if os.path.exists(path):
+            self.agent.load(path)
+            print(f"[System] Resumed Slice {sid}")
+            return
+
         # Initialize network
         if prev_same_mode is None:
             print(
@@ -203,6 +272,30 @@ class GDAgentOrchestrator:
             )
             self.agent.epsilon = 0.5
 
+    def _load_multi_head_progress(self, path, prev_same_mode):
+        sid = self.current_slice['id']
+        head = self.current_slice['mode']
+        shared = os.path.join(self.final_models_dir, MULTI_HEAD_MODEL)
+        # once a slice is in the shared model the trunk stays fixed: retraining it on one
+        # slice's data would move the features every trained head relies on
+        self.agent.freeze_trunk(MULTI_HEAD_FREEZE_TRUNK and os.path.exists(shared))
+
+        if os.path.exists(path):
+            self.agent.load(path)
+            print(f"[System] Resumed Slice {sid}")
+            return
+
+        if os.path.exists(shared):
+            self.agent.load(shared)
+
+        if prev_same_mode is None:
+            print(f"[System] Slice {sid}: new mode {head} → fresh head {head}")
+            self.agent.reset_head(head)
+            self.agent.epsilon = 1.0
+        else:
+            print(f"[System] Slice {sid}: fine-tuning head {head} (learned on Slice {prev_same_mode['id']})")
+            self.agent.epsilon = 0.5
+
     # TRAINING LOOP
     def train(self):
         print(
@@ -213,31 +306,63 @@ class GDAgentOrchestrator:
         try:
             while True:
                 episode += 1
-                obs, _ = self.env.reset()
+                obs, info = self.env.reset()
+                if getattr(self.env.bridge, "reconnects", 0) > self.reconnects_seen:
+                    self._after_reconnect()
+                    obs, info = self.env.reset()
                 last_loss = 0.0
                 total_reward = 0.0  # Track total reward
 
                 while True:
                     action = self.agent.select_action(obs, is_training=True)
-                    next_obs, reward, terminated, _, info = self.env.step(action)
-
-                    self.memory.push(
-                        obs, action, reward, next_obs, float(terminated)
-                    )
+                    obs_info = info  # percent/mode of the state acted from
+                    next_obs, reward, terminated, truncated, info = self.env.step(action)
+                    if info.get("stalled"):
+                        break  # the game stopped: no transition, the next reset reconnects
+
+                    if REPLAY_MODE == "tagged":
+                        # the slice tag is the focused one (_focus_replay)
+                        self.memory.push(obs, action, reward, next_obs, float(terminated),
+                                         mode=obs_info['mode'], percent=obs_info['percent'])
+                    else:
+                        self.memory.push(
+                            obs, action, reward, next_obs, float(terminated)
+                        )
+                    if self.dataset is not None:
+                        self.dataset.add(
+                            obs, action, reward, terminated,
+                            obs_info['percent'], obs_info['mode'], self.current_slice['id']
+                        )
 
                     loss = self.agent.learn(self.memory)
                     if loss is not None:
                         last_loss = loss
+                    if WORLD_MODEL:
+                        self.memory.on_step()
 
                     obs = next_obs
                     total_reward += reward  # Accumulate reward
+                    if self.profiler is not None:
+                        self.profiler.tick()
 
-                    if terminated:
+                    if terminated or truncated:
                         break
 
-                win_rate = self.manager.update(
-                    info['percent'] >= self.current_slice['end'], 0
-                )
+                if hasattr(self.memory, "end_episode"):
+                    # FrameReplayBuffer: stalled and cut-short episodes end here too, not only on done
+                    self.memory.end_episode()
+                if self.dataset is not None:
+                    self.dataset.end_episode(obs, info['percent'], info['mode'])
+                if info.get("stalled"):
+                    print(f"Ep {episode:<4} | dropped at {info['percent']:.1f}%: bridge stalled | "
+                          f"{self.env.bridge.summary()}")
+                    continue
+
+                won = info['percent'] >= self.current_slice['end']
+                # episode/death log: progress histogram input of curriculum/discovery.py
+                log_episode(DEATH_LOG, episode, self.current_slice['id'], self.current_slice['start'],
+                            info['percent'], terminated and not won)
+                win_rate = self.manager.update(won, 0, percent=info['percent'])
 
                 # Print including total reward
                 print(
@@ -246,33 +371,192 @@ class GDAgentOrchestrator:
                     f"% {info['percent']:>5.1f} | "
                     f"Reward {total_reward:>7.2f} | "
                     f"Loss {last_loss:.4f}"
+                    + (f" | Hit {describe(info['death_cause'])}" if 'death_cause' in info else "")
+                    + (f" | Truncated ({info['truncated_by']})" if 'truncated_by' in info else "")
                 )
-
-                if self.manager.should_promote():
+                if TELEMETRY and episode % TELEMETRY_LOG_EVERY == 0:
+                    print(telemetry.summary_line())
+                if WORLD_MODEL and episode % 10 == 0:
+                    print(self.memory.summary())
+                if self.env.novelty is not None and episode % 10 == 0:
+                    print(self.env.novelty.summary())
+
+                if self.evaluator is not None:
+                    if episode % EVAL_EVERY_EPISODES == 0:
+                        self.evaluator.submit(self.agent.online_net.state_dict(), self.current_slice, f"ep {episode}")
+                    for result in self.evaluator.poll():
+                        print(format_result(result))
+                        self.manager.record_evaluation(result)
+
+                if self.manager.should_promote() and self._shared_model_holds():
                     self._save_expert_final()
+                    self._save_novelty()
 
                     if self.manager.advance_slice():
                         self.current_slice = self.manager.get_current_slice()
                         self.env.set_slice(self.current_slice)
+                        self._focus_replay()
                         self.experts_cache = self._load_experts_to_ram()
                         self._bridge_to_training_zone()
                     else:
                         break
+                elif self.manager.should_split() and self.manager.split_current_slice():
+                    # same start, nearer end: the game checkpoint and the weights carry over
+                    self.current_slice = self.manager.get_current_slice()
+                    self.env.set_slice(self.current_slice)
 
                 if episode % 50 == 0:
                     self.agent.save(
                         filename=f"slice_{self.current_slice['id']:02d}_current.pth"
                     )
+                    self._save_novelty()
+                    if self.env.level_map is not None:
+                        self.env.level_map.save(LEVEL_MAP_FILE)
 
         except KeyboardInterrupt:
             self.agent.save(
                 filename=f"slice_{self.current_slice['id']:02d}_current.pth"
             )
+            self._save_novelty()
+        except BridgeLost as e:
+            print(f"[Watchdog] Giving up: {e}")
+            self._salvage()
+        except Exception:
+            self._salvage()
+            raise
+        finally:
+            if self.evaluator is not None:
+                self.evaluator.close()
+            if self.env.recorder is not None:
+                self.env.recorder.close()
+            if self.dataset is not None:
+                self.dataset.close()
+            if RECORD_BRIDGE_LOG:
+                self.env.bridge.close()
+            if self.env.level_map is not None:
+                self.env.level_map.save(LEVEL_MAP_FILE)
+
+    # OUTAGE RECOVERY
+    def _after_reconnect(self):
+        """A restarted game lost its practice checkpoint: relay back to the slice, keep the weights in training."""
+        self.reconnects_seen = self.env.bridge.reconnects
+        if self.current_slice['id'] == 1:
+            return
+        # the relay loads expert weights into the online network
+        training = self.agent.training_state()
+        target_pct = max(0.0, self.current_slice['start'] - 0.5)
+        print(f"[Watchdog] Game restarted → relay to {target_pct:.1f}%")
+        if not self._run_relay_navigation(target_pct):
+            raise RuntimeError("[Bridge] FATAL: Relay failed after reconnect")
+        self.agent.load_training_state(training)
+
+    def _salvage(self):
+        """Abnormal exit: keep agent, optimizer and replay so the next start continues where this one stopped."""
+        os.makedirs(os.path.dirname(SALVAGE_FILE), exist_ok=True)
+        state = self.agent.training_state()
+        state['slice_id'] = self.current_slice['id']
+        torch.save(state, SALVAGE_FILE)
+        self._save_novelty()
+        replay = self.memory.memory if WORLD_MODEL else self.memory
+        tmp = SALVAGE_REPLAY_FILE + ".tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(replay, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, SALVAGE_REPLAY_FILE)
+        print(f"[System] Salvaged agent, optimizer and {len(replay):,} transitions to {SALVAGE_FILE}")
+
+    def _resume_salvage(self):
+        if not os.path.exists(SALVAGE_FILE):
+            return
+        state = torch.load(SALVAGE_FILE, map_location=DEVICE)
+        if state.get('slice_id') != self.current_slice['id']:
+            print(f"[System] Ignoring salvage of Slice {state.get('slice_id')} (now on Slice {self.current_slice['id']})")
+            return
+        self.agent.load_training_state(state)
+        if os.path.exists(SALVAGE_REPLAY_FILE):
+            with open(SALVAGE_REPLAY_FILE, "rb") as f:
+                replay = pickle.load(f)
+            if type(replay) is type(self.memory.memory if WORLD_MODEL else self.memory):
+                if WORLD_MODEL:
+                    self.memory.memory = replay
+                else:
+                    self.memory = replay
+            os.replace(SALVAGE_REPLAY_FILE, SALVAGE_REPLAY_FILE + ".resumed")
+        os.replace(SALVAGE_FILE, SALVAGE_FILE + ".resumed")
+        print(f"[System] Resumed salvaged Slice {self.current_slice['id']} state "
+              f"({len(self.memory):,} transitions, epsilon {self.agent.epsilon:.3f})")
+
+    # NOVELTY TABLES
+    def _novelty_path(self):
+        return os.path.join(CHECKPOINT_DIR, NOVELTY_FILE.format(self.current_slice['id']))
+
+    def _load_novelty(self):
+        """Visitation counts of the current slice: resumed from its checkpoint or a fresh table."""
+        if not NOVELTY:
+            return
+        path = self._novelty_path()
+        self.env.novelty = NoveltyBonus.load(path) if os.path.exists(path) else NoveltyBonus()
+        print(self.env.novelty.summary())
+
+    def _save_novelty(self):
+        if self.env.novelty is not None:
+            self.env.novelty.save(self._novelty_path())
+
+    # REPLAY TAGS
+    def _focus_replay(self):
+        """Tagged replay: new rows belong to the new slice, batches mix it with same-mode rehearsal."""
+        if REPLAY_MODE != "tagged":
+            return
+        replay = self.memory.memory if WORLD_MODEL else self.memory
+        mode = self.current_slice.get('mode', 0)
+        if REPLAY_EVICT_OTHER_MODE and replay.current_mode is not None and mode != replay.current_mode:
+            for s in self._get_all_slices():
+                if s['mode'] != mode:
+                    replay.evict_slice(s['id'])
+        replay.focus(self.current_slice['id'], mode)
+        print(replay.summary())
+
+    # MULTI-HEAD REGRESSION CHECK
+    def _shared_model_holds(self):
+        """
+        Greedy episodes of every earlier slice with the model about to replace the
+        shared one. Promotion waits while one of them is below EVAL_PROMOTE_WIN_RATE.
+        """
+        earlier = [s for s in self.manager.slices if s['start'] < self.current_slice['start']]
+        if not MULTI_HEAD or not earlier:
+            return True
+        if not hasattr(self.env.bridge, "send_checkpoint"):
+            print("[System] Shared model not checked on earlier slices: the bridge cannot place checkpoints "
+                  "(replay the level with play_stereo_madness.py)")
+            return True
+
+        lost = []
+        novelty, self.env.novelty = self.env.novelty, None
+        try:
+            for s in sorted(earlier, key=lambda s: s['start']):
+                result = evaluate_policy(self.env, self.agent, s, EVAL_EPISODES)
+                print(f"[System] Shared model on Slice {s['id']}: greedy Win% {result['win_rate'] * 100:5.1f}%")
+                if result['win_rate'] < EVAL_PROMOTE_WIN_RATE:
+                    lost.append(s['id'])
+        finally:
+            self.env.novelty = novelty
+            self.env.bridge.send_checkpoint(self.current_slice['start'])
+            self.env.set_slice(self.current_slice)
+
+        if lost:
+            print(f"[System] Slice {self.current_slice['id']} not promoted: the shared model lost Slice(s) {lost}")
+            self.manager.defer_promotion()
+            return False
+        return True
 
     # SAVE FINAL EXPERT
     def _save_expert_final(self):
         sid = self.current_slice['id']
         os.makedirs(self.final_models_dir, exist_ok=True)
+        if MULTI_HEAD:
+            path = os.path.join(self.final_models_dir, MULTI_HEAD_MODEL)
+            torch.save(self.agent.online_net.state_dict(), path)
+            print(f"[System] Shared model saved after Slice {sid}.")
+            return
         path = os.path.join(
             self.final_models_dir, f"slice_{sid:02d}_model.pth"
         )
@@ -0,0 +1,206 @@
+import json
+import os
+import numpy as np
+
+INDEX_FILE = "index.json"
+
+# Row layout. One row per env step, plus one closing row per episode that
+# only carries the final observation (action == -1). Row i is a transition
+# iff action[i] >= 0, and its next observation is always obs[i + 1].
+FIELDS = {
+    "action": np.int8,
+    "reward": np.float32,
+    "done": np.bool_,
+    "percent": np.float32,
+    "mode": np.int8,
+}
+
+
+class TransitionDatasetWriter:
+    """
+    Writes gameplay to a chunked on-disk dataset under `root_dir`.
+
+    Each chunk holds whole episodes of a single slice, stored either as one
+    .npy per field (memory-mappable) or as a single compressed .npz.
+    index.json maps slice ids to their chunks.
+    """
+
+    def __init__(self, root_dir, obs_dim, chunk_rows=32768, compress=False):
+        self.root_dir = root_dir
+        self.obs_dim = obs_dim
+        self.chunk_rows = chunk_rows
+        self.compress = compress
+        os.makedirs(root_dir, exist_ok=True)
+
+        path = os.path.join(root_dir, INDEX_FILE)
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                self.index = json.load(f)
+            if self.index['obs_dim'] != obs_dim:
+                raise ValueError(f"[Dataset] obs_dim {obs_dim} != existing {self.index['obs_dim']}")
+        else:
+            self.index = {"version": 1, "obs_dim": obs_dim, "rows": 0, "transitions": 0, "chunks": []}
+
+        self._slice_id = None
+        self._reset_buffers()
+
+    def _reset_buffers(self):
+        self._obs = []
+        self._cols = {k: [] for k in FIELDS}
+        self._episode_start = 0
+
+    def _append_row(self, obs, action, reward, done, percent, mode):
+        self._obs.append(np.asarray(obs, dtype=np.float32))
+        self._cols['action'].append(action)
+        self._cols['reward'].append(reward)
+        self._cols['done'].append(done)
+        self._cols['percent'].append(percent)
+        self._cols['mode'].append(mode)
+
+    def add(self, obs, action, reward, done, percent, mode, slice_id):
+        """Record the step taken from `obs`."""
+        if self._slice_id is not None and slice_id != self._slice_id and self._episode_start == len(self._obs):
+            self.flush()
+        self._slice_id = slice_id
+        self._append_row(obs, action, reward, done, percent, mode)
+
+    def end_episode(self, final_obs, percent=0.0, mode=0):
+        """Close the episode with the observation reached by its last step."""
+        if len(self._obs) == self._episode_start:
+            return
+        self._append_row(final_obs, -1, 0.0, False, percent, mode)
+        self._episode_start = len(self._obs)
+        if len(self._obs) >= self.chunk_rows:
+            self.flush()
+
+    def add_rows(self, obs, slice_id, **cols):
+        """Bulk append whole episodes already in row layout (e.g. from relabeling)."""
+        if self._obs:
+            self.flush()
+        self._slice_id = slice_id
+        self._obs = list(np.asarray(obs, dtype=np.float32))
+        self._cols = {k: list(cols[k]) for k in FIELDS}
+        self._episode_start = len(self._obs)
+        self.flush()
+
+    def flush(self):
+        """Write complete episodes as a new chunk (a running episode is kept)."""
+        n = self._episode_start
+        if n == 0:
+            return
+        arrays = {"obs": np.stack(self._obs[:n])}
+        for k, dtype in FIELDS.items():
+            arrays[k] = np.asarray(self._cols[k][:n], dtype=dtype)
+
+        name = f"chunk_{len(self.index['chunks']):05d}"
+        if self.compress:
+            np.savez_compressed(os.path.join(self.root_dir, name + ".npz"), **arrays)
+        else:
+            for k, arr in arrays.items():
+                np.save(os.path.join(self.root_dir, f"{name}_{k}.npy"), arr)
+
+        transitions = int((arrays['action'] >= 0).sum())
+        self.index['chunks'].append({
+            "name": name,
+            "slice_id": int(self._slice_id if self._slice_id is not None else 0),
+            "rows": n,
+            "transitions": transitions,
+            "compressed": self.compress,
+        })
+        self.index['rows'] += n
+        self.index['transitions'] += transitions
+        with open(os.path.join(self.root_dir, INDEX_FILE), 'w') as f:
+            json.dump(self.index, f, indent=2)
+
+        # Carry over the running episode
+        self._obs = self._obs[n:]
+        self._cols = {k: v[n:] for k, v in self._cols.items()}
+        self._episode_start = 0
+
+    def close(self):
+        self.flush()
+
+
+class TransitionDataset:
+    """
+    Random access to (obs, action, reward, next_obs, done) over a dataset
+    written by TransitionDatasetWriter, optionally restricted to some slices.
+
+    Uncompressed chunks are memory-mapped lazily (per process, so the object
+    is safe to hand to DataLoader workers); compressed chunks are loaded whole.
+    """
+
+    def __init__(self, root_dir, slice_ids=None):
+        self.root_dir = root_dir
+        with open(os.path.join(root_dir, INDEX_FILE), 'r') as f:
+            self.index = json.load(f)
+        self.obs_dim = self.index['obs_dim']
+
+        self.chunks = [c for c in self.index['chunks']
+                       if slice_ids is None or c['slice_id'] in slice_ids]
+        self._arrays = {}
+
+        # Global transition index -> (chunk, row)
+        chunk_ids, rows = [], []
+        for ci in range(len(self.chunks)):
+            valid = np.flatnonzero(self._chunk(ci)['action'] >= 0)
+            chunk_ids.append(np.full(len(valid), ci, dtype=np.int32))
+            rows.append(valid.astype(np.int64))
+        self._chunk_of = np.concatenate(chunk_ids) if chunk_ids else np.zeros(0, np.int32)
+        self._row_of = np.concatenate(rows) if rows else np.zeros(0, np.int64)
+        self._arrays = {}  # reopen inside each worker
+
+    def __len__(self):
+        return len(self._row_of)
+
+    def _chunk(self, ci):
+        arrays = self._arrays.get(ci)
+        if arrays is None:
+            chunk = self.chunks[ci]
+            base = os.path.join(self.root_dir, chunk['name'])
+            if chunk['compressed']:
+                with np.load(base + ".npz") as data:
+                    arrays = {k: data[k] for k in data.files}
+            else:
+                arrays = {k: np.load(f"{base}_{k}.npy", mmap_mode='r') for k in ("obs",) + tuple(FIELDS)}
+            self._arrays[ci] = arrays
+        return arrays
+
+    def get_batch(self, indices):
+        """Gather a batch of transitions by global index (vectorized per chunk)."""
+        indices = np.asarray(indices)
+        n = len(indices)
+        obs = np.empty((n, self.obs_dim), dtype=np.float32)
+        next_obs = np.empty((n, self.obs_dim), dtype=np.float32)
+        action = np.empty(n, dtype=np.int64)
+        reward = np.empty(n, dtype=np.float32)
+        done = np.empty(n, dtype=np.float32)
+        percent = np.empty(n, dtype=np.float32)
+        mode = np.empty(n, dtype=np.int64)
+
+        chunk_of = self._chunk_of[indices]
+        for ci in np.unique(chunk_of):
+            sel = np.flatnonzero(chunk_of == ci)
+            rows = self._row_of[indices[sel]]
+            arrays = self._chunk(ci)
+            obs[sel] = arrays['obs'][rows]
+            next_obs[sel] = arrays['obs'][rows + 1]
+            action[sel] = arrays['action'][rows]
+            reward[sel] = arrays['reward'][rows]
+            done[sel] = arrays['done'][rows]
+            percent[sel] = arrays['percent'][rows]
+            mode[sel] = arrays['mode'][rows]
+
+        return obs, action, reward, next_obs, done, percent, mode
+
+    def __getitem__(self, indices):
+        # Meant for DataLoader(sampler=BatchSampler(...), batch_size=None)
+        return self.get_batch(indices)
+
+    def sample(self, batch_size, rng=np.random):
+        """ReplayBuffer-compatible sampling (state, action, reward, next_state, done)."""
+        obs, action, reward, next_obs, done, _, _ = self.get_batch(rng.randint(0, len(self), batch_size))
+        return obs, action, reward, next_obs, done
+
+    def slice_ids(self):
+        return sorted({c['slice_id'] for c in self.chunks})
@@ -0,0 +1,332 @@
+"""
+Distill the slice-expert chain into one compact, quantized student policy.
+
+1. Roll out the chain on the simulated level from every slice start (epsilon
+   noise widens the state distribution) and optionally add observations
+   from a recorded TransitionDataset; every observation is labelled with the
+   Q-values of the expert that owns its percent.
+2. Train StudentDQN on the teachers' action distribution (policy
+   distillation: KL to softmax(q / tau)), then DAgger rounds where the
+   student drives and the teachers label the states it visits.
+3. Structured pruning: drop the hidden units with the smallest incoming
+   weight norm (the layers really shrink), then fine-tune.
+4. Dynamic int8 quantization of the Linear layers.
+
+The exported file is loaded with load_student(); set DISTILLED_MODEL in
+config.py to play with it instead of the chain.
+
+Usage (from Stereo_Madness/):
+    python -m offline.distill --episodes 20 --steps 20000 --prune 0.5
+    python -m offline.distill --dataset datasets/gameplay --steps 40000
+"""
+import argparse
+import io
+import os
+import time
+import warnings
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+from config import *
+from core.environment import GeometryDashEnv
+from core.seeding import seed_everything
+from core.sim_game import SimBridge, SimulatedGame, SimulatedLevel
+from agents.ddqn import make_agent
+from offline.dataset import TransitionDataset
+
+
+class StudentDQN(nn.Module):
+    """Plain MLP Q-network; `hidden` shrinks when units are pruned."""
+
+    def __init__(self, input_dim, output_dim, hidden=(128, 64)):
+        super(StudentDQN, self).__init__()
+        self.input_dim = input_dim
+        self.output_dim = output_dim
+        self.hidden = list(hidden)
+        layers = []
+        d = input_dim
+        for h in self.hidden:
+            layers += [nn.Linear(d, h), nn.ReLU()]
+            d = h
+        layers.append(nn.Linear(d, output_dim))
+        self.net = nn.Sequential(*layers)
+
+    def forward(self, state):
+        return self.net(state)
+
+    def arch(self):
+        return {'input_dim': self.input_dim, 'output_dim': self.output_dim, 'hidden': self.hidden}
+
+
+def prune_hidden_units(student, amount):
+    """
+    New StudentDQN keeping the (1 - amount) hidden units of every layer with
+    the largest L2 norm of incoming weights; outgoing weights follow.
+    """
+    linears = [m for m in student.net if isinstance(m, nn.Linear)]
+    keep = []
+    for lin in linears[:-1]:
+        k = max(1, int(round(lin.out_features * (1.0 - amount))))
+        keep.append(lin.weight.detach().norm(dim=1).topk(k).indices.sort().values)
+
+    pruned = StudentDQN(student.input_dim, student.output_dim, [len(k) for k in keep])
+    with torch.no_grad():
+        for i, (src, dst) in enumerate(zip(linears, [m for m in pruned.net if isinstance(m, nn.Linear)])):
+            w, b = src.weight, src.bias
+            if i > 0:
+                w = w[:, keep[i - 1]]
+            if i < len(keep):
+                w, b = w[keep[i]], b[keep[i]]
+            dst.weight.copy_(w)
+            dst.bias.copy_(b)
+    return pruned
+
+
+def quantize(student):
+    """Dynamic int8 Linear layers (weights int8, activations quantized per call)."""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return torch.ao.quantization.quantize_dynamic(student.eval(), {nn.Linear}, dtype=torch.qint8)
+
+
+def save_student(student, path, quantized):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    torch.save({'arch': student.arch(),
+                'quantized': quantized,
+                'state_dict': student.state_dict()}, path)
+    print(f"[Distill] Saved student to {path}")
+
+
+def load_student(path, device="cpu"):
+    """Rebuild an exported student (int8 students run on CPU)."""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        checkpoint = torch.load(path, map_location=device, weights_only=False)
+        student = StudentDQN(**checkpoint['arch'])
+        if checkpoint['quantized']:
+            student = quantize(student)
+        student.load_state_dict(checkpoint['state_dict'])
+    return student.eval()
+
+
+def serialized_bytes(model):
+    buf = io.BytesIO()
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        torch.save(model.state_dict(), buf)
+    return buf.tell()
+
+
+class ExpertChain:
+    """The per-slice experts as separate modules, looked up by percent."""
+
+    def __init__(self, final_models_dir, slices, input_dim=INPUT_DIM, output_dim=NUM_ACTIONS):
+        self.slices = sorted(slices, key=lambda s: s['start'])
+        self.nets = {}
+        for s in self.slices:
+            path = os.path.join(final_models_dir, f"slice_{s['id']:02d}_model.pth")
+            if os.path.exists(path):
+                net = make_agent(input_dim, output_dim, make_agent_config(device="cpu"), final_models_dir).online_net
+                net.load_state_dict(torch.load(path, map_location="cpu"))
+                self.nets[s['id']] = net.eval()
+        if not self.nets:
+            raise RuntimeError(f"[Distill] No expert models in {final_models_dir}")
+
+    def slice_id(self, percent):
+        """Slice owning `percent`; past the last trained slice its last expert."""
+        sid = None
+        for s in self.slices:
+            if s['start'] <= percent and s['id'] in self.nets:
+                sid = s['id']
+        return sid if sid is not None else min(self.nets)
+
+    @torch.no_grad()
+    def q_values(self, obs, percent):
+        obs = torch.as_tensor(obs, dtype=torch.float32)
+        sids = np.array([self.slice_id(p) for p in np.atleast_1d(percent)])
+        q = torch.empty(len(obs), NUM_ACTIONS)
+        for sid in np.unique(sids):
+            rows = torch.as_tensor(np.flatnonzero(sids == sid))
+            q[rows] = self.nets[int(sid)](obs[rows])
+        return q.numpy()
+
+
+def rollout(chain, level, episodes, student=None, epsilon=0.05, max_steps=3000, seed=0):
+    """
+    Observations and teacher Q-values from `episodes` attempts per slice start.
+    The chain acts unless a student is given (DAgger).
+    """
+    rng = np.random.default_rng(seed)
+    bridge = SimBridge(SimulatedGame(level, seed=seed))
+    env = GeometryDashEnv(bridge=bridge, frame_skip=FRAME_SKIP)
+    obs_out, q_out = [], []
+    for s in chain.slices:
+        bridge.send_checkpoint(s['start'])
+        for _ in range(episodes):
+            obs, info = env.reset()
+            for _ in range(max_steps):
+                q = chain.q_values(obs[None], info['percent'])[0]
+                obs_out.append(obs.copy())
+                q_out.append(q)
+                if rng.random() < epsilon:
+                    action = int(rng.integers(NUM_ACTIONS))
+                elif student is not None:
+                    with torch.no_grad():
+                        action = int(student(torch.as_tensor(obs[None])).argmax())
+                else:
+                    action = int(q.argmax())
+                obs, _, terminated, _, info = env.step(action)
+                if terminated or info['percent'] >= s['end']:
+                    break
+    return np.stack(obs_out).astype(np.float32), np.stack(q_out).astype(np.float32)
+
+
+def dataset_labels(chain, root_dir, max_rows=200000, seed=0):
+    """Teacher labels for recorded observations (real game states)."""
+    dataset = TransitionDataset(root_dir)
+    rng = np.random.default_rng(seed)
+    idx = rng.choice(len(dataset), size=min(max_rows, len(dataset)), replace=False)
+    obs, _, _, _, _, percent, _ = dataset.get_batch(np.sort(idx))
+    return obs, chain.q_values(obs, percent)
+
+
+def distill(student, obs, teacher_q, steps, batch_size=256, lr=1e-3, tau=0.01, seed=0, log_every=2000):
+    """KL(softmax(teacher_q / tau) || softmax(student_q)) over the labelled observations."""
+    gen = torch.Generator().manual_seed(seed)
+    obs = torch.as_tensor(obs)
+    target = F.softmax(torch.as_tensor(teacher_q) / tau, dim=1)
+    optimizer = torch.optim.Adam(student.parameters(), lr=lr)
+    student.train()
+    t0 = time.perf_counter()
+    running = 0.0
+    for step in range(1, steps + 1):
+        rows = torch.randint(len(obs), (batch_size,), generator=gen)
+        loss = F.kl_div(F.log_softmax(student(obs[rows]), dim=1), target[rows], reduction='batchmean')
+        optimizer.zero_grad()
+        loss.backward()
+        optimizer.step()
+        running += loss.item()
+        if step % log_every == 0:
+            print(f"[Distill] Step {step:<6} | KL {running / log_every:.4f} | "
+                  f"{step * batch_size / (time.perf_counter() - t0):,.0f} samples/s")
+            running = 0.0
+    return student.eval()
+
+
+def agreement(student, chain_q, obs):
+    with torch.no_grad():
+        return float((student(torch.as_tensor(obs)).argmax(1).numpy() == chain_q.argmax(1)).mean())
+
+
+def evaluate(act, level, slices, attempts=5, max_steps=3000):
+    """Slice clear rate from every slice start and progress of one run from 0%."""
+    bridge = SimBridge(SimulatedGame(level))
+    env = GeometryDashEnv(bridge=bridge, frame_skip=FRAME_SKIP)
+    cleared = 0
+    for s in slices:
+        bridge.send_checkpoint(s['start'])
+        for _ in range(attempts):
+            obs, info = env.reset()
+            for _ in range(max_steps):
+                obs, _, terminated, _, info = env.step(act(obs, info['percent']))
+                if terminated or info['percent'] >= s['end']:
+                    break
+            cleared += info['percent'] >= s['end']
+
+    bridge.send_checkpoint(0.0)
+    obs, info = env.reset()
+    for _ in range(20 * max_steps):
+        obs, _, terminated, _, info = env.step(act(obs, info['percent']))
+        if terminated or info['percent'] >= 100.0:
+            break
+    return cleared / (len(slices) * attempts), float(info['percent'])
+
+
+def decision_latency(forward, obs, n=2000):
+    """us per single-observation forward + argmax."""
+    times = np.empty(n)
+    with torch.no_grad():
+        for i in range(n):
+            x = torch.as_tensor(obs[i % len(obs)]).unsqueeze(0)
+            t0 = time.perf_counter_ns()
+            forward(x).argmax().item()
+            times[i] = time.perf_counter_ns() - t0
+    return times / 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distill the expert chain into one quantized student")
+    parser.add_argument("--experts", default=os.path.join(CHECKPOINT_DIR, "final_models"))
+    parser.add_argument("--dataset", help="optional TransitionDataset whose observations are teacher-labelled")
+    parser.add_argument("--episodes", type=int, default=20, help="teacher rollouts per slice start")
+    parser.add_argument("--dagger-rounds", type=int, default=2)
+    parser.add_argument("--hidden", type=int, nargs="+", default=[128, 64])
+    parser.add_argument("--steps", type=int, default=20000)
+    parser.add_argument("--finetune-steps", type=int, default=5000)
+    parser.add_argument("--prune", type=float, default=0.5, help="share of hidden units removed per layer")
+    parser.add_argument("--eval-attempts", type=int, default=5)
+    parser.add_argument("--level-seed", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=os.path.join(CHECKPOINT_DIR, "student"))
+    args = parser.parse_args()
+
+    torch.set_num_threads(1)
+    seed_everything(args.seed)
+    level = SimulatedLevel(seed=args.level_seed)
+    chain = ExpertChain(args.experts, level.slices)
+
+    obs, q = rollout(chain, level, args.episodes, seed=args.seed)
+    if args.dataset:
+        d_obs, d_q = dataset_labels(chain, args.dataset, seed=args.seed)
+        obs, q = np.concatenate([obs, d_obs]), np.concatenate([q, d_q])
+    print(f"[Distill] {len(obs):,} teacher-labelled observations from {len(chain.nets)} experts")
+
+    student = distill(StudentDQN(obs.shape[1], NUM_ACTIONS, args.hidden), obs, q, args.steps, seed=args.seed)
+    for r in range(1, args.dagger_rounds + 1):
+        d_obs, d_q = rollout(chain, level, args.episodes, student=student, seed=args.seed + r)
+        obs, q = np.concatenate([obs, d_obs]), np.concatenate([q, d_q])
+        print(f"[Distill] DAgger round {r}: {len(obs):,} observations")
+        student = distill(student, obs, q, args.steps // 2, seed=args.seed + r)
+
+    pruned = distill(prune_hidden_units(student, args.prune), obs, q, args.finetune_steps, seed=args.seed)
+    student_int8 = quantize(pruned)
+    save_student(pruned, os.path.join(args.out, "student.pth"), quantized=False)
+    save_student(student_int8, os.path.join(args.out, "student_int8.pth"), quantized=True)
+
+    # REPORT
+    slices = [s for s in chain.slices if s['id'] in chain.nets]
+    swap_net = make_agent(obs.shape[1], NUM_ACTIONS, make_agent_config(device="cpu"), args.experts).online_net.eval()
+
+    def chain_act(o, percent):
+        with torch.no_grad():
+            return int(chain.nets[chain.slice_id(percent)](torch.as_tensor(o[None])).argmax())
+
+    t0 = time.perf_counter_ns()
+    for sid in chain.nets:
+        swap_net.load_state_dict(chain.nets[sid].state_dict())
+    swap_us = (time.perf_counter_ns() - t0) / len(chain.nets) / 1000.0
+
+    candidates = [("chain", None, swap_net, sum(serialized_bytes(n) for n in chain.nets.values())),
+                  (f"student {student.hidden}", student, student, serialized_bytes(student)),
+                  (f"pruned {pruned.hidden}", pruned, pruned, serialized_bytes(pruned)),
+                  ("pruned int8", student_int8, student_int8, serialized_bytes(student_int8))]
+    print()
+    for label, model, forward, size in candidates:
+        if model is None:
+            act, agree = chain_act, 1.0
+        else:
+            act = lambda o, _, m=model: int(m(torch.as_tensor(o[None])).argmax())
+            agree = agreement(model, q, obs)
+        with torch.no_grad():
+            cleared, run_pct = evaluate(act, level, slices, args.eval_attempts)
+        lat = decision_latency(forward, obs)
+        swaps = f" + swap {swap_us:.0f} us/slice" if model is None else ""
+        print(f"[Distill] {label:<18} | agree {agree * 100:5.1f}% | slices cleared {cleared * 100:5.1f}% | "
+              f"run from 0% {run_pct:5.1f}% | {size / 1024:7.1f} KiB | decision p50 {np.percentile(lat, 50):5.1f} us"
+              f" p99 {np.percentile(lat, 99):6.1f} us{swaps}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Offline pretraining of DuelingDQN from recorded gameplay.
+
+Loss = Double-DQN TD error
+     + bc_weight * behavior cloning (DQfD large-margin loss on the recorded action)
+     + cql_alpha * conservative Q penalty (logsumexp Q - Q(s, a)).
+
+Usage (from Stereo_Madness/):
+    python -m offline.pretrain --dataset datasets/gameplay --slices 1 2 3 --steps 20000
+"""
+import argparse
+import os
+import time
+import numpy as np
+import torch
+import torch.nn as nn
+from torch.utils.data import DataLoader, BatchSampler, RandomSampler
+
+from config import *
+from agents.ddqn import DuelingDQN
+from offline.dataset import TransitionDataset
+
+
+def make_loader(dataset, batch_size, num_steps, num_workers=2, seed=0):
+    """Multi-worker loader yielding whole batches gathered with one vectorized call."""
+    generator = torch.Generator().manual_seed(seed)
+    sampler = BatchSampler(
+        RandomSampler(dataset, replacement=True, num_samples=num_steps * batch_size, generator=generator),
+        batch_size, drop_last=True
+    )
+    return DataLoader(
+        dataset, sampler=sampler, batch_size=None, num_workers=num_workers,
+        persistent_workers=num_workers > 0, prefetch_factor=4 if num_workers > 0 else None,
+    )
+
+
+class OfflinePretrainer:
+    def __init__(self, obs_dim, output_dim=NUM_ACTIONS, lr=LR, gamma=GAMMA, target_update=TARGET_UPDATE,
+                 bc_weight=1.0, cql_alpha=1.0, bc_margin=0.8, device=DEVICE, action_repeats=ACTION_REPEATS,
+                 frame_gamma=FRAME_GAMMA):
+        self.device = torch.device(device)
+        self.gamma = gamma
+        self.target_update = target_update
+        self.bc_weight = bc_weight
+        self.cql_alpha = cql_alpha
+        self.bc_margin = bc_margin
+
+        self.online_net = DuelingDQN(obs_dim, output_dim).to(self.device)
+        self.target_net = DuelingDQN(obs_dim, output_dim).to(self.device)
+        self.target_net.load_state_dict(self.online_net.state_dict())
+        self.target_net.eval()
+        self.optimizer = torch.optim.Adam(self.online_net.parameters(), lr=lr)
+        self.loss_fn = nn.MSELoss()
+        self.steps_done = 0
+
+        # same bootstrap discount per action as Agent with ACTION_REPEATS
+        self.action_discount = None
+        if action_repeats:
+            discounts = [frame_gamma ** r for r in action_repeats for _ in range(2)]
+            self.action_discount = torch.tensor(discounts, dtype=torch.float32, device=self.device).unsqueeze(1)
+
+    def train_step(self, batch):
+        obs, action, reward, next_obs, done = [t.to(self.device) for t in batch[:5]]
+        action = action.long().unsqueeze(1)
+        reward = reward.unsqueeze(1)
+        done = done.unsqueeze(1)
+
+        q = self.online_net(obs)
+        curr_q = q.gather(1, action)
+
+        with torch.no_grad():
+            next_actions = self.online_net(next_obs).argmax(1, keepdim=True)
+            next_q = self.target_net(next_obs).gather(1, next_actions)
+            gamma = self.gamma if self.action_discount is None else self.action_discount[action.squeeze(1)]
+            target_q = reward + (1 - done) * gamma * next_q
+
+        td_loss = self.loss_fn(curr_q, target_q)
+        # Every non-recorded action must score at least `bc_margin` below the recorded one
+        margins = torch.full_like(q, self.bc_margin).scatter_(1, action, 0.0)
+        bc_loss = ((q + margins).max(dim=1, keepdim=True)[0] - curr_q).mean()
+        cql_loss = (torch.logsumexp(q, dim=1, keepdim=True) - curr_q).mean()
+        loss = td_loss + self.bc_weight * bc_loss + self.cql_alpha * cql_loss
+
+        self.optimizer.zero_grad()
+        loss.backward()
+        self.optimizer.step()
+
+        self.steps_done += 1
+        if self.steps_done % self.target_update == 0:
+            self.target_net.load_state_dict(self.online_net.state_dict())
+
+        return loss.item(), td_loss.item(), bc_loss.item(), cql_loss.item()
+
+    def fit(self, loader, log_every=1000):
+        t0 = time.perf_counter()
+        stats = np.zeros(4)
+        for i, batch in enumerate(loader, 1):
+            stats += self.train_step(batch)
+            if i % log_every == 0:
+                loss, td, bc, cql = stats / log_every
+                rate = i * len(batch[1]) / (time.perf_counter() - t0)
+                print(f"Step {i:<7} | Loss {loss:.4f} | TD {td:.4f} | BC {bc:.4f} | CQL {cql:.4f} | {rate:,.0f} samples/s")
+                stats[:] = 0
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Plain state_dict: loadable by Agent.load and the expert cache
+        torch.save(self.online_net.state_dict(), path)
+        print(f"[Pretrain] Saved model to {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pretrain DuelingDQN offline from a gameplay dataset")
+    parser.add_argument("--dataset", default=DATASET_DIR)
+    parser.add_argument("--slices", type=int, nargs="*")
+    parser.add_argument("--steps", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--bc-weight", type=float, default=1.0)
+    parser.add_argument("--cql-alpha", type=float, default=1.0)
+    parser.add_argument("--init", help="optional state_dict to start from")
+    parser.add_argument("--out", default=os.path.join(CHECKPOINT_DIR, "pretrained", "pretrained_model.pth"))
+    args = parser.parse_args()
+
+    torch.set_num_threads(os.cpu_count())
+    dataset = TransitionDataset(args.dataset, slice_ids=args.slices)
+    print(f"[Pretrain] {len(dataset)} transitions, slices {dataset.slice_ids()}, obs_dim {dataset.obs_dim}")
+
+    trainer = OfflinePretrainer(dataset.obs_dim, bc_weight=args.bc_weight, cql_alpha=args.cql_alpha)
+    if args.init:
+        trainer.online_net.load_state_dict(torch.load(args.init, map_location=trainer.device))
+        trainer.target_net.load_state_dict(trainer.online_net.state_dict())
+
+    trainer.fit(make_loader(dataset, args.batch_size, args.steps, args.workers))
+    trainer.save(args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Recompute rewards for recorded trajectories under a new reward config.
+
+Usage (from Stereo_Madness/):
+    python -m offline.relabel --trajectories trajectories/ --out relabeled/ \\
+        --config my_shaping.json --frame-stack 1
+
+With ACTION_REPEATS the frames of a step are discounted by FRAME_GAMMA
+like GeometryDashEnv does (--frame-gamma to override), and actions are the
+agent's indices (button + 2 * repeat index).
+"""
+import argparse
+import json
+import os
+import numpy as np
+
+from config import TRAJECTORY_DIR, ACTION_REPEATS, FRAME_GAMMA
+from core.state_utils import normalize_states
+from agents.reward_engine import compile_reward_config, frame_reward_batch
+from offline.trajectory_store import TrajectoryReader
+from offline.dataset import FIELDS, TransitionDatasetWriter
+
+
+def _step_groups(meta):
+    """Start index of every (episode, step) run of frames."""
+    episode = meta['episode']
+    step = meta['step']
+    change = np.empty(len(meta), dtype=bool)
+    change[0] = True
+    change[1:] = (episode[1:] != episode[:-1]) | (step[1:] != step[:-1])
+    return np.flatnonzero(change)
+
+
+def relabel_chunk(states, meta, params, frame_stack=1, frame_gamma=1.0):
+    """
+    Rebuild GeometryDashEnv transitions for one chunk under `params`.
+
+    Frame rewards are recomputed in one vectorized pass, summed per env step
+    (frame_skip / repeat group, frame k of a step weighted frame_gamma**k),
+    and observations are re-normalized from the raw snapshots and re-stacked
+    exactly like GeometryDashEnv does.
+    Returns a dict of arrays in TransitionDataset row layout.
+    """
+    scored = meta['step'] > 0
+    frame_r = frame_reward_batch(
+        params, states['percent'], meta['prev_percent'], meta['action'], meta['prev_action'],
+        states['dist_nearest_hazard'], meta['prev_dist'], states['player_mode'],
+        states['is_dead'], meta['slice_end']
+    )
+    frame_r = np.where(scored, frame_r, 0.0)
+
+    starts = _step_groups(meta)
+    ends = np.append(starts[1:], len(meta)) - 1
+    if frame_gamma != 1.0:
+        # position of every frame inside its step
+        lengths = np.diff(np.append(starts, len(meta)))
+        frame_r = frame_r * frame_gamma ** (np.arange(len(meta)) - np.repeat(starts, lengths))
+    step_reward = np.add.reduceat(frame_r, starts)
+
+    # agent action index; chunks recorded before the repeat field hold the button only
+    action = meta['action'].astype(np.int16)
+    if 'repeat' in meta.dtype.names:
+        action = action + 2 * meta['repeat']
+
+    last = states[ends]
+    group_obs = normalize_states(last)
+    is_reset = meta['step'][starts] == 0
+
+    # Index of each group's reset (episode start) group, for stack padding
+    g = np.arange(len(starts))
+    episode_start = np.maximum.accumulate(np.where(is_reset, g, 0))
+
+    def stacked(idx):
+        cols = [np.maximum(idx - (frame_stack - 1 - j), episode_start[idx]) for j in range(frame_stack)]
+        return np.concatenate([group_obs[c] for c in cols], axis=1)
+
+    # Dataset row layout: row g is the step taken from group g's observation,
+    # i.e. the following group; episode-closing rows get action -1
+    g_next = np.minimum(g + 1, len(starts) - 1)
+    has_step = (g + 1 < len(starts)) & ~is_reset[g_next]
+
+    last_next = last[g_next]
+    slice_end = meta['slice_end'][ends[g_next]].astype(np.float64)
+    done = (last_next['is_dead'] != 0) | (last_next['percent'] >= slice_end)
+
+    return {
+        "obs": stacked(g),
+        "action": np.where(has_step, action[starts[g_next]], -1).astype(np.int8),
+        "reward": np.where(has_step, step_reward[g_next], 0.0).astype(np.float32),
+        "done": has_step & done,
+        "percent": last['percent'].astype(np.float32),
+        "mode": last['player_mode'].astype(np.int8),
+        "slice_id": meta['slice_id'][ends],
+    }
+
+
+def relabel(trajectory_dir, out_dir, reward_context=None, ship_context=None, frame_stack=1,
+            slice_ids=None, compress=True, frame_gamma=None):
+    """Relabel every recorded chunk into a new TransitionDataset at `out_dir`."""
+    if frame_gamma is None:
+        frame_gamma = FRAME_GAMMA if ACTION_REPEATS else 1.0  # what the recording env used
+    params = compile_reward_config(reward_context, ship_context)
+    reader = TrajectoryReader(trajectory_dir)
+    writer = None
+
+    for i, (states, meta) in enumerate(reader.chunks(slice_ids)):
+        rows = relabel_chunk(states, meta, params, frame_stack, frame_gamma)
+        if writer is None:
+            writer = TransitionDatasetWriter(out_dir, rows['obs'].shape[1], compress=compress)
+
+        # Episodes never span slices, so per-slice masks keep them whole
+        for sid in np.unique(rows['slice_id']):
+            if slice_ids is not None and sid not in slice_ids:
+                continue
+            keep = rows['slice_id'] == sid
+            writer.add_rows(rows['obs'][keep], int(sid),
+                            **{k: rows[k][keep] for k in FIELDS})
+        print(f"[Relabel] Chunk {i}: {len(meta)} frames -> {len(rows['action'])} rows")
+
+    if writer is None:
+        return 0
+    writer.close()
+
+    with open(os.path.join(out_dir, "reward_config.json"), 'w') as f:
+        json.dump({"reward_context": reward_context or {}, "ship_context": ship_context or {},
+                   "frame_stack": frame_stack, "frame_gamma": frame_gamma}, f, indent=2)
+    return writer.index['transitions']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Relabel recorded trajectories with a new reward config")
+    parser.add_argument("--trajectories", default=TRAJECTORY_DIR)
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--config", help="JSON file: Cube/env reward_context keys, optional 'ship' sub-dict")
+    parser.add_argument("--frame-stack", type=int, default=1)
+    parser.add_argument("--slices", type=int, nargs="*")
+    parser.add_argument("--frame-gamma", type=float, help="per-frame discount inside a step (default: as the env)")
+    parser.add_argument("--no-compress", action="store_true", help="write memory-mappable .npy chunks")
+    args = parser.parse_args()
+
+    reward_context, ship_context = {}, {}
+    if args.config:
+        with open(args.config, 'r') as f:
+            reward_context = json.load(f)
+        ship_context = reward_context.pop("ship", {})
+
+    total = relabel(args.trajectories, args.out, reward_context, ship_context,
+                    args.frame_stack, args.slices, compress=not args.no_compress, frame_gamma=args.frame_gamma)
+    print(f"[Relabel] Wrote {total} transitions to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
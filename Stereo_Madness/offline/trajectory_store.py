@@ -0,0 +1,139 @@
+import json
+import os
+import numpy as np
+
+from core.state_utils import STATE_DTYPE
+
+# Per-frame bookkeeping recorded next to each raw SharedState snapshot.
+# Everything GeometryDashEnv's reward/termination logic reads, so rewards can
+# be recomputed later. step == 0 marks the snapshot taken by reset().
+FRAME_META_DTYPE = np.dtype([
+    ('episode', np.int32),
+    ('step', np.int32),
+    ('action', np.int8),           # button held (0/1)
+    ('prev_action', np.int8),      # -1 = None
+    ('prev_percent', np.float32),
+    ('prev_dist', np.float32),     # NaN = None
+    ('slice_id', np.int16),
+    ('slice_end', np.float32),     # NaN = no slice
+    ('repeat', np.int8),           # ACTION_REPEATS index of the step (agent action = button + 2 * repeat)
+])
+
+INDEX_FILE = "index.json"
+
+
+class TrajectoryWriter:
+    """
+    Appends raw SharedState frames to chunked .npy files under `root_dir`.
+
+    Chunks are only cut at episode boundaries, so each chunk can be relabeled
+    on its own. Files are plain .npy (memory-mappable with np.load(mmap_mode='r')).
+    """
+
+    def __init__(self, root_dir, chunk_frames=65536):
+        self.root_dir = root_dir
+        self.chunk_frames = chunk_frames
+        os.makedirs(root_dir, exist_ok=True)
+
+        self.index = self._load_index()
+        self.episode = self.index['episodes']
+        self._episode_frames = 0
+
+        self._states = np.zeros(chunk_frames, dtype=STATE_DTYPE)
+        self._meta = np.zeros(chunk_frames, dtype=FRAME_META_DTYPE)
+        self._n = 0
+        self._slice_ids = set()
+
+    def _load_index(self):
+        path = os.path.join(self.root_dir, INDEX_FILE)
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                return json.load(f)
+        return {"version": 1, "frames": 0, "episodes": 0, "chunks": []}
+
+    def _grow(self):
+        # An episode longer than the chunk: keep it whole, double the buffer
+        self._states = np.concatenate([self._states, np.zeros_like(self._states)])
+        self._meta = np.concatenate([self._meta, np.zeros_like(self._meta)])
+
+    def append(self, raw_state, step, action, prev_action, prev_percent, prev_dist, current_slice, repeat=0):
+        """Record one frame. Called by GeometryDashEnv before its trackers update."""
+        if self._n == len(self._states):
+            self._grow()
+        i = self._n
+        self._states[i] = np.frombuffer(raw_state, dtype=STATE_DTYPE)[0]
+
+        m = self._meta[i]
+        m['episode'] = self.episode
+        m['step'] = step
+        m['action'] = action
+        m['repeat'] = repeat
+        m['prev_action'] = -1 if prev_action is None else prev_action
+        m['prev_percent'] = prev_percent
+        m['prev_dist'] = np.nan if prev_dist is None else prev_dist
+        if current_slice:
+            m['slice_id'] = current_slice['id']
+            m['slice_end'] = current_slice['end']
+            self._slice_ids.add(int(current_slice['id']))
+        else:
+            m['slice_id'] = 0
+            m['slice_end'] = np.nan
+        self._n += 1
+        self._episode_frames += 1
+
+    def begin_episode(self):
+        """Close the running episode (if any); chunks are cut here."""
+        if self._episode_frames == 0:
+            return
+        self.episode += 1
+        self._episode_frames = 0
+        if self._n >= self.chunk_frames:
+            self.flush()
+
+    def flush(self):
+        """Write buffered frames as a new chunk and update the index."""
+        if self._n == 0:
+            return
+        name = f"chunk_{len(self.index['chunks']):05d}"
+        np.save(os.path.join(self.root_dir, name + "_states.npy"), self._states[:self._n])
+        np.save(os.path.join(self.root_dir, name + "_meta.npy"), self._meta[:self._n])
+
+        self.index['chunks'].append({
+            "name": name,
+            "frames": int(self._n),
+            "slices": sorted(self._slice_ids),
+        })
+        self.index['frames'] += int(self._n)
+        self.index['episodes'] = self.episode
+        with open(os.path.join(self.root_dir, INDEX_FILE), 'w') as f:
+            json.dump(self.index, f, indent=2)
+
+        self._states = np.zeros(self.chunk_frames, dtype=STATE_DTYPE)
+        self._meta = np.zeros(self.chunk_frames, dtype=FRAME_META_DTYPE)
+        self._n = 0
+        self._slice_ids = set()
+
+    def close(self):
+        self.begin_episode()
+        self.flush()
+
+
+class TrajectoryReader:
+    """Iterates recorded chunks as memory-mapped (states, meta) arrays."""
+
+    def __init__(self, root_dir):
+        self.root_dir = root_dir
+        with open(os.path.join(root_dir, INDEX_FILE), 'r') as f:
+            self.index = json.load(f)
+
+    def __len__(self):
+        return self.index['frames']
+
+    def chunks(self, slice_ids=None):
+        for chunk in self.index['chunks']:
+            if slice_ids is not None and not set(chunk['slices']) & set(slice_ids):
+                continue
+            base = os.path.join(self.root_dir, chunk['name'])
+            states = np.load(base + "_states.npy", mmap_mode='r')
+            meta = np.load(base + "_meta.npy", mmap_mode='r')
+            yield states, meta
@@ -2,30 +2,25 @@ import torch
 import os
 from config import *
 from core.environment import GeometryDashEnv
-from agents.ddqn import Agent
+from core.pipeline import PipelinedActor
+from agents.ddqn import make_agent
 from curriculum.manager import CurriculumManager
+from offline.dataset import TransitionDatasetWriter
+from offline.distill import load_student
 
 
 class StereoMadnessPlayer:
     def __init__(self):
-        self.env = GeometryDashEnv()
-        self.env.frame_skip = 4
+        self.env = GeometryDashEnv(action_repeats=ACTION_REPEATS,
+                                   frame_gamma=FRAME_GAMMA if ACTION_REPEATS else 1.0)
+        self.env.frame_skip = FRAME_SKIP
         self.env.frame_stack = 2
 
         self.manager = CurriculumManager()
         self.slice_list = self._get_all_slices()
 
-        agent_config = {
-            'device': DEVICE,
-            'lr': LR,
-            'gamma': GAMMA,
-            'batch_size': BATCH_SIZE,
-            'target_update': TARGET_UPDATE,
-            'epsilon_start': EPSILON_START,
-            'epsilon_end': EPSILON_END,
-            'epsilon_decay': EPSILON_DECAY,
-        }
-        self.agent = Agent(INPUT_DIM, OUTPUT_DIM, agent_config, CHECKPOINT_DIR)
+        agent_config = make_agent_config()
+        self.agent = make_agent(INPUT_DIM, NUM_ACTIONS, agent_config, CHECKPOINT_DIR)
         self.agent.online_net.eval()
 
         self.final_models_dir = os.path.join(CHECKPOINT_DIR, "final_models")
@@ -34,6 +29,10 @@ class StereoMadnessPlayer:
         if not self.models:
             raise RuntimeError("No expert models found!")
 
+        self.dataset = None
+        if RECORD_DATASET:
+            self.dataset = TransitionDatasetWriter(DATASET_DIR, self.env.observation_space.shape[0])
+
 
     def _get_all_slices(self):
         """Get all curriculum slices in sorted order."""
@@ -59,8 +58,22 @@ class StereoMadnessPlayer:
 
     def _load_all_models(self):
         models = {}
+        if DISTILLED_MODEL:
+            # one distilled (possibly int8) student for every slice, built by offline/distill.py
+            self.agent.online_net = load_student(DISTILLED_MODEL)
+            self.agent.device = torch.device("cpu")
+            print(f"[Play] Using distilled student {DISTILLED_MODEL}")
+            return {s['id']: None for s in self.slice_list}
         if not os.path.exists(self.final_models_dir):
             return models
+        if MULTI_HEAD:
+            # one mode-conditioned model for every slice: loaded once, never swapped
+            path = os.path.join(self.final_models_dir, MULTI_HEAD_MODEL)
+            if os.path.exists(path):
+                self.agent.load(path)
+                self.agent.online_net.eval()
+                models = {s['id']: None for s in self.slice_list}
+            return models
         for fname in sorted(os.listdir(self.final_models_dir)):
             if fname.startswith("slice_") and fname.endswith("_model.pth"):
                 try:
@@ -77,17 +90,39 @@ class StereoMadnessPlayer:
                 return s
         return None
 
+    def _record(self, obs, action, reward, terminated, truncated, obs_info, next_obs, info, slice_id):
+        # Dataset chunks are per slice: cut the run into per-slice segments
+        if slice_id is None:
+            return
+        self.dataset.add(obs, action, reward, terminated, obs_info['percent'], obs_info['mode'], slice_id)
+        if terminated or truncated:
+            self.dataset.end_episode(next_obs, info['percent'], info['mode'])
+
     def play(self):
+        try:
+            if PIPELINED_INFERENCE:
+                self._play_pipelined()
+            else:
+                self._play()
+        finally:
+            if self.dataset is not None:
+                self.dataset.close()
+
+    def _play(self):
         while True:
-            obs, _ = self.env.reset()
+            obs, info = self.env.reset()
             active_expert = None
             try:
                 while True:
                     with torch.no_grad():
                         action = self.agent.select_action(obs, is_training=False)
+                    prev_obs, obs_info = obs, info
                     obs, reward, terminated, truncated, info = self.env.step(action)
                     current_pos = float(info.get("percent", 0.0))
 
+                    if self.dataset is not None:
+                        self._record(prev_obs, action, reward, terminated, truncated, obs_info, obs, info, active_expert)
+
                     correct_expert = None
                     for s in self.slice_list:
                         if s['start'] <= current_pos < s['end']:
@@ -99,11 +134,16 @@ class StereoMadnessPlayer:
                         and correct_expert != active_expert
                         and correct_expert in self.models
                     ):
-                        self.agent.online_net.load_state_dict(self.models[correct_expert])
-                        self.agent.online_net.eval()
+                        if self.models[correct_expert] is not None:
+                            self.agent.online_net.load_state_dict(self.models[correct_expert])
+                            self.agent.online_net.eval()
+                        if self.dataset is not None and active_expert is not None:
+                            self.dataset.end_episode(obs, info['percent'], info['mode'])
                         active_expert = correct_expert
 
                     if current_pos >= 100.0:
+                        if self.dataset is not None:
+                            self.dataset.end_episode(obs, info['percent'], info['mode'])
                         return
 
                     if terminated or truncated:
@@ -113,7 +153,35 @@ class StereoMadnessPlayer:
                 return
 
 
-
+    def _play_pipelined(self):
+        # Inference runs on its own thread; the env wrapper (rewards, recording) is bypassed
+        if self.dataset is not None:
+            print("[Play] Dataset recording is not available with PIPELINED_INFERENCE")
+        active = {'expert': None}
+
+        def policy(obs, info):
+            s = self._get_slice_at_percent(float(info['percent']))
+            if s is not None and s['id'] != active['expert'] and self.models.get(s['id']) is not None:
+                self.agent.online_net.load_state_dict(self.models[s['id']])
+                self.agent.online_net.eval()
+                active['expert'] = s['id']
+            # the actor keeps its own decision cadence, so only the button of a repeat action is used
+            return self.env.decode_action(self.agent.select_action(obs, is_training=False))[0]
+
+        actor = PipelinedActor(self.env.bridge, policy, frame_skip=self.env.frame_skip,
+                               max_staleness=PIPELINE_MAX_STALENESS)
+        try:
+            while True:
+                active['expert'] = None
+                stats = actor.run_episode()
+                print(f"[Play] {stats['percent']:.1f}% | {stats['frames']} frames | "
+                      f"late {stats['late_frames']} | missed {stats['missed_frames']}")
+                if stats['percent'] >= 100.0:
+                    return
+        except KeyboardInterrupt:
+            return
+        finally:
+            actor.close()
 
 
 player = StereoMadnessPlayer()
@@ -0,0 +1,261 @@
+"""
+Parallel hyperparameter sweep over the headless simulated level.
+
+Every trial is an independent training run (own config dict, checkpoint dir
+and seeds) in a process pool sized to the machine. Poor trials are stopped
+early with asynchronous successive halving (ASHA): at each rung a trial only
+continues if its metric is in the top 1/eta of what that rung has seen so far.
+
+Usage (from Stereo_Madness/):
+    python -m tuning.sweep --space sweep_space.json --trials 32 --slice 1
+
+sweep_space.json:
+    {"lr": {"loguniform": [0.0001, 0.001]}, "gamma": [0.98, 0.99, 0.995],
+     "batch_size": [32, 64, 128], "target_update": [500, 1000, 2000],
+     "epsilon_decay": {"uniform": [10000, 80000]}}
+"""
+import argparse
+import csv
+import itertools
+import json
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import torch
+
+from config import *
+from core.environment import GeometryDashEnv
+from core.seeding import seed_everything
+from core.sim_game import SimBridge, SimulatedGame, SimulatedLevel
+from agents.ddqn import make_agent
+from agents.replay_buffer import ReplayBuffer
+
+# Keys routed to the agent config; everything else is a trial/env setting
+AGENT_KEYS = ('lr', 'gamma', 'batch_size', 'target_update', 'epsilon_start', 'epsilon_end', 'epsilon_decay',
+              'algorithm', 'noisy_sigma', 'encoder', 'set_pooling')
+
+
+def sample_trials(space, num_trials=None, seed=0):
+    """
+    Lists are categorical, {"uniform": [a, b]} / {"loguniform": [a, b]} are
+    continuous. With num_trials=None and only lists, the full grid is returned.
+    """
+    if num_trials is None:
+        if not all(isinstance(v, list) for v in space.values()):
+            raise ValueError("[Sweep] Grid search needs categorical (list) values only")
+        keys = list(space)
+        return [dict(zip(keys, combo)) for combo in itertools.product(*(space[k] for k in keys))]
+
+    rng = np.random.default_rng(seed)
+    trials = []
+    for _ in range(num_trials):
+        params = {}
+        for key, spec in space.items():
+            if isinstance(spec, list):
+                params[key] = spec[int(rng.integers(len(spec)))]
+            elif "loguniform" in spec:
+                lo, hi = spec["loguniform"]
+                params[key] = float(np.exp(rng.uniform(np.log(lo), np.log(hi))))
+            elif "uniform" in spec:
+                lo, hi = spec["uniform"]
+                params[key] = float(rng.uniform(lo, hi))
+            else:
+                raise ValueError(f"[Sweep] Unknown spec for {key}: {spec}")
+        trials.append(params)
+    return trials
+
+
+def train_episode(env, agent, memory, current_slice):
+    """One training episode (same loop as GDAgentOrchestrator.train)."""
+    obs, _ = env.reset()
+    total_reward = 0.0
+    steps = 0
+    while True:
+        action = agent.select_action(obs, is_training=True)
+        next_obs, reward, terminated, truncated, info = env.step(action)
+        memory.push(obs, action, reward, next_obs, float(terminated))
+        agent.learn(memory)
+        if hasattr(memory, "on_step"):  # ModelBasedReplay: model training + imagined updates
+            memory.on_step()
+        obs = next_obs
+        total_reward += reward
+        steps += 1
+        if terminated or truncated:
+            break
+    if hasattr(memory, "end_episode"):  # FrameReplayBuffer: the next reset starts a new episode
+        memory.end_episode()
+    won = info['percent'] >= current_slice['end']
+    return info['percent'], total_reward, steps, won
+
+
+def slice_progress(percent, current_slice):
+    span = current_slice['end'] - current_slice['start']
+    return float(np.clip((percent - current_slice['start']) / span, 0.0, 1.0))
+
+
+class ASHA:
+    """
+    Asynchronous successive halving, stopping variant. Rung results live in
+    a Manager dict so every worker process sees the same history.
+    """
+
+    def __init__(self, results, lock, min_episodes, max_episodes, eta=3):
+        self.results = results
+        self.lock = lock
+        self.eta = eta
+        self.rungs = []
+        r = min_episodes
+        while r < max_episodes:
+            self.rungs.append(int(r))
+            r *= eta
+
+    def report(self, rung, metric):
+        """Record `metric` at `rung`; True if the trial should keep training."""
+        with self.lock:
+            seen = list(self.results.get(rung, [])) + [metric]
+            self.results[rung] = seen
+        if len(seen) < self.eta:
+            return True
+        cutoff = np.quantile(seen, 1.0 - 1.0 / self.eta)
+        return metric >= cutoff
+
+
+def run_trial(trial_id, params, sweep):
+    """Worker entry point: train one configuration until done or stopped."""
+    torch.set_num_threads(1)
+    seed = sweep['seed'] + trial_id
+    seed_everything(seed)
+    start = time.perf_counter()
+
+    trial_dir = os.path.join(sweep['out_dir'], f"trial_{trial_id:03d}")
+    os.makedirs(trial_dir, exist_ok=True)
+    with open(os.path.join(trial_dir, "params.json"), 'w') as f:
+        json.dump(params, f, indent=2)
+
+    current_slice = sweep['slice']
+    level = SimulatedLevel(seed=sweep['level_seed'])
+    bridge = SimBridge(SimulatedGame(level))
+    bridge.send_checkpoint(current_slice['start'])
+    env = GeometryDashEnv(bridge=bridge, frame_skip=int(params.get('frame_skip', 4)), action_repeats=ACTION_REPEATS,
+                          frame_gamma=FRAME_GAMMA if ACTION_REPEATS else 1.0)
+    env.set_slice(current_slice)
+
+    agent_config = make_agent_config(**{k: params[k] for k in AGENT_KEYS if k in params})
+    agent_config['batch_size'] = int(agent_config['batch_size'])
+    agent_config['target_update'] = int(agent_config['target_update'])
+    agent = make_agent(env.observation_space.shape[0], NUM_ACTIONS, agent_config, trial_dir)
+    memory = ReplayBuffer(int(params.get('memory_size', MEMORY_SIZE)))
+
+    asha = sweep.get('asha')
+    window = sweep['window']
+    progress, wins = [], []
+    frames = 0
+    status = "completed"
+
+    for episode in range(1, sweep['max_episodes'] + 1):
+        percent, _, steps, won = train_episode(env, agent, memory, current_slice)
+        frames += steps * env.frame_skip
+        progress.append(slice_progress(percent, current_slice))
+        wins.append(float(won))
+
+        if asha is not None and episode in asha.rungs:
+            if not asha.report(episode, float(np.mean(progress[-window:]))):
+                status = "stopped"
+                break
+
+    agent.save(filename="final_model.pth")
+    return {
+        "trial": trial_id,
+        **params,
+        "status": status,
+        "episodes": episode,
+        "frames": frames,
+        "metric": float(np.mean(progress[-window:])),
+        "win_rate": float(np.mean(wins[-window:])),
+        "seed": seed,
+        "wall_s": round(time.perf_counter() - start, 1),
+    }
+
+
+def run_sweep(trials, current_slice, out_dir, max_episodes=300, min_episodes=20, eta=3,
+              window=20, workers=None, seed=0, level_seed=0, early_stopping=True):
+    """Run all trials across a process pool and write results.csv (longest-trained, then best first)."""
+    os.makedirs(out_dir, exist_ok=True)
+    workers = workers or os.cpu_count()
+    ctx = mp.get_context("spawn")  # no inherited torch thread state
+
+    results = []
+    with ctx.Manager() as manager:
+        asha = None
+        if early_stopping:
+            asha = ASHA(manager.dict(), manager.Lock(), min_episodes, max_episodes, eta)
+        sweep = {
+            "slice": current_slice, "out_dir": out_dir, "max_episodes": max_episodes,
+            "window": window, "seed": seed, "level_seed": level_seed, "asha": asha,
+        }
+        print(f"[Sweep] {len(trials)} trials on {workers} workers | rungs {asha.rungs if asha else '-'}")
+
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            futures = {pool.submit(run_trial, i, params, sweep): i for i, params in enumerate(trials)}
+            for future in as_completed(futures):
+                try:
+                    res = future.result()
+                except Exception as e:
+                    res = {"trial": futures[future], **trials[futures[future]], "status": f"failed: {e}"}
+                results.append(res)
+                print(f"[Sweep] Trial {res['trial']:<3} {res['status']:<9} | "
+                      f"metric {res.get('metric', float('nan')):.3f} | episodes {res.get('episodes', 0)}")
+
+    results.sort(key=lambda r: (r.get('episodes', 0), r.get('metric', -1.0)), reverse=True)
+    write_table(results, os.path.join(out_dir, "results.csv"))
+    return results
+
+
+def write_table(results, path):
+    columns = []
+    for r in results:
+        columns += [k for k in r if k not in columns]
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(results)
+
+    print("\n" + " | ".join(f"{c:>12}" for c in columns))
+    for r in results:
+        cells = []
+        for c in columns:
+            v = r.get(c, "")
+            cells.append(f"{v:>12.4g}" if isinstance(v, float) else f"{str(v):>12}")
+        print(" | ".join(cells))
+    print(f"\n[Sweep] Results written to {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel DDQN hyperparameter sweep (ASHA)")
+    parser.add_argument("--space", required=True, help="JSON search space")
+    parser.add_argument("--trials", type=int, help="random trials (omit for full grid)")
+    parser.add_argument("--slice", type=int, default=1)
+    parser.add_argument("--max-episodes", type=int, default=300)
+    parser.add_argument("--min-episodes", type=int, default=20)
+    parser.add_argument("--eta", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-early-stopping", action="store_true")
+    parser.add_argument("--out", default=os.path.join(SWEEP_DIR, time.strftime("%Y%m%d_%H%M%S")))
+    args = parser.parse_args()
+
+    with open(args.space, 'r') as f:
+        space = json.load(f)
+    with open(CURRICULUM_FILE, 'r') as f:
+        current_slice = next(s for s in json.load(f) if s['id'] == args.slice)
+
+    trials = sample_trials(space, args.trials, args.seed)
+    run_sweep(trials, current_slice, args.out, args.max_episodes, args.min_episodes, args.eta,
+              workers=args.workers, seed=args.seed, early_stopping=not args.no_early_stopping)
+
+
+if __name__ == "__main__":
+    main()